@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'to', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    ordering = ('-id',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
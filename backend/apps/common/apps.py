@@ -3,4 +3,9 @@ from django.apps import AppConfig
 
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.common'
\ No newline at end of file
+    name = 'apps.common'
+
+    def ready(self):
+        """Import signals and checks when the app is ready"""
+        import apps.common.checks
+        import apps.common.signals
@@ -0,0 +1,83 @@
+# backend/apps/common/checks.py
+"""
+Middleware checks for PathDispatchMiddleware. Django's own admin and
+security checks only look in MIDDLEWARE, so settings silences them
+(admin.E408-E410, security.W002/W003/W016/W019) and these run the same
+checks against MIDDLEWARE plus SITE_MIDDLEWARE.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.utils.module_loading import import_string
+
+
+def _site_middleware():
+    classes = []
+    for path in [*settings.MIDDLEWARE, *getattr(settings, 'SITE_MIDDLEWARE', ())]:
+        try:
+            classes.append(import_string(path))
+        except ImportError:
+            continue
+    return classes
+
+
+def _has(classes, path):
+    cls = import_string(path)
+    return any(isinstance(candidate, type) and issubclass(candidate, cls) for candidate in classes)
+
+
+@register(Tags.admin)
+def check_admin_middleware(app_configs, **kwargs):
+    if not apps.is_installed('django.contrib.admin'):
+        return []
+    classes = _site_middleware()
+    return [
+        Error(f"'{path}' must be in MIDDLEWARE or SITE_MIDDLEWARE in order to use the admin application.", id=check_id)
+        for path, check_id in (
+            ('django.contrib.auth.middleware.AuthenticationMiddleware', 'common.E001'),
+            ('django.contrib.messages.middleware.MessageMiddleware', 'common.E002'),
+            ('django.contrib.sessions.middleware.SessionMiddleware', 'common.E003'),
+        )
+        if not _has(classes, path)
+    ]
+
+
+@register(Tags.security, deploy=True)
+def check_security_middleware(app_configs, **kwargs):
+    classes = _site_middleware()
+    return [
+        Warning(
+            f"'{path}' is in neither MIDDLEWARE nor SITE_MIDDLEWARE, so {what}.",
+            id=check_id,
+        )
+        for path, what, check_id in (
+            ('django.middleware.csrf.CsrfViewMiddleware', 'forms are not protected against CSRF', 'common.W002'),
+            ('django.middleware.clickjacking.XFrameOptionsMiddleware', 'pages are not protected against clickjacking', 'common.W003'),
+        )
+        if not _has(classes, path)
+    ]
+
+
+@register(Tags.security, deploy=True)
+def check_site_middleware_settings(app_configs, **kwargs):
+    classes = _site_middleware()
+    warnings = []
+    if (
+        _has(classes, 'django.middleware.csrf.CsrfViewMiddleware')
+        and not settings.CSRF_USE_SESSIONS
+        and settings.CSRF_COOKIE_SECURE is not True
+    ):
+        warnings.append(Warning(
+            "CsrfViewMiddleware is in MIDDLEWARE or SITE_MIDDLEWARE, but you have not set CSRF_COOKIE_SECURE "
+            "to True. Using a secure-only CSRF cookie makes it more difficult for network traffic sniffers "
+            "to steal the CSRF token.",
+            id='common.W016',
+        ))
+    if _has(classes, 'django.middleware.clickjacking.XFrameOptionsMiddleware') and settings.X_FRAME_OPTIONS != 'DENY':
+        warnings.append(Warning(
+            "XFrameOptionsMiddleware is in MIDDLEWARE or SITE_MIDDLEWARE, but X_FRAME_OPTIONS is not set to "
+            "'DENY'. Unless there is a good reason for your site to serve other parts of itself in a frame, "
+            "you should change it to 'DENY'.",
+            id='common.W019',
+        ))
+    return warnings
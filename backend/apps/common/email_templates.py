@@ -0,0 +1,81 @@
+# backend/apps/common/email_templates.py
+"""
+Email rendering from `<prefix>_subject.txt`, `<prefix>_message.txt` and
+`<prefix>_message.html` templates, the layout allauth uses. The three
+templates are looked up once per process and prefix (misses included), then
+rendered with a plain Context built from the caller's dict: no context
+processors and no loader lookups per email. With DEBUG on, templates are
+looked up every time so edits show up without a restart.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import Context, TemplateDoesNotExist
+from django.template.loader import get_template
+
+
+def email_templates(template_prefix, html_ext='html'):
+    """Returns the compiled (subject, text, html) templates; text or html may be None."""
+    if settings.DEBUG:
+        return _load_email_templates(template_prefix, html_ext)
+    return _cached_email_templates(template_prefix, html_ext)
+
+
+def _load_email_templates(template_prefix, html_ext):
+    subject = get_template(f'{template_prefix}_subject.txt').template
+    bodies = []
+    for ext in ('txt', html_ext):
+        try:
+            bodies.append(get_template(f'{template_prefix}_message.{ext}').template)
+        except TemplateDoesNotExist:
+            bodies.append(None)
+    if bodies == [None, None]:
+        raise TemplateDoesNotExist(f'{template_prefix}_message.txt')
+    return subject, bodies[0], bodies[1]
+
+
+_cached_email_templates = lru_cache(maxsize=None)(_load_email_templates)
+
+
+@receiver(setting_changed)
+def _clear_email_templates(setting, **kwargs):
+    if setting in ('TEMPLATES', 'DEBUG'):
+        _cached_email_templates.cache_clear()
+
+
+def render_email(template_prefix, to, context, from_email=None, headers=None, html_ext='html'):
+    """
+    Renders one email, like allauth's DefaultAccountAdapter.render_mail but
+    without the subject prefix. `to` is an address or a list of them.
+    """
+    return render_emails(template_prefix, [(to, {})], context, from_email, headers, html_ext)[0]
+
+
+def render_emails(template_prefix, recipients, context=None, from_email=None, headers=None, html_ext='html'):
+    """
+    Renders one email per `(to, personal_context)` in `recipients`, in one
+    pass: the templates are fetched once and each personal context is pushed
+    onto a single Context holding the shared `context`.
+    """
+    subject_template, text_template, html_template = email_templates(template_prefix, html_ext)
+    shared = Context(context or {})
+    messages = []
+    for to, personal in recipients:
+        with shared.push(personal):
+            # Subjects are one line; templates often end with a newline.
+            subject = ' '.join(subject_template.render(shared).splitlines()).strip()
+            text = text_template.render(shared).strip() if text_template else None
+            html = html_template.render(shared).strip() if html_template else None
+        to = [to] if isinstance(to, str) else list(to)
+        if text is None:
+            message = EmailMessage(subject, html, from_email, to, headers=headers)
+            message.content_subtype = 'html'
+        else:
+            message = EmailMultiAlternatives(subject, text, from_email, to, headers=headers)
+            if html is not None:
+                message.attach_alternative(html, 'text/html')
+        messages.append(message)
+    return messages
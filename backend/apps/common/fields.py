@@ -1,8 +1,9 @@
 # backend/apps/common/fields.py
 import uuid
-from django.db import models
+from django.db import connections, models
 from django.core.exceptions import ValidationError
-from .utils import generate_base62_id # We'll create this next
+from . import registry
+from .utils import decode_base62, encode_base62, generate_base62_id, generate_ordered_base62_id
 
 class SemanticIDField(models.CharField):
     """
@@ -12,11 +13,28 @@ class SemanticIDField(models.CharField):
     We aim for 32 chars total as per original spec, so prefix should be 2 chars.
     If prefix is 'US', id is 'US' + 30 random chars. Total 32.
     The field stores the ID as 'PRFX' + 'random_part'.
+
+    With ordered=True the 30-char body is an 8-char millisecond timestamp plus
+    22 random chars (see OrderedIDGenerator), so new rows append to the end of
+    the primary-key index and ordering by id follows creation order.
+
+    With binary=True the column is bytea/BLOB instead of varchar(32): the
+    prefix is implied by the field and the 30-char body is packed into 23
+    bytes. Python and API values are still the usual 'US...' strings; the
+    packing happens in get_prep_value/from_db_value, and foreign keys
+    pointing at the field inherit the binary column type.
     """
     description = "A semantic ID with a prefix and a random Base62 string."
+    BINARY_LENGTH = 23 # 62**30 < 2**184
+    # Unsaved instances hold None rather than '', so Model.save() goes straight
+    # to the INSERT instead of first trying an UPDATE of the row with id ''.
+    empty_strings_allowed = False
+
 
     def __init__(self, *args, **kwargs):
         self.prefix = kwargs.pop('prefix', None)
+        self.ordered = kwargs.pop('ordered', False)
+        self.binary = kwargs.pop('binary', False)
         if not self.prefix or not isinstance(self.prefix, str) or len(self.prefix) != 2:
             raise ValueError("SemanticIDField requires a 'prefix' argument of 2 characters.")
 
@@ -31,11 +49,19 @@ class SemanticIDField(models.CharField):
     def deconstruct(self):
         name, path, args, kwargs = super().deconstruct()
         kwargs['prefix'] = self.prefix
+        if self.ordered:
+            kwargs['ordered'] = True
+        if self.binary:
+            kwargs['binary'] = True
         # Ensure max_length is not part of deconstructed args if it was set by us
         if 'max_length' in kwargs and kwargs['max_length'] == 32:
             del kwargs['max_length']
         return name, path, args, kwargs
 
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        registry.register(cls, self)
+
     def pre_save(self, model_instance, add):
         """
         This is called before the model is saved.
@@ -56,26 +82,108 @@ class SemanticIDField(models.CharField):
         """
         max_attempts = 5 # Arbitrary number of retries
         for _ in range(max_attempts):
-            random_part = generate_base62_id(30) # Generate 30 random Base62 characters
-            candidate_id = f"{self.prefix}{random_part}"
+            candidate_id = self.new_id()
             if not model_class._default_manager.filter(**{self.attname: candidate_id}).exists():
                 return candidate_id
         raise ValidationError(f"Could not generate a unique ID for prefix {self.prefix} after {max_attempts} attempts.")
 
+    def generate_many(self, model_class, n, using=None):
+        """
+        Generates `n` unique IDs with the prefix for bulk inserts.
+        All candidates are checked with a single `IN (...)` query (per chunk of
+        the backend's parameter limit) and only the colliding ones are retried.
+        """
+        if n <= 0:
+            return []
+        using = using or model_class._default_manager.db
+        chunk_size = connections[using].features.max_query_params or 10000
+        manager = model_class._default_manager.db_manager(using)
+
+        ids = []
+        seen = set()
+        max_attempts = 5
+        for _ in range(max_attempts):
+            candidates = []
+            while len(candidates) < n - len(ids):
+                candidate_id = self.new_id()
+                if candidate_id not in seen:
+                    seen.add(candidate_id)
+                    candidates.append(candidate_id)
+
+            taken = set()
+            for start in range(0, len(candidates), chunk_size):
+                chunk = candidates[start:start + chunk_size]
+                taken.update(
+                    manager.filter(**{f"{self.attname}__in": chunk})
+                    .values_list(self.attname, flat=True)
+                )
+            ids.extend(candidate_id for candidate_id in candidates if candidate_id not in taken)
+            if len(ids) == n:
+                return ids
+        raise ValidationError(f"Could not generate {n} unique IDs for prefix {self.prefix} after {max_attempts} attempts.")
+
+    def new_id(self):
+        """
+        A new ID without the collision query. For inserts that can rely on
+        the unique constraint instead: a collision of the random Base62
+        characters (30, or 22 within one millisecond for ordered IDs) is far
+        less likely than any other reason for the INSERT to fail, and
+        surfaces as an IntegrityError.
+        """
+        return f"{self.prefix}{self._generate_body()}"
+
+    def _generate_body(self):
+        # 30 Base62 characters, either fully random or timestamp-prefixed.
+        if self.ordered:
+            return generate_ordered_base62_id(30)
+        return generate_base62_id(30)
+
+    def db_type(self, connection):
+        if not self.binary:
+            return super().db_type(connection)
+        if connection.vendor == 'mysql':
+            return f'varbinary({self.BINARY_LENGTH})' # BLOB columns cannot be indexed without a prefix length
+        return connection.data_types['BinaryField']
+
+    def pack(self, value):
+        """
+        Packs a 'US...' string into BINARY_LENGTH bytes. The prefix is dropped.
+        Uses the ASCII-ordered alphabet, so byte order matches string order.
+        """
+        if len(value) != 32 or not value.startswith(self.prefix):
+            raise ValueError(f"'{value}' is not a valid semantic ID for prefix {self.prefix}.")
+        return decode_base62(value[2:]).to_bytes(self.BINARY_LENGTH, 'big')
+
+    def unpack(self, value):
+        return f"{self.prefix}{encode_base62(int.from_bytes(value, 'big'), 30)}"
+
     def from_db_value(self, value, expression, connection):
         # Called when data is loaded from the database
+        if self.binary and value is not None:
+            return self.unpack(bytes(value)) # psycopg returns memoryview for bytea
         return value
 
     def to_python(self, value):
         # Called during deserialization and when assigned from Python code
         if isinstance(value, str) or value is None:
             return value
+        if isinstance(value, (bytes, memoryview)):
+            value = bytes(value)
+            if self.binary and len(value) == self.BINARY_LENGTH:
+                return self.unpack(value)
+            return value.decode('ascii')
         return str(value)
 
     def get_prep_value(self, value):
         # Called to prepare the value for storage in the database
         if value is None:
             return None
+        if self.binary:
+            if isinstance(value, (bytes, memoryview)):
+                return bytes(value)
+            if value == '':
+                return b'' # unsaved instance; matches no row
+            return self.pack(str(value))
         if not isinstance(value, str):
             return str(value)
         # Basic validation for format if needed, though usually handled by model validation
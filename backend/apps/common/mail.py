@@ -0,0 +1,273 @@
+# backend/apps/common/mail.py
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends import smtp
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import Counter
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+delivery_failures = Counter('email_outbox_delivery_failures_total', 'Failed delivery attempts of queued OutboxEmail rows.')
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Email backend that queues messages in OutboxEmail instead of sending
+    them. The insert joins the caller's transaction, so an email is only
+    delivered if the work that sent it commits. `manage.py run_email_worker`
+    delivers the queue through EMAIL_DELIVERY_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        rows = [outbox_row(message) for message in email_messages if message.recipients()]
+        OutboxEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def outbox_row(message):
+    if message.attachments:
+        raise ValueError('OutboxEmailBackend does not store attachments.')
+    return OutboxEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        alternatives=[[content, mimetype] for content, mimetype in getattr(message, 'alternatives', ())],
+    )
+
+
+def outbox_message(row, connection=None):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        connection=connection,
+    )
+    for content, mimetype in row.alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+def retry_delay(attempts):
+    """Exponential backoff: EMAIL_OUTBOX_RETRY_SECONDS, doubling per attempt, at most an hour."""
+    return timedelta(seconds=min(3600, settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1)))
+
+
+def deliver_outbox(batch_size=50):
+    """
+    Claims up to `batch_size` due messages and delivers them over one
+    connection to EMAIL_DELIVERY_BACKEND. Claiming is a short transaction
+    (SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers take different
+    batches; SQLite has no row locks, run a single worker there) that counts
+    the attempt and leases the rows for EMAIL_OUTBOX_LEASE_SECONDS by pushing
+    back available_at. Sending runs outside any transaction, so no locks are
+    held during the SMTP round-trips, and the outcome is written in a second
+    short transaction. A worker that dies mid-batch leaves its rows to be
+    retried once the lease runs out. A failed message is retried after
+    retry_delay() and marked failed after EMAIL_OUTBOX_MAX_ATTEMPTS.
+    Returns (sent, failed) for the batch.
+    """
+    rows = claim_outbox(batch_size)
+    if not rows:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning('Email outbox: could not connect: %s', exc)
+        for row in rows:
+            _record_failure(row, exc)
+        failed = len(rows)
+    else:
+        try:
+            for row in rows:
+                try:
+                    outbox_message(row, connection).send()
+                except Exception as exc:
+                    logger.warning('Email outbox: delivery of %s failed: %s', row.pk, exc)
+                    _record_failure(row, exc)
+                    failed += 1
+                else:
+                    row.status = OutboxEmail.Status.SENT
+                    row.sent_at = timezone.now()
+                    row.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(rows, ['status', 'available_at', 'last_error', 'sent_at'])
+    return sent, failed
+
+
+def claim_outbox(batch_size):
+    """Leases up to `batch_size` due rows to this worker and counts their attempt."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.Status.PENDING, available_at__lte=now)
+            .order_by('available_at')[:batch_size]
+        )
+        lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        for row in rows:
+            row.attempts += 1
+            row.available_at = lease_until
+        OutboxEmail.objects.bulk_update(rows, ['attempts', 'available_at'])
+    return rows
+
+
+def _record_failure(row, exc):
+    delivery_failures.inc()
+    row.last_error = f'{type(exc).__name__}: {exc}'
+    if row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        row.status = OutboxEmail.Status.FAILED
+    else:
+        row.available_at = timezone.now() + retry_delay(row.attempts)
+
+
+class SMTPConnectionPool:
+    """
+    Idle, already authenticated SMTP connections, per server and account.
+    acquire() hands out the most recently used one, dropping connections idle
+    for longer than the backend's idle timeout and sending NOOP to those idle
+    for longer than `check_after` seconds.
+    """
+    check_after = 5
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Also runs in forked children, which must not share the parent's sockets.
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key, idle_timeout):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                connection, last_used = idle.pop()
+            age = time.monotonic() - last_used
+            if age > idle_timeout or (age > self.check_after and not _is_healthy(connection)):
+                _quit(connection)
+                continue
+            return connection
+
+    def release(self, key, connection, size):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < size:
+                idle.append((connection, time.monotonic()))
+                return
+        _quit(connection)
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                _quit(connection)
+
+
+def _is_healthy(connection):
+    try:
+        return connection.noop()[0] == 250
+    except (OSError, smtplib.SMTPException):
+        return False
+
+
+def _quit(connection):
+    try:
+        connection.quit()
+    except (OSError, smtplib.SMTPException):
+        connection.close()
+
+
+smtp_pool = SMTPConnectionPool()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=smtp_pool.reset)
+
+
+class PooledSMTPEmailBackend(smtp.EmailBackend):
+    """
+    Django's SMTP backend, except that close() parks the connection in a
+    per-process pool (EMAIL_POOL_SIZE connections per server and account)
+    instead of quitting, and open() reuses a parked one, so only the first
+    send pays for the TCP, TLS and AUTH round trips. Bulk sends should pass
+    all their messages to one send_messages() call (e.g. send_mass_mail) to
+    use a single session. A pooled connection the server dropped is replaced
+    and the message retried once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_size = settings.EMAIL_POOL_SIZE
+        self.idle_timeout = settings.EMAIL_POOL_IDLE_TIMEOUT
+        self._reused = False
+
+    @property
+    def pool_key(self):
+        return (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    def open(self):
+        if self.connection:
+            return False
+        self.connection = smtp_pool.acquire(self.pool_key, self.idle_timeout)
+        self._reused = self.connection is not None
+        if self._reused:
+            return True
+        return super().open()
+
+    def close(self):
+        if self.connection is None:
+            return super().close()
+        connection, self.connection = self.connection, None
+        smtp_pool.release(self.pool_key, connection, self.pool_size)
+        super().close()
+
+    def _send(self, email_message):
+        try:
+            return super()._send(email_message)
+        except smtplib.SMTPResponseException:
+            # The server answered; the session is still usable.
+            raise
+        except smtplib.SMTPServerDisconnected:
+            self._discard()
+            if not self._reused:
+                raise
+            # Dropped while parked, after its last health check: reconnect once.
+            self._reused = False
+            if not super().open():
+                raise
+            return super()._send(email_message)
+        except OSError:
+            self._discard()
+            raise
+
+    def _discard(self):
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            connection.close()
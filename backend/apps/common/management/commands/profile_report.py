@@ -0,0 +1,82 @@
+import io
+import os
+import pstats
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.profiling import EXTENSIONS, split_filename
+
+
+class Command(BaseCommand):
+    help = (
+        "Lists the request profiles in PROFILING_DIR by URL name or, given URL "
+        "names, aggregates their profiles: cProfile stats for .prof files, the "
+        "hottest frames for collapsed stacks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='URL names to aggregate (default: list all)')
+        parser.add_argument('--dir', help='profile directory (default: PROFILING_DIR)')
+        parser.add_argument('--top', type=int, default=20, help='functions or frames shown')
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'])
+        parser.add_argument('--collapsed', metavar='PATH', help='write the merged collapsed stacks here (for flamegraph.pl or speedscope)')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILING_DIR
+        profiles = defaultdict(list)
+        try:
+            for entry in os.scandir(directory):
+                parts = split_filename(entry.name)
+                if parts is not None:
+                    name, stamp, ext = parts
+                    profiles[name].append((stamp, ext, entry.path))
+        except OSError as exc:
+            raise CommandError(f"Cannot read {directory}: {exc}")
+
+        if not options['names']:
+            if not profiles:
+                self.stdout.write("No profiles.")
+            for name, entries in sorted(profiles.items(), key=lambda item: len(item[1]), reverse=True):
+                kinds = Counter(ext for _, ext, _ in entries)
+                newest = max(stamp for stamp, _, _ in entries).split('-')[0]
+                described = ', '.join(f'{count} {ext}' for ext, count in sorted(kinds.items()))
+                self.stdout.write(f"{name}  {described}  newest {newest}")
+            return
+
+        paths = defaultdict(list)
+        for name in options['names']:
+            if name not in profiles:
+                raise CommandError(f"No profiles for {name}.")
+            for _, ext, path in profiles[name]:
+                paths[ext].append(path)
+
+        if paths[EXTENSIONS['cprofile']]:
+            files = paths[EXTENSIONS['cprofile']]
+            self.stdout.write(f"{len(files)} cProfile profiles")
+            stream = io.StringIO()
+            pstats.Stats(*files, stream=stream).strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+            self.stdout.write(stream.getvalue())
+
+        if paths[EXTENSIONS['sample']]:
+            files = paths[EXTENSIONS['sample']]
+            stacks = Counter()
+            for path in files:
+                with open(path, encoding='utf-8') as collapsed:
+                    for line in collapsed:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        if stack and count.isdigit():
+                            stacks[stack] += int(count)
+            total = sum(stacks.values())
+            self.stdout.write(f"{len(files)} sampled profiles, {total} samples")
+            leaves = Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rpartition(';')[2]] += count
+            for frame, count in leaves.most_common(options['top']):
+                self.stdout.write(f"  {count / total:6.1%}  {frame}")
+            if options['collapsed']:
+                with open(options['collapsed'], 'w', encoding='utf-8') as out:
+                    for stack, count in stacks.most_common():
+                        out.write(f'{stack} {count}\n')
+                self.stdout.write(f"Merged stacks written to {options['collapsed']}")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints a profile token for a staff user. Requests sending it in the "
+        "X-Profile-Token header are profiled by ProfilingMiddleware "
+        "(PROFILING_TOKENS must be on) until PROFILING_TOKEN_MAX_AGE runs out or "
+        "the user loses staff status or is deactivated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email__iexact=options['email'], is_active=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No active user with email {options['email']}.")
+        if not user.is_staff:
+            raise CommandError("Profile tokens are only issued to staff users.")
+        if not settings.PROFILING_TOKENS:
+            self.stderr.write("PROFILING_TOKENS is off: the token will be ignored until it is turned on.")
+        self.stdout.write(make_token(user))
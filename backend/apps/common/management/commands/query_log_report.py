@@ -0,0 +1,70 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarises the query log (QUERY_LOG_FILE, written when QUERY_LOG is on) "
+        "by endpoint: slow statements with their latest plan, and SQL templates "
+        "repeated within one request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='log file (default: QUERY_LOG_FILE)')
+        parser.add_argument('--top', type=int, default=3, help='statements shown per endpoint and kind')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.QUERY_LOG_FILE
+        endpoints = defaultdict(lambda: {'slow': {}, 'repeated': {}})
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    kind = record.get('type')
+                    if kind not in ('slow', 'repeated'):
+                        continue
+                    stats = endpoints[record['endpoint']][kind].setdefault(
+                        record['sql'], {'times': 0, 'ms': 0.0, 'max_ms': 0.0, 'max_count': 0, 'plan': None},
+                    )
+                    stats['times'] += 1
+                    stats['ms'] += record['ms']
+                    stats['max_ms'] = max(stats['max_ms'], record['ms'])
+                    stats['max_count'] = max(stats['max_count'], record.get('count', 0))
+                    stats['plan'] = record.get('plan') or stats['plan']
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        if not endpoints:
+            self.stdout.write("No slow or repeated queries logged.")
+            return
+
+        def weight(item):
+            return sum(stats['ms'] for kind in item[1].values() for stats in kind.values())
+
+        for name, kinds in sorted(endpoints.items(), key=weight, reverse=True):
+            self.stdout.write(name)
+            slow = sorted(kinds['slow'].items(), key=lambda item: item[1]['ms'], reverse=True)
+            if slow:
+                count = sum(stats['times'] for _, stats in slow)
+                self.stdout.write(f"  {count} slow statements, {sum(stats['ms'] for _, stats in slow):.1f} ms in total")
+                for sql, stats in slow[:options['top']]:
+                    self.stdout.write(
+                        f"    {stats['times']}x  mean {stats['ms'] / stats['times']:.1f} ms"
+                        f"  max {stats['max_ms']:.1f} ms  {sql}"
+                    )
+                    for line in (stats['plan'] or '').splitlines():
+                        self.stdout.write(f"        {line}")
+            repeated = sorted(kinds['repeated'].items(), key=lambda item: item[1]['ms'], reverse=True)
+            if repeated:
+                self.stdout.write(f"  {len(repeated)} repeated SQL templates")
+                for sql, stats in repeated[:options['top']]:
+                    self.stdout.write(
+                        f"    in {stats['times']} requests, up to {stats['max_count']}x per request,"
+                        f" {stats['ms'] / stats['times']:.1f} ms per request  {sql}"
+                    )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.common.mail import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers queued OutboxEmail rows in batches, retrying failures with "
+        "exponential backoff. Several workers can run side by side on PostgreSQL "
+        "(rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--sleep', type=float, default=1.0, help='seconds to wait when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='exit once no message is due')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                sent, failed = deliver_outbox(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}.")
+                if sent + failed < options['batch_size']:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Sent {total_sent} emails, {total_failed} failed attempts.")
@@ -0,0 +1,28 @@
+# backend/apps/common/managers.py
+from django.db import models
+
+from .fields import SemanticIDField
+
+
+class SemanticIDQuerySet(models.QuerySet):
+    """
+    QuerySet that fills in SemanticIDField values for `bulk_create`.
+    `bulk_create` never calls `pre_save`, so without this hook objects would be
+    inserted with an empty ID. IDs are allocated with `generate_many`, which
+    costs one collision query per batch instead of one per object.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for field in self.model._meta.concrete_fields:
+            if not isinstance(field, SemanticIDField):
+                continue
+            missing = [obj for obj in objs if not getattr(obj, field.attname)]
+            if missing:
+                new_ids = field.generate_many(self.model, len(missing), using=self.db)
+                for obj, new_id in zip(missing, new_ids):
+                    setattr(obj, field.attname, new_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+SemanticIDManager = models.Manager.from_queryset(SemanticIDQuerySet)
@@ -0,0 +1,274 @@
+# backend/apps/common/metrics.py
+"""
+Counters and histograms shared by all worker processes, exposed in the
+Prometheus text format by apps.common.views.metrics.
+
+Each process only ever adds to its own values. With METRICS_DIR set they
+live in a memory-mapped file per process (metrics-<pid>.db), so an update
+is a dict lookup and an 8-byte write under an uncontended lock, and the
+exposition sums the files of every process, as prometheus_client's
+multiprocess mode does. Files of exited workers keep counting, so totals
+never go backwards; clear METRICS_DIR when the server (re)starts. Without
+METRICS_DIR values stay in process memory, which is only right for a
+single process (runserver, tests).
+
+File layout: an 8-byte count of bytes used, then entries of a 4-byte key
+length, the UTF-8 key, padding to 8 bytes and an 8-byte float. An entry is
+written before the count that covers it, so readers never see half of one.
+"""
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_USED = struct.Struct('<Q')
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _value_offset(offset, key_length):
+    return offset + (_KEY_LENGTH.size + key_length + 7) // 8 * 8
+
+
+def read_values(buffer):
+    """Yields (key, value offset, value) for the entries in a metrics file's bytes."""
+    used = min(_USED.unpack_from(buffer, 0)[0], len(buffer)) if len(buffer) >= _USED.size else 0
+    offset = _USED.size
+    while offset + _KEY_LENGTH.size <= used:
+        length = _KEY_LENGTH.unpack_from(buffer, offset)[0]
+        start = offset + _KEY_LENGTH.size
+        key = bytes(buffer[start:start + length]).decode()
+        position = _value_offset(offset, length)
+        if position + _VALUE.size > used:
+            return
+        yield key, position, _VALUE.unpack_from(buffer, position)[0]
+        offset = position + _VALUE.size
+
+
+class MmapValues:
+    """One process's values in a memory-mapped file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        # A file left by an earlier process with the same pid is added to.
+        self._positions = {key: position for key, position, _ in read_values(self._mmap)}
+        self._used = max(_USED.unpack_from(self._mmap, 0)[0], _USED.size)
+
+    def _append(self, key):
+        encoded = key.encode()
+        position = _value_offset(self._used, len(encoded))
+        end = position + _VALUE.size
+        if end > len(self._mmap):
+            self._mmap.resize(max(2 * len(self._mmap), end))
+        _KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + _KEY_LENGTH.size:self._used + _KEY_LENGTH.size + len(encoded)] = encoded
+        _VALUE.pack_into(self._mmap, position, 0.0)
+        _USED.pack_into(self._mmap, 0, end)
+        self._used = end
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _VALUE.pack_into(self._mmap, position, _VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+    def items(self):
+        return ((key, value) for key, _, value in read_values(self._mmap))
+
+
+class MemoryValues(dict):
+    def add(self, key, amount):
+        self[key] = self.get(key, 0.0) + amount
+
+
+class Store:
+    """This process's values, opened on first use and again after a fork."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Also runs in forked children, where the parent's lock may be held.
+        self._lock = threading.Lock()
+        self._values = None
+
+    def _open(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return MemoryValues()
+        os.makedirs(directory, exist_ok=True)
+        return MmapValues(os.path.join(directory, f'metrics-{os.getpid()}.db'))
+
+    def add(self, key, amount):
+        with self._lock:
+            if self._values is None:
+                self._values = self._open()
+            self._values.add(key, amount)
+
+    def add_many(self, updates):
+        with self._lock:
+            if self._values is None:
+                self._values = self._open()
+            for key, amount in updates:
+                self._values.add(key, amount)
+
+    def collect(self):
+        """Sums the values of all processes (of this one without METRICS_DIR)."""
+        directory = settings.METRICS_DIR
+        totals = {}
+        if not directory:
+            with self._lock:
+                items = list(self._values.items()) if self._values is not None else []
+            for key, value in items:
+                totals[key] = totals.get(key, 0.0) + value
+            return totals
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return totals
+        for name in names:
+            if not (name.startswith('metrics-') and name.endswith('.db')):
+                continue
+            with open(os.path.join(directory, name), 'rb') as values:
+                buffer = values.read()
+            for key, _, value in read_values(buffer):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+store = Store()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=store.reset)
+
+registry = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_string(pairs):
+    pairs = tuple(pairs)
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def _format(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+    Values are stored under '<name>\t<sample suffix>\t<labels>' keys, plus
+    '\t<le>' for histogram buckets, so the exposition can group them.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        if name in registry:
+            raise ValueError(f"Metric {name} is already registered.")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._keys = {}
+        registry[name] = self
+
+    def _label_string(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}.")
+        return _label_string((name, labels[name]) for name in self.labelnames)
+
+    def expose(self, values):
+        """Sample lines for `values`, {(suffix, labels, ...): value} of this metric's keys."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        cache_key = tuple(labels.items())
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = self._keys[cache_key] = f'{self.name}\t\t{self._label_string(labels)}'
+        store.add(key, amount)
+
+    def expose(self, values):
+        if not values and not self.labelnames:
+            return [f'{self.name} 0']
+        return [f'{self.name}{labels} {_format(value)}' for (_, labels), value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    """
+    Buckets are stored per bucket rather than cumulatively (one add per
+    observation, not one per bucket) and summed up on exposition.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        if 'le' in labelnames:
+            raise ValueError("'le' is reserved for histogram buckets.")
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        self._bounds = [*(_format(bound) for bound in self.buckets), '+Inf']
+
+    def observe(self, value, **labels):
+        cache_key = tuple(labels.items())
+        keys = self._keys.get(cache_key)
+        if keys is None:
+            label_string = self._label_string(labels)
+            keys = self._keys[cache_key] = (
+                [f'{self.name}\t_bucket\t{label_string}\t{bound}' for bound in self._bounds],
+                f'{self.name}\t_sum\t{label_string}',
+                f'{self.name}\t_count\t{label_string}',
+            )
+        buckets, sum_key, count_key = keys
+        store.add_many(((buckets[bisect.bisect_left(self.buckets, value)], 1), (sum_key, value), (count_key, 1)))
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def expose(self, values):
+        lines = []
+        for labels in sorted({labels for suffix, labels, *_ in values if suffix == '_count'}):
+            cumulative = 0.0
+            for bound in self._bounds:
+                cumulative += values.get(('_bucket', labels, bound), 0.0)
+                bucket_labels = f'{labels[:-1]},' if labels else '{'
+                lines.append(f'{self.name}_bucket{bucket_labels}le="{bound}"}} {_format(cumulative)}')
+            lines.append(f"{self.name}_sum{labels} {_format(values.get(('_sum', labels), 0.0))}")
+            lines.append(f"{self.name}_count{labels} {_format(values[('_count', labels)])}")
+        return lines
+
+
+def exposition():
+    """All registered metrics, summed over processes, in the Prometheus text format."""
+    by_metric = {}
+    for key, value in store.collect().items():
+        name, *parts = key.split('\t')
+        by_metric.setdefault(name, {})[tuple(parts)] = value
+    lines = []
+    for name, metric in sorted(registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        lines.extend(metric.expose(by_metric.get(name, {})))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,428 @@
+# backend/apps/common/middleware.py
+import json
+import logging
+import os
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from django.conf import settings
+from django.contrib.messages import constants as message_constants
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.settings import api_settings as drf_settings
+
+from scaffold_project_config import db_router
+
+from . import profiling, querylog, timing
+
+timing_logger = logging.getLogger('apps.common.timing')
+
+
+class PrimaryPinningMiddleware:
+    """
+    Read-after-write stickiness for PrimaryReplicaRouter.
+    A request that wrote to the primary gets a cookie holding the time until
+    which the client should keep reading from the primary. Requests carrying
+    an unexpired cookie start out pinned to the primary.
+    """
+    COOKIE_NAME = 'db-primary-pin'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        pinned_token = db_router._pinned.set(self._cookie_is_active(request))
+        wrote_token = db_router._wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = db_router._wrote.get()
+        finally:
+            db_router._pinned.reset(pinned_token)
+            db_router._wrote.reset(wrote_token)
+        return self._set_pin_cookie(response, wrote)
+
+    async def __acall__(self, request):
+        # Writes made in sync_to_async threads propagate their context changes back.
+        pinned_token = db_router._pinned.set(self._cookie_is_active(request))
+        wrote_token = db_router._wrote.set(False)
+        try:
+            response = await self.get_response(request)
+            wrote = db_router._wrote.get()
+        finally:
+            db_router._pinned.reset(pinned_token)
+            db_router._wrote.reset(wrote_token)
+        return self._set_pin_cookie(response, wrote)
+
+    def _set_pin_cookie(self, response, wrote):
+        if wrote:
+            pin_seconds = settings.DATABASE_PRIMARY_PIN_SECONDS
+            response.set_cookie(
+                self.COOKIE_NAME,
+                str(int(time.time()) + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def _cookie_is_active(self, request):
+        try:
+            return int(request.COOKIES.get(self.COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class RequestTimingMiddleware:
+    """
+    Measures a sample of requests (REQUEST_TIMING_SAMPLE_RATE) and reports
+    total time, SQL query count and time, template render time and email
+    send time (see apps/common/timing.py) in a Server-Timing header
+    (unless REQUEST_TIMING_HEADER is off) and one JSON log line on the
+    'apps.common.timing' logger. Unsampled requests only pay for one
+    random() call; with the rate at 0 the middleware is not loaded at all.
+    Place it first so the total covers the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not timing.is_enabled():
+            raise MiddlewareNotUsed
+        timing.install()
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            timing._current.reset(token)
+        return self._report(request, response, timings)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        # sync_to_async threads run in a copy of this context and share the object.
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing._current.reset(token)
+        return self._report(request, response, timings)
+
+    def _report(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        durations = {'total': total, **timings.durations}
+        if settings.REQUEST_TIMING_HEADER:
+            descriptions = {'db': f'{timings.queries} queries'}
+            response.headers['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.1f}'
+                + (f';desc="{descriptions[name]}"' if name in descriptions else '')
+                for name, seconds in durations.items()
+            )
+        if not timing_logger.isEnabledFor(logging.INFO):
+            return response
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in durations.items()},
+            'queries': timings.queries,
+        }
+        timing_logger.info(json.dumps(record), extra={'timing': record})
+        return response
+
+
+class QueryLogMiddleware:
+    """
+    Records each request's queries for apps/common/querylog.py and logs its
+    slow statements (with their plans) and repeated SQL templates once the
+    response is ready. Not loaded unless QUERY_LOG is on.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not querylog.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = querylog.RequestQueries()
+        token = querylog._current.set(queries)
+        try:
+            response = self.get_response(request)
+        finally:
+            querylog._current.reset(token)
+        querylog.report(request, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = querylog.RequestQueries()
+        token = querylog._current.set(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            querylog._current.reset(token)
+        if queries.slow:
+            # EXPLAIN runs on the thread that owns the connection.
+            await sync_to_async(querylog.report)(request, queries)
+        else:
+            querylog.report(request, queries)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a PROFILING_SAMPLE_RATE share of requests, and requests with a
+    valid X-Profile-Token header when PROFILING_TOKENS is on, into
+    PROFILING_DIR (see apps/common/profiling.py). Token-triggered responses
+    name their profile file in an X-Profile header. Not loaded when both
+    are off; otherwise an unprofiled request costs one random() call and a
+    header lookup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling.is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.tokens = settings.PROFILING_TOKENS
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _wanted(self, request):
+        """Returns 'token', 'sampled' or None."""
+        token = request.META.get(profiling.TOKEN_HEADER) if self.tokens else None
+        if token is not None and profiling.token_is_valid(token):
+            return 'token'
+        if random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        reason = self._wanted(request)
+        profiler = profiling.start() if reason else None
+        if profiler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop(profiler)
+        return self._save(request, response, profiler, reason)
+
+    async def __acall__(self, request):
+        reason = self._wanted(request)
+        profiler = profiling.start() if reason else None
+        if profiler is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.stop(profiler)
+        return self._save(request, response, profiler, reason)
+
+    def _save(self, request, response, profiler, reason):
+        path = profiling.save(profiling.profile_name(request), profiler)
+        if reason == 'token':
+            response.headers['X-Profile'] = os.path.basename(path)
+        return response
+
+
+class DiscardedMessages:
+    """
+    django.contrib.messages storage for requests without MessageMiddleware.
+    allauth adds messages while signing up and logging in, which an API
+    response never shows.
+    """
+    level = message_constants.INFO
+
+    def add(self, level, message, extra_tags=''):
+        pass
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+
+class PathDispatchMiddleware:
+    """
+    Runs SITE_MIDDLEWARE (sessions, CSRF, auth, messages and clickjacking)
+    around the rest of the chain, except for requests under
+    API_FAST_PATH_PREFIXES, which go straight on. The API authenticates with
+    JWTs in DRF authentication classes, which make their own CSRF check for
+    cookie-borne tokens when JWT_AUTH_COOKIE_USE_CSRF is on, so it has no
+    use for those layers.
+
+    SITE_MIDDLEWARE is loaded as Django loads MIDDLEWARE. Its process_view
+    and process_template_response hooks run for site requests only; its
+    process_exception hooks run for all requests. API requests get
+    DiscardedMessages instead of a message store.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.API_FAST_PATH_PREFIXES)
+        if self.prefixes:
+            check_stateless_api()
+        self.async_mode = iscoroutinefunction(get_response)
+        view_hooks, template_response_hooks, exception_hooks = [], [], []
+        handler = get_response
+        for path in reversed(settings.SITE_MIDDLEWARE):
+            factory = import_string(path)
+            if not getattr(factory, 'async_capable' if self.async_mode else 'sync_capable', not self.async_mode):
+                raise ImproperlyConfigured(
+                    f"{path} in SITE_MIDDLEWARE cannot run {'async' if self.async_mode else 'sync'}hronously."
+                )
+            try:
+                instance = factory(handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(f"Middleware factory {path} returned None.")
+            if hasattr(instance, 'process_view'):
+                view_hooks.insert(0, self._adapt(instance.process_view))
+            if hasattr(instance, 'process_template_response'):
+                template_response_hooks.append(self._adapt(instance.process_template_response))
+            if hasattr(instance, 'process_exception'):
+                exception_hooks.append(self._adapt(instance.process_exception))
+            handler = convert_exception_to_response(instance)
+        self.site_handler = handler
+        self.view_hooks = view_hooks
+        self.template_response_hooks = template_response_hooks
+        self.exception_hooks = exception_hooks
+        # Only offered to Django when SITE_MIDDLEWARE has hooks of that kind.
+        if self.async_mode:
+            markcoroutinefunction(self)
+            hooks = (self._aprocess_view, self._aprocess_template_response, self._aprocess_exception)
+        else:
+            hooks = (self._process_view, self._process_template_response, self._process_exception)
+        for name, hook, wanted in zip(
+            ('process_view', 'process_template_response', 'process_exception'),
+            hooks,
+            (view_hooks, template_response_hooks, exception_hooks),
+        ):
+            if wanted:
+                setattr(self, name, hook)
+
+    def _adapt(self, hook):
+        if self.async_mode and not iscoroutinefunction(hook):
+            return sync_to_async(hook, thread_sensitive=True)
+        return hook
+
+    def is_api(self, request):
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.is_api(request):
+            return self.site_handler(request)
+        request._messages = DiscardedMessages()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.is_api(request):
+            return await self.site_handler(request)
+        request._messages = DiscardedMessages()
+        return await self.get_response(request)
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = await hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def _process_template_response(self, request, response):
+        if self.is_api(request):
+            return response
+        for hook in self.template_response_hooks:
+            response = hook(request, response)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        if self.is_api(request):
+            return response
+        for hook in self.template_response_hooks:
+            response = await hook(request, response)
+        return response
+
+    def _process_exception(self, request, exception):
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    async def _aprocess_exception(self, request, exception):
+        for hook in self.exception_hooks:
+            response = await hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+
+def check_stateless_api():
+    """
+    The fast path has no sessions, so nothing under API_FAST_PATH_PREFIXES
+    may authenticate with one: CsrfViewMiddleware would not be there to
+    protect it, and logins would not stick.
+    """
+    if any(issubclass(cls, SessionAuthentication) for cls in drf_settings.DEFAULT_AUTHENTICATION_CLASSES):
+        raise ImproperlyConfigured(
+            "SessionAuthentication cannot be used with API_FAST_PATH_PREFIXES; "
+            "clear API_FAST_PATH_PREFIXES to run the API through SITE_MIDDLEWARE."
+        )
+    if rest_auth_settings.SESSION_LOGIN:
+        raise ImproperlyConfigured(
+            "REST_AUTH['SESSION_LOGIN'] cannot be used with API_FAST_PATH_PREFIXES; "
+            "clear API_FAST_PATH_PREFIXES to run the API through SITE_MIDDLEWARE."
+        )
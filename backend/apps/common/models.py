@@ -1,3 +1,45 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by `manage.py run_email_worker`.
+    OutboxEmailBackend (apps/common/mail.py) writes one row per message, so
+    it commits or rolls back with the transaction that sent it.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        SENT = 'sent', _('Sent')
+        FAILED = 'failed', _('Failed')
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    subject = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [content, mimetype] pairs from EmailMultiAlternatives, e.g. the HTML part.
+    alternatives = models.JSONField(default=list, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not delivered before this time; pushed back after each failed attempt.
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                name='outbox_email_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
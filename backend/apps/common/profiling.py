@@ -0,0 +1,173 @@
+# backend/apps/common/profiling.py
+"""
+Request profiles for ProfilingMiddleware: a share of requests
+(PROFILING_SAMPLE_RATE), plus requests carrying a profile token in the
+X-Profile-Token header (PROFILING_TOKENS; tokens come from
+`manage.py profile_token` and are only issued to staff users). A token
+carries the user's token_version, so deactivating the user or revoking
+staff (both bump it) invalidates it before PROFILING_TOKEN_MAX_AGE.
+
+Two profilers, chosen by PROFILING_MODE:
+
+    cprofile    cProfile, saved as a .prof file (pstats, snakeviz)
+    sample      the request's thread sampled every PROFILING_INTERVAL_MS,
+                saved as collapsed stacks (flamegraph.pl, speedscope)
+
+Profiles are saved to PROFILING_DIR as <url name>.<time>.<ext>. Only the
+newest PROFILING_KEEP per URL name are kept. `manage.py profile_report`
+lists and aggregates them. One request per process is profiled at a time.
+Under ASGI the profile covers the event loop thread, so other requests'
+coroutines show up in it too.
+"""
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+EXTENSIONS = {'cprofile': '.prof', 'sample': '.collapsed'}
+
+_signer = signing.TimestampSigner(salt='apps.common.profiling')
+_busy = threading.Lock()
+_UNSAFE = re.compile(r'[^\w-]+')
+
+
+def is_enabled():
+    return settings.PROFILING_SAMPLE_RATE > 0 or settings.PROFILING_TOKENS
+
+
+def make_token(user):
+    return _signer.sign(f'{user.pk}:{user.token_version}')
+
+
+def token_is_valid(token):
+    """
+    Checks the signature and age, then the token version against the user's
+    current one (cached like the JWT check, see get_token_version).
+    """
+    from apps.users.authentication import get_token_version
+
+    try:
+        user_id, _, version = _signer.unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE).rpartition(':')
+    except signing.BadSignature:
+        return False
+    return bool(user_id) and version == str(get_token_version(user_id))
+
+
+class CProfiler:
+    extension = EXTENSIONS['cprofile']
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """Counts the target thread's stacks, sampled from a background thread."""
+    extension = EXTENSIONS['sample']
+
+    def __init__(self, interval=None):
+        self.interval = (settings.PROFILING_INTERVAL_MS if interval is None else interval) / 1000
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(target,), name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            frames = []
+            while frame is not None:
+                frames.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as out:
+            for stack, count in self.stacks.most_common():
+                out.write(f'{stack} {count}\n')
+
+
+PROFILERS = {'cprofile': CProfiler, 'sample': StackSampler}
+
+
+def start():
+    """Starts a profiler, or returns None if this process is already profiling a request."""
+    if not _busy.acquire(blocking=False):
+        return None
+    try:
+        profiler = PROFILERS[settings.PROFILING_MODE]()
+        profiler.start()
+    except BaseException:
+        _busy.release()
+        raise
+    return profiler
+
+
+def stop(profiler):
+    try:
+        profiler.stop()
+    finally:
+        _busy.release()
+
+
+def profile_name(request):
+    match = getattr(request, 'resolver_match', None)
+    name = match.view_name if match is not None else 'unresolved'
+    return _UNSAFE.sub('_', name) or 'unresolved'
+
+
+def split_filename(filename):
+    """'rest_login.20260101T120000-42-1700000000000.prof' -> ('rest_login', stamp, '.prof'), or None."""
+    name, dot, rest = filename.partition('.')
+    stamp, ext = os.path.splitext(rest)
+    if not dot or ext not in EXTENSIONS.values() or not stamp:
+        return None
+    return name, stamp, ext
+
+
+def save(name, profiler):
+    """Writes the profile to PROFILING_DIR and drops the oldest beyond PROFILING_KEEP for `name`."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    stamp = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{time.monotonic_ns()}"
+    path = os.path.join(directory, f'{name}.{stamp}{profiler.extension}')
+    # Written under a temporary name so profile_report never reads half a file.
+    profiler.write(f'{path}.tmp')
+    os.replace(f'{path}.tmp', path)
+
+    kept = sorted(
+        (entry for entry in os.scandir(directory) if (split_filename(entry.name) or ('',))[0] == name),
+        key=lambda entry: entry.stat().st_mtime_ns,
+        reverse=True,
+    )
+    for entry in kept[settings.PROFILING_KEEP:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError: # removed by another process
+            pass
+    return path
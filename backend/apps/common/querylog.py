@@ -0,0 +1,117 @@
+# backend/apps/common/querylog.py
+"""
+Opt-in query log for QueryLogMiddleware (QUERY_LOG). Within a request, every
+statement is timed and its SQL template counted. When the request ends,
+statements slower than QUERY_LOG_SLOW_MS are logged with their EXPLAIN plan
+(the backend's explain prefix: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on
+PostgreSQL), and templates run more than QUERY_LOG_REPEAT_THRESHOLD times
+are logged as likely N+1 patterns. Records are JSON lines on the
+'apps.common.querylog' logger, written to QUERY_LOG_FILE when set;
+`manage.py query_log_report` summarises them by endpoint.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('query_log', default=None)
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_REGEX_ANCHORS = re.compile(r'^\^|\??\$$')
+
+
+def sql_template(sql):
+    """Normalizes a statement so the same query with different IN-list lengths matches."""
+    return _PLACEHOLDER_LIST.sub('(...)', _WHITESPACE.sub(' ', sql).strip())
+
+
+class RequestQueries:
+    def __init__(self):
+        self.slow = []
+        self.templates = Counter()
+        self.template_seconds = Counter()
+        self.explaining = False
+
+
+def log_queries(execute, sql, params, many, context):
+    """Execute wrapper (see instrument_connection) recording the current request's queries."""
+    queries = _current.get()
+    if queries is None or queries.explaining:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    seconds = time.perf_counter() - started
+    template = sql_template(sql)
+    queries.templates[template] += 1
+    queries.template_seconds[template] += seconds
+    if seconds * 1000 >= settings.QUERY_LOG_SLOW_MS:
+        # Explained in report(), once the statement's cursor and the
+        # request's transactions are done with.
+        queries.slow.append((context['connection'].alias, sql, None if many else params, seconds))
+    return result
+
+
+def explain(connection, sql, params):
+    if params is None and '%s' in sql or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        # In a transaction (a savepoint inside one), so a failed EXPLAIN
+        # cannot leave a PostgreSQL transaction aborted.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+
+
+def instrument_connection(connection):
+    if log_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_queries)
+
+
+def is_enabled():
+    return settings.QUERY_LOG
+
+
+def endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.route:
+        return f'{request.method} {request.path}'
+    route = _REGEX_ANCHORS.sub('', match.route) # re_path() routes: '^api/auth/login/?$'
+    return f'{request.method} /{route}'
+
+
+def report(request, queries):
+    """Logs the request's slow statements and repeated templates."""
+    name = endpoint(request)
+    queries.explaining = True
+    try:
+        for alias, sql, params, seconds in queries.slow:
+            logger.info(json.dumps({
+                'type': 'slow',
+                'endpoint': name,
+                'ms': round(seconds * 1000, 2),
+                'sql': sql_template(sql),
+                'plan': explain(connections[alias], sql, params),
+            }))
+    finally:
+        queries.explaining = False
+    threshold = settings.QUERY_LOG_REPEAT_THRESHOLD
+    for template, count in queries.templates.items():
+        if count > threshold:
+            logger.info(json.dumps({
+                'type': 'repeated',
+                'endpoint': name,
+                'count': count,
+                'ms': round(queries.template_seconds[template] * 1000, 2),
+                'sql': template,
+            }))
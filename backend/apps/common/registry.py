@@ -0,0 +1,81 @@
+# backend/apps/common/registry.py
+"""
+Registry of SemanticIDField prefixes.
+
+Every concrete model that declares a SemanticIDField is registered under the
+field's prefix when the class is created, so an ID on its own is enough to
+find the model it belongs to:
+
+    resolve('US...')              -> User instance (or User.DoesNotExist)
+    resolve_many(['US...', ...])  -> instances in input order, None if missing
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .utils import BASE62_ALPHABET
+
+_BASE62_CHARS = frozenset(BASE62_ALPHABET)
+_registry = {} # prefix -> (model, field)
+
+
+def register(model, field):
+    """
+    Called from SemanticIDField.contribute_to_class.
+    Abstract, proxy and historical (migration state) models are skipped.
+    """
+    opts = model._meta
+    if opts.abstract or opts.proxy or model.__module__ == '__fake__':
+        return
+    existing = _registry.get(field.prefix)
+    if existing and existing[0]._meta.label != opts.label:
+        raise ImproperlyConfigured(
+            f"SemanticIDField prefix '{field.prefix}' is used by both "
+            f"{existing[0]._meta.label} and {opts.label}."
+        )
+    _registry[field.prefix] = (model, field)
+
+
+def get_model_for_prefix(prefix):
+    entry = _registry.get(prefix)
+    return entry[0] if entry else None
+
+
+def _lookup(semantic_id):
+    """Validates the ID format and prefix without touching the database."""
+    if not isinstance(semantic_id, str) or len(semantic_id) != 32:
+        raise ValueError(f"{semantic_id!r} is not a semantic ID.")
+    entry = _registry.get(semantic_id[:2])
+    if entry is None:
+        raise ValueError(f"Unknown semantic ID prefix in {semantic_id!r}.")
+    if not _BASE62_CHARS.issuperset(semantic_id[2:]):
+        raise ValueError(f"{semantic_id!r} is not a semantic ID.")
+    return entry
+
+
+def resolve(semantic_id):
+    """
+    Returns the instance for a single semantic ID.
+    Raises ValueError for malformed IDs and Model.DoesNotExist if there is no row.
+    """
+    model, field = _lookup(semantic_id)
+    return model._default_manager.get(**{field.attname: semantic_id})
+
+
+def resolve_many(semantic_ids):
+    """
+    Resolves many semantic IDs with one IN query per model.
+    Returns a list in input order, with None for IDs that have no row.
+    Every ID is validated before any query is issued.
+    """
+    semantic_ids = list(semantic_ids)
+    grouped = defaultdict(set)
+    for semantic_id in semantic_ids:
+        model, field = _lookup(semantic_id)
+        grouped[(model, field)].add(semantic_id)
+
+    found = {}
+    for (model, field), values in grouped.items():
+        # in_bulk splits the IN list if it exceeds the backend's parameter limit.
+        found.update(model._default_manager.in_bulk(values, field_name=field.name))
+    return [found.get(semantic_id) for semantic_id in semantic_ids]
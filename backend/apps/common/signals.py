@@ -0,0 +1,35 @@
+# backend/apps/common/signals.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import querylog, timing
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Applies settings.SQLITE_PRAGMAS (the SQLITE_TUNED profile) to every new
+    SQLite connection. Most of these PRAGMAs are per-connection, so they
+    cannot be set once on the database file.
+    """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def instrument_queries(sender, connection, **kwargs):
+    """Counts and times the queries of requests RequestTimingMiddleware samples."""
+    if timing.is_enabled():
+        timing.instrument_connection(connection)
+
+
+@receiver(connection_created)
+def log_queries(sender, connection, **kwargs):
+    """Records the queries of requests for QueryLogMiddleware."""
+    if querylog.is_enabled():
+        querylog.instrument_connection(connection)
@@ -1,20 +1,76 @@
 # backend/apps/common/tests.py
-from django.test import TestCase, TransactionTestCase
-from django.db import models, connection
-from django.core.exceptions import ValidationError
+import importlib.util
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from io import StringIO
+from django.core import mail
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.db import models, connection, transaction
+from django.utils import timezone
+from django.db.utils import ConnectionHandler
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed, ValidationError
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from scaffold_project_config.db_router import PrimaryReplicaRouter, is_pinned_to_primary
+
+from .bloom import BloomFilter
+from .email_templates import _cached_email_templates, render_email, render_emails
 from .fields import SemanticIDField
-from .utils import generate_base62_id, BASE62_ALPHABET
+from .mail import OutboxEmailBackend, PooledSMTPEmailBackend, SMTPConnectionPool, deliver_outbox, smtp_pool
+from .managers import SemanticIDManager
+from . import checks, metrics, profiling, querylog, timing
+from .middleware import (
+    DiscardedMessages, PathDispatchMiddleware, PrimaryPinningMiddleware, ProfilingMiddleware, QueryLogMiddleware,
+    RequestTimingMiddleware,
+)
+from .models import OutboxEmail
+from .registry import get_model_for_prefix, resolve, resolve_many
+from .utils import (
+    generate_base62_id, generate_base62_ids, Base62IDBuffer, BASE62_ALPHABET,
+    OrderedIDGenerator, decode_base62, encode_base62,
+)
 
 # A dummy model for testing SemanticIDField
 class TestModel(models.Model):
     id = SemanticIDField(prefix="TM", primary_key=True)
     name = models.CharField(max_length=100)
 
+    objects = SemanticIDManager()
+
     class Meta:
         app_label = 'common' # Explicitly tie to the 'common' app for test DB creation
 
+class BinaryTestModel(models.Model):
+    id = SemanticIDField(prefix="BT", primary_key=True, binary=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        app_label = 'common'
+
+class BinaryTestChild(models.Model):
+    parent = models.ForeignKey(BinaryTestModel, on_delete=models.CASCADE)
+
+    class Meta:
+        app_label = 'common'
+
 class Base62UtilTests(TestCase):
     def test_generate_base62_id_length(self):
         for length in [1, 10, 30, 100]:
@@ -36,6 +92,63 @@ class Base62UtilTests(TestCase):
         with self.assertRaises(ValueError):
             generate_base62_id(-5)
 
+    def test_generate_base62_ids_batch(self):
+        ids = generate_base62_ids(100, 30)
+        self.assertEqual(len(ids), 100)
+        self.assertTrue(all(len(i) == 30 and set(i) <= set(BASE62_ALPHABET) for i in ids))
+        self.assertEqual(generate_base62_ids(0, 30), [])
+
+    def test_generate_base62_ids_distribution(self):
+        # Rejection sampling should keep every symbol close to 1/62.
+        chars = ''.join(generate_base62_ids(62, 1000))
+        expected = len(chars) / 62
+        for symbol in BASE62_ALPHABET:
+            self.assertLess(abs(chars.count(symbol) - expected), expected * 0.2)
+
+    def test_id_buffer_refills_and_resets(self):
+        buffer = Base62IDBuffer(length=12, batch_size=4)
+        ids = {buffer.take() for _ in range(10)}
+        self.assertEqual(len(ids), 10)
+        buffer.take()
+        self.assertTrue(buffer._ids)
+        buffer.reset() # what a forked child runs
+        self.assertEqual(buffer._ids, [])
+
+    def test_base62_encode_decode_roundtrip(self):
+        for number in [0, 61, 62, 123456789, 62 ** 8 - 1]:
+            self.assertEqual(decode_base62(encode_base62(number, 8)), number)
+        with self.assertRaises(ValueError):
+            encode_base62(62 ** 8, 8)
+
+    def test_ordered_ids_are_monotonic(self):
+        generator = OrderedIDGenerator(30)
+        ids = [generator.next() for _ in range(2000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(len(i) == 30 for i in ids))
+
+    @patch('apps.common.utils.time.time_ns')
+    def test_ordered_ids_survive_clock_going_backwards(self, mock_time_ns):
+        generator = OrderedIDGenerator(30)
+        mock_time_ns.return_value = 2_000_000_000_000_000_000
+        first = generator.next()
+        mock_time_ns.return_value = 1_000_000_000_000_000_000
+        second = generator.next()
+        self.assertGreater(second, first)
+        self.assertEqual(second[:8], first[:8])
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        members = [f'member-{n}' for n in range(1000)]
+        for member in members:
+            bloom.add(member)
+        self.assertEqual(len(bloom), 1000)
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(f'other-{n}' in bloom for n in range(10000))
+        self.assertLess(false_positives, 300)
+
+
 class SemanticIDFieldTests(TransactionTestCase):
     def test_field_instantiation_requires_prefix(self):
         with self.assertRaisesRegex(ValueError, "SemanticIDField requires a 'prefix' argument"):
@@ -55,11 +168,15 @@ class SemanticIDFieldTests(TransactionTestCase):
         # This ensures the table exists in the test database
         with connection.schema_editor() as schema_editor:
             schema_editor.create_model(TestModel)
+            schema_editor.create_model(BinaryTestModel)
+            schema_editor.create_model(BinaryTestChild)
 
     @classmethod
     def tearDownClass(cls):
         # Manually delete the table for TestModel after tests
         with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(BinaryTestChild)
+            schema_editor.delete_model(BinaryTestModel)
             schema_editor.delete_model(TestModel)
         super().tearDownClass()
 
@@ -143,8 +260,731 @@ class SemanticIDFieldTests(TransactionTestCase):
         self.assertIsNone(field.to_python(None))
         # from_db_value is usually identity for CharField unless specific conversion needed
         self.assertEqual(field.from_db_value("DB123", None, None), "DB123")
+        binary = SemanticIDField(prefix="BT", binary=True)
+        value = "BT" + "0" * 29 + "a"
+        self.assertEqual(binary.to_python(binary.pack(value)), value)
+        self.assertEqual(binary.to_python(memoryview(binary.pack(value))), value)
+        self.assertEqual(binary.to_python(value.encode()), value)
 
     def test_get_prep_value(self):
         field = SemanticIDField(prefix="PP")
         self.assertEqual(field.get_prep_value("PPsomevalue"), "PPsomevalue")
-        self.assertIsNone(field.get_prep_value(None))
\ No newline at end of file
+        self.assertIsNone(field.get_prep_value(None))
+
+    def test_generate_many_uses_single_query(self):
+        field = TestModel._meta.get_field('id')
+        with self.assertNumQueries(1):
+            ids = field.generate_many(TestModel, 50)
+        self.assertEqual(len(ids), 50)
+        self.assertEqual(len(set(ids)), 50)
+        self.assertTrue(all(new_id.startswith("TM") and len(new_id) == 32 for new_id in ids))
+
+    @patch('apps.common.fields.generate_base62_id')
+    def test_generate_many_retries_only_collisions(self, mock_generate):
+        TestModel.objects.create(id="TM" + "C" * 30, name="Existing")
+        mock_generate.side_effect = ["C" * 30, "A" * 30, "B" * 30]
+        field = TestModel._meta.get_field('id')
+        with self.assertNumQueries(2):
+            ids = field.generate_many(TestModel, 2)
+        self.assertEqual(ids, ["TM" + "A" * 30, "TM" + "B" * 30])
+        self.assertEqual(mock_generate.call_count, 3)
+
+    def test_bulk_create_assigns_ids(self):
+        with CaptureQueriesContext(connection) as ctx:
+            TestModel.objects.bulk_create([TestModel(name=f"Bulk {i}") for i in range(20)])
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1) # one collision check for the whole batch
+        ids = list(TestModel.objects.values_list('id', flat=True))
+        self.assertEqual(len(set(ids)), 20)
+        self.assertTrue(all(pk.startswith("TM") for pk in ids))
+
+    def test_ordered_field_generation_and_deconstruct(self):
+        field = SemanticIDField(prefix="TM", ordered=True)
+        field.set_attributes_from_name('id')
+        first = field.generate_id(TestModel)
+        second = field.generate_id(TestModel)
+        self.assertTrue(first.startswith("TM"))
+        self.assertEqual(len(first), 32)
+        self.assertLess(first, second)
+        self.assertTrue(field.deconstruct()[3]["ordered"])
+        self.assertNotIn("ordered", SemanticIDField(prefix="TM").deconstruct()[3])
+
+    def test_binary_storage_roundtrip(self):
+        instance = BinaryTestModel.objects.create(name="Binary")
+        self.assertTrue(instance.id.startswith("BT"))
+        self.assertEqual(len(instance.id), 32)
+        child = BinaryTestChild.objects.create(parent=instance)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM common_binarytestmodel")
+            (raw_id,) = cursor.fetchone()
+            cursor.execute("SELECT parent_id FROM common_binarytestchild")
+            (raw_fk,) = cursor.fetchone()
+        self.assertEqual(len(bytes(raw_id)), SemanticIDField.BINARY_LENGTH)
+        self.assertEqual(bytes(raw_fk), bytes(raw_id))
+        self.assertEqual(BinaryTestModel.objects.get(pk=instance.id).id, instance.id)
+        self.assertEqual(BinaryTestChild.objects.get(pk=child.pk).parent_id, instance.id)
+        self.assertEqual(BinaryTestChild.objects.filter(parent__in=[instance.id]).count(), 1)
+
+    def test_binary_packing_preserves_order(self):
+        field = SemanticIDField(prefix="BT", binary=True)
+        low, high = "BT" + "0" * 29 + "Z", "BT" + "0" * 29 + "a"
+        self.assertLess(field.pack(low), field.pack(high))
+        self.assertEqual(field.unpack(field.pack(high)), high)
+        with self.assertRaises(ValueError):
+            field.get_prep_value("XX" + "0" * 30)
+
+    def test_registry_knows_declared_prefixes(self):
+        self.assertIs(get_model_for_prefix("TM"), TestModel)
+        self.assertIs(get_model_for_prefix("BT"), BinaryTestModel)
+        self.assertIsNone(get_model_for_prefix("ZZ"))
+
+    def test_resolve(self):
+        instance = TestModel.objects.create(name="Resolve me")
+        self.assertEqual(resolve(instance.id), instance)
+        with self.assertRaises(TestModel.DoesNotExist):
+            resolve("TM" + "0" * 30)
+
+    def test_resolve_many_one_query_per_model_in_input_order(self):
+        first = TestModel.objects.create(name="First")
+        second = TestModel.objects.create(name="Second")
+        binary = BinaryTestModel.objects.create(name="Binary")
+        missing = "TM" + "0" * 30
+        with self.assertNumQueries(2):
+            result = resolve_many([second.id, binary.id, missing, first.id, second.id])
+        self.assertEqual(result, [second, binary, None, first, second])
+
+    def test_resolve_many_rejects_bad_ids_before_querying(self):
+        instance = TestModel.objects.create(name="Valid")
+        for bad_id in ["ZZ" + "0" * 30, "TM" + "-" * 30, "TMshort", None]:
+            with self.subTest(bad_id=bad_id), self.assertNumQueries(0):
+                with self.assertRaises(ValueError):
+                    resolve_many([instance.id, bad_id])
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], DATABASE_PRIMARY_PIN_SECONDS=10)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def run_request(self, view, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        return PrimaryPinningMiddleware(view)(request)
+
+    def test_reads_use_replica_until_a_write(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(TestModel))
+            seen.append(self.router.db_for_write(TestModel))
+            seen.append(self.router.db_for_read(TestModel))
+            return HttpResponse()
+
+        response = self.run_request(view)
+        self.assertEqual(seen, ['replica_1', 'default', 'default'])
+        self.assertIn(PrimaryPinningMiddleware.COOKIE_NAME, response.cookies)
+        self.assertEqual(response.cookies[PrimaryPinningMiddleware.COOKIE_NAME]['max-age'], 10)
+        self.assertFalse(is_pinned_to_primary()) # state does not leak past the request
+
+    def test_pin_cookie_keeps_reads_on_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(TestModel))
+            return HttpResponse()
+
+        response = self.run_request(view, **{PrimaryPinningMiddleware.COOKIE_NAME: str(int(time.time()) + 5)})
+        self.run_request(view, **{PrimaryPinningMiddleware.COOKIE_NAME: str(int(time.time()) - 5)})
+        self.run_request(view, **{PrimaryPinningMiddleware.COOKIE_NAME: 'garbage'})
+        self.assertEqual(seen, ['default', 'replica_1', 'replica_1'])
+        self.assertNotIn(PrimaryPinningMiddleware.COOKIE_NAME, response.cookies) # read-only requests do not extend the pin
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_reads_primary(self):
+        self.assertEqual(self.router.db_for_read(TestModel), 'default')
+
+class SQLitePragmaTests(TestCase):
+    PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234, 'temp_store': 'MEMORY'}
+
+    def open_connection(self, path):
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        }})
+        return handler['default']
+
+    def test_pragmas_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PRAGMAS=self.PRAGMAS):
+            tuned = self.open_connection(os.path.join(tmp, 'tuned.sqlite3'))
+            try:
+                with tuned.cursor() as cursor:
+                    values = {}
+                    for name in self.PRAGMAS:
+                        cursor.execute(f'PRAGMA {name}')
+                        values[name] = cursor.fetchone()[0]
+            finally:
+                tuned.close()
+        # synchronous NORMAL == 1, temp_store MEMORY == 2
+        self.assertEqual(values, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 1234, 'temp_store': 2})
+
+    def test_no_pragmas_by_default(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PRAGMAS={}):
+            plain = self.open_connection(os.path.join(tmp, 'plain.sqlite3'))
+            try:
+                with plain.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'delete')
+            finally:
+                plain.close()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP is down')
+
+
+class ObservingEmailBackend(BaseEmailBackend):
+    """Records, per message, whether a transaction was open and what another worker could claim."""
+    observed = []
+
+    def send_messages(self, email_messages):
+        for _ in email_messages:
+            self.observed.append((connection.in_atomic_block, deliver_outbox()))
+        return len(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='apps.common.mail.OutboxEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    EMAIL_OUTBOX_RETRY_SECONDS=30,
+)
+class EmailOutboxTests(TestCase):
+    def send(self, subject='Hello'):
+        message = EmailMultiAlternatives(subject, 'Text body', 'from@example.com', ['to@example.com'])
+        message.attach_alternative('<p>HTML body</p>', 'text/html')
+        return message.send()
+
+    def test_send_queues_until_the_worker_delivers(self):
+        self.assertEqual(self.send(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.Status.PENDING)
+
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['to@example.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>HTML body</p>')
+        row = OutboxEmail.objects.get()
+        self.assertEqual(row.status, OutboxEmail.Status.SENT)
+        self.assertIsNotNone(row.sent_at)
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+    def test_rolled_back_send_is_never_delivered(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.send()
+            raise RuntimeError
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='apps.common.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        self.send()
+        self.assertEqual(deliver_outbox(), (0, 1))
+        row = OutboxEmail.objects.get()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.Status.PENDING, 1))
+        self.assertIn('SMTP is down', row.last_error)
+        self.assertGreater(row.available_at, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(deliver_outbox(), (0, 0)) # not due yet
+
+        OutboxEmail.objects.update(available_at=timezone.now())
+        self.assertEqual(deliver_outbox(), (0, 1))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.Status.FAILED, 2))
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='apps.common.tests.ObservingEmailBackend')
+    def test_rows_are_leased_while_sending(self):
+        ObservingEmailBackend.observed = []
+        self.send()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        # The nested deliver_outbox() stands in for a second worker.
+        self.assertEqual([claimed for _, claimed in ObservingEmailBackend.observed], [(0, 0)])
+
+    def test_run_email_worker_once(self):
+        self.send('One')
+        self.send('Two')
+        out = StringIO()
+        call_command('run_email_worker', '--once', '--batch-size', '1', stdout=out)
+        self.assertEqual(sorted(message.subject for message in mail.outbox), ['One', 'Two'])
+        self.assertIn('Sent 2 emails', out.getvalue())
+
+
+@override_settings(EMAIL_DELIVERY_BACKEND='apps.common.tests.ObservingEmailBackend')
+class EmailOutboxTransactionTests(TransactionTestCase):
+    def test_no_transaction_is_open_while_sending(self):
+        ObservingEmailBackend.observed = []
+        EmailMultiAlternatives('Hello', 'Body', 'from@example.com', ['to@example.com'], connection=OutboxEmailBackend()).send()
+        self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(ObservingEmailBackend.observed, [(False, (0, 0))])
+        row = OutboxEmail.objects.get()
+        self.assertEqual((row.status, row.attempts), (OutboxEmail.Status.SENT, 1))
+
+
+class RecordingSMTPHandler:
+    """aiosmtpd handler remembering which SMTP session delivered each message."""
+
+    def __init__(self):
+        self.deliveries = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((id(session), envelope.rcpt_tos))
+        return '250 OK'
+
+    @property
+    def sessions(self):
+        return len({session for session, _ in self.deliveries})
+
+
+@unittest.skipUnless(importlib.util.find_spec('aiosmtpd'), 'aiosmtpd is not installed')
+@override_settings(EMAIL_POOL_SIZE=2, EMAIL_POOL_IDLE_TIMEOUT=60)
+class PooledSMTPEmailBackendTests(SimpleTestCase):
+    def setUp(self):
+        from aiosmtpd.controller import Controller
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.handler = RecordingSMTPHandler()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(smtp_pool.clear)
+
+    def send(self, *recipients):
+        backend = PooledSMTPEmailBackend(host='127.0.0.1', port=self.port, username='', password='', use_tls=False)
+        messages = [EmailMultiAlternatives('Hi', 'Body', 'from@example.com', [to]) for to in recipients]
+        return backend.send_messages(messages)
+
+    def test_connection_is_reused_across_sends(self):
+        self.assertEqual(self.send('a@example.com', 'b@example.com'), 2)
+        self.assertEqual(self.send('c@example.com'), 1)
+        self.assertEqual(len(self.handler.deliveries), 3)
+        self.assertEqual(self.handler.sessions, 1)
+
+    @override_settings(EMAIL_POOL_IDLE_TIMEOUT=0)
+    def test_idle_connections_are_not_reused(self):
+        self.send('a@example.com')
+        time.sleep(0.01)
+        self.send('b@example.com')
+        self.assertEqual(self.handler.sessions, 2)
+
+    def test_dropped_connection_is_replaced(self):
+        self.send('a@example.com')
+        parked = next(iter(smtp_pool._idle.values()))[0][0]
+        parked.close() # as if the server had hung up
+        self.assertEqual(self.send('b@example.com'), 1)
+        self.assertEqual(self.handler.sessions, 2)
+
+    def test_health_check_discards_dead_connections(self):
+        self.send('a@example.com')
+        next(iter(smtp_pool._idle.values()))[0][0].close()
+        with patch.object(SMTPConnectionPool, 'check_after', 0):
+            self.assertEqual(self.send('b@example.com'), 1)
+        self.assertEqual(self.handler.sessions, 2)
+
+
+@override_settings(DEBUG=False)
+class EmailTemplateTests(SimpleTestCase):
+    CONTEXT = {'current_site': {'name': 'Scaffold'}, 'uid': 'u1', 'token': 't1'}
+
+    def test_render_email(self):
+        message = render_email('users/example_message', 'to@example.com', self.CONTEXT, from_email='from@example.com')
+        self.assertEqual(message.subject, 'Password Reset for Scaffold')
+        self.assertIn('/reset-password/u1/t1', message.body)
+        self.assertEqual((message.to, message.from_email, message.alternatives), (['to@example.com'], 'from@example.com', []))
+
+    def test_templates_are_looked_up_once(self):
+        _cached_email_templates.cache_clear()
+        with patch('apps.common.email_templates.get_template', wraps=get_template) as lookup:
+            render_email('users/example_message', 'to@example.com', self.CONTEXT)
+            calls = lookup.call_count
+            render_email('users/example_message', 'to@example.com', self.CONTEXT)
+        self.assertEqual(calls, 3) # subject, text, html (missing)
+        self.assertEqual(lookup.call_count, calls)
+
+    def test_render_emails_personalizes_each_message(self):
+        messages = render_emails(
+            'users/example_message',
+            [('a@example.com', {'token': 'ta'}), ('b@example.com', {'token': 'tb'})],
+            self.CONTEXT,
+        )
+        self.assertEqual([message.to for message in messages], [['a@example.com'], ['b@example.com']])
+        self.assertIn('/u1/ta', messages[0].body)
+        self.assertIn('/u1/tb', messages[1].body)
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_HEADER=True)
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        timing.instrument_connection(connection)
+        self.addCleanup(connection.execute_wrappers.remove, timing.time_queries)
+
+    def view(self, request):
+        list(OutboxEmail.objects.all())
+        list(OutboxEmail.objects.all())
+        body = Template('Hello {{ name }}').render(Context({'name': 'Ada'}))
+        EmailMessage('Subject', body, 'from@example.com', ['to@example.com']).send()
+        return HttpResponse(body)
+
+    def test_sampled_request_reports_timings(self):
+        middleware = RequestTimingMiddleware(self.view)
+        with self.assertLogs('apps.common.timing', 'INFO') as logs:
+            response = middleware(RequestFactory().get('/timed/'))
+
+        entries = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(list(entries), ['total', 'db', 'tpl', 'email'])
+        self.assertIn('desc="2 queries"', entries['db'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['path'], record['status'], record['queries']), ('/timed/', 200, 2))
+        for name in ('db', 'tpl', 'email'):
+            self.assertGreater(record[f'{name}_ms'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'] + record['tpl_ms'] + record['email_ms'])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_unsampled_requests_are_not_measured(self):
+        middleware = RequestTimingMiddleware(self.view)
+        with patch('apps.common.middleware.random.random', return_value=1.0), self.assertNoLogs('apps.common.timing'):
+            response = middleware(RequestFactory().get('/timed/'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_record_is_not_built_when_the_logger_is_off(self):
+        logger = logging.getLogger('apps.common.timing')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.WARNING)
+        with patch('apps.common.middleware.json.dumps') as dumps:
+            response = RequestTimingMiddleware(self.view)(RequestFactory().get('/timed/'))
+        dumps.assert_not_called()
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        with self.assertLogs('apps.common.timing', 'INFO'):
+            response = RequestTimingMiddleware(self.view)(RequestFactory().get('/timed/'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(self.view)
+
+
+@override_settings(QUERY_LOG=True, QUERY_LOG_SLOW_MS=0, QUERY_LOG_REPEAT_THRESHOLD=2)
+class QueryLogTests(TestCase):
+    def setUp(self):
+        querylog.instrument_connection(connection)
+        self.addCleanup(connection.execute_wrappers.remove, querylog.log_queries)
+
+    def view(self, request):
+        for pk in (1, 2, 3):
+            list(OutboxEmail.objects.filter(pk=pk))
+        list(OutboxEmail.objects.filter(subject='x'))
+        return HttpResponse()
+
+    def records(self, view):
+        with self.assertLogs('apps.common.querylog', 'INFO') as logs:
+            QueryLogMiddleware(view)(RequestFactory().get('/listed/'))
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_slow_statements_are_logged_with_their_plan(self):
+        slow = [record for record in self.records(self.view) if record['type'] == 'slow']
+        self.assertEqual(len(slow), 4)
+        self.assertEqual(slow[0]['endpoint'], 'GET /listed/')
+        self.assertIn('common_outboxemail', slow[0]['sql'])
+        self.assertRegex(slow[0]['plan'], r'SEARCH|SCAN') # SQLite's EXPLAIN QUERY PLAN
+
+    def test_repeated_templates_are_flagged(self):
+        repeated = [record for record in self.records(self.view) if record['type'] == 'repeated']
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0]['count'], 3)
+        self.assertIn('"id" = %s', repeated[0]['sql'])
+
+    def test_sql_template_collapses_in_lists(self):
+        self.assertEqual(
+            querylog.sql_template('SELECT * FROM t\n WHERE id IN (%s, %s,%s)'),
+            querylog.sql_template('SELECT * FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(querylog.sql_template('SELECT a FROM t WHERE id IN (%s, %s)'), 'SELECT a FROM t WHERE id IN (...)')
+
+    def test_report_command_summarises_by_endpoint(self):
+        records = [
+            {'type': 'slow', 'endpoint': 'POST /api/auth/login/', 'ms': 120.0, 'sql': 'SELECT 1', 'plan': 'SCAN t'},
+            {'type': 'slow', 'endpoint': 'POST /api/auth/login/', 'ms': 80.0, 'sql': 'SELECT 1', 'plan': None},
+            {'type': 'repeated', 'endpoint': 'GET /api/users/', 'count': 12, 'ms': 6.0, 'sql': 'SELECT 2'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as log:
+            log.write('\n'.join(json.dumps(record) for record in records) + '\nnot json\n')
+        self.addCleanup(os.remove, log.name)
+        out = StringIO()
+        call_command('query_log_report', log.name, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'POST /api/auth/login/')
+        self.assertIn('2 slow statements, 200.0 ms in total', lines[1])
+        self.assertIn('2x  mean 100.0 ms  max 120.0 ms  SELECT 1', lines[2])
+        self.assertEqual(lines[3].strip(), 'SCAN t')
+        self.assertEqual(lines[4], 'GET /api/users/')
+        self.assertIn('up to 12x per request', lines[6])
+
+    @override_settings(QUERY_LOG=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryLogMiddleware(self.view)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_TOKENS=False, PROFILING_MODE='cprofile', PROFILING_KEEP=2)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(PROFILING_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def view(self, request):
+        time.sleep(0.03)
+        return HttpResponse(sum(range(1000)))
+
+    def get(self, **extra):
+        request = RequestFactory().get('/profiled/', **extra)
+        request.resolver_match = type('Match', (), {'view_name': 'users:profiled'})()
+        return ProfilingMiddleware(self.view)(request)
+
+    def test_sampled_requests_are_saved_per_url_name(self):
+        self.get()
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('users_profiled.') and files[0].endswith('.prof'))
+        out = StringIO()
+        call_command('profile_report', stdout=out)
+        self.assertRegex(out.getvalue(), r'^users_profiled  1 \.prof  newest \d{8}T\d{6}')
+
+    def test_only_the_newest_profiles_are_kept(self):
+        for _ in range(4):
+            self.get()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    @override_settings(PROFILING_MODE='sample', PROFILING_INTERVAL_MS=1)
+    def test_stack_sampler_writes_collapsed_stacks(self):
+        self.get()
+        out = StringIO()
+        merged = os.path.join(self.directory, 'merged.txt')
+        call_command('profile_report', 'users_profiled', collapsed=merged, stdout=out)
+        self.assertIn('100.0%  apps.common.tests:view', out.getvalue()) # time.sleep has no Python frame
+        with open(merged) as stacks:
+            self.assertIn('apps.common.middleware:__call__;apps.common.tests:view ', stacks.read())
+
+    def test_report_aggregates_cprofile_stats(self):
+        self.get()
+        self.get()
+        out = StringIO()
+        call_command('profile_report', 'users_profiled', stdout=out)
+        self.assertIn('2 cProfile profiles', out.getvalue())
+        self.assertIn('tests.py', out.getvalue())
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_TOKENS=True)
+    def test_signed_token_triggers_a_profile(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(email='profiler@example.com', password='testpass123', is_staff=True)
+        self.assertNotIn('X-Profile', self.get(HTTP_X_PROFILE_TOKEN=f'{user.pk}:0:forged'))
+        self.assertEqual(os.listdir(self.directory) if os.path.isdir(self.directory) else [], [])
+        token = profiling.make_token(user)
+        response = self.get(HTTP_X_PROFILE_TOKEN=token)
+        self.assertEqual(os.listdir(self.directory), [response['X-Profile']])
+
+        user.is_staff = False # bumps token_version
+        user.save()
+        self.assertFalse(profiling.token_is_valid(token))
+        self.assertNotIn('X-Profile', self.get(HTTP_X_PROFILE_TOKEN=token))
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(self.view)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='')
+        override.enable()
+        self.addCleanup(override.disable)
+        metrics.store.reset()
+        self.addCleanup(metrics.store.reset)
+        self.counter = metrics.Counter('test_events_total', 'Test events.', ['kind'])
+        self.histogram = metrics.Histogram('test_seconds', 'Test latency.', buckets=(0.1, 1))
+        self.addCleanup(metrics.registry.pop, 'test_events_total')
+        self.addCleanup(metrics.registry.pop, 'test_seconds')
+
+    def exposed(self):
+        return [line for line in metrics.exposition().splitlines() if line.startswith('test_')]
+
+    def test_exposition_format(self):
+        self.counter.inc(kind='a')
+        self.counter.inc(2, kind='b"')
+        for value in (0.05, 0.1, 0.5, 3):
+            self.histogram.observe(value)
+        self.assertEqual(self.exposed(), [
+            'test_events_total{kind="a"} 1',
+            'test_events_total{kind="b\\""} 2',
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 3.65',
+            'test_seconds_count 4',
+        ])
+        self.assertIn('# TYPE test_seconds histogram', metrics.exposition())
+
+    def test_labels_must_match(self):
+        with self.assertRaises(ValueError):
+            self.counter.inc(other='x')
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork()')
+    def test_values_are_summed_across_processes(self):
+        self.counter.inc(kind='a')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self.counter.inc(5, kind='a')
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual(self.exposed()[0], 'test_events_total{kind="a"} 6')
+
+    def test_file_grows_and_is_reopened(self):
+        path = os.path.join(self.directory, 'metrics-1.db')
+        values = metrics.MmapValues(path)
+        for n in range(3000): # well past the initial 64 KiB
+            values.add(f'test_events_total\t\t{{kind="{n}"}}', n)
+        values.add('test_events_total\t\t{kind="7"}', 1)
+        reopened = metrics.MmapValues(path)
+        reopened.add('test_events_total\t\t{kind="7"}', 1)
+        self.assertEqual(dict(reopened.items())['test_events_total\t\t{kind="7"}'], 9)
+        self.assertEqual(len(dict(reopened.items())), 3000)
+
+    def test_endpoint(self):
+        self.counter.inc(kind='a')
+        self.assertEqual(self.client.get('/metrics', HTTP_HOST='localhost').status_code, 403) # no METRICS_TOKEN
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_HOST='localhost').status_code, 401)
+            response = self.client.get('/metrics', HTTP_HOST='localhost', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('test_events_total{kind="a"} 1', response.content.decode())
+
+
+class RecordingMiddleware:
+    """SITE_MIDDLEWARE entry for PathDispatchMiddlewareTests."""
+    calls = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.calls.append(('call', request.path))
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.calls.append(('view', request.path))
+
+    def process_exception(self, request, exception):
+        self.calls.append(('exception', request.path))
+        return HttpResponse('handled', status=418)
+
+
+@override_settings(
+    API_FAST_PATH_PREFIXES=['/api/'],
+    SITE_MIDDLEWARE=[
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'apps.common.tests.RecordingMiddleware',
+    ],
+)
+class PathDispatchMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        RecordingMiddleware.calls = []
+
+    def view(self, request):
+        messages.info(request, 'Saved.')
+        return HttpResponse(f"{hasattr(request, 'session')} {len(messages.get_messages(request))}")
+
+    def test_api_requests_skip_site_middleware(self):
+        middleware = PathDispatchMiddleware(self.view)
+        request = RequestFactory().get('/api/auth/user/')
+        self.assertIsNone(middleware.process_view(request, self.view, (), {}))
+        response = middleware(request)
+        self.assertEqual(response.content, b'False 0')
+        self.assertIsInstance(request._messages, DiscardedMessages)
+        self.assertEqual(RecordingMiddleware.calls, [])
+
+    def test_other_requests_run_site_middleware(self):
+        middleware = PathDispatchMiddleware(self.view)
+        request = RequestFactory().get('/admin/')
+        response = middleware(request)
+        self.assertIsNone(middleware.process_view(request, self.view, (), {}))
+        self.assertEqual(response.content, b'True 1')
+        self.assertEqual(RecordingMiddleware.calls, [('call', '/admin/'), ('view', '/admin/')])
+
+    def test_exception_hooks_run_for_every_request(self):
+        middleware = PathDispatchMiddleware(self.view)
+        for path in ('/api/auth/user/', '/admin/'):
+            response = middleware.process_exception(RequestFactory().get(path), ValueError())
+            self.assertEqual(response.status_code, 418)
+
+    def test_async_chain(self):
+        async def view(request):
+            return HttpResponse(str(hasattr(request, 'session')))
+
+        with self.assertRaisesMessage(ImproperlyConfigured, 'RecordingMiddleware'):
+            PathDispatchMiddleware(view)
+        with override_settings(SITE_MIDDLEWARE=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+        ]):
+            middleware = PathDispatchMiddleware(view)
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/api/')).content, b'False')
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/accounts/')).content, b'True')
+        process_view = async_to_sync(middleware.process_view)
+        self.assertIsNone(process_view(RequestFactory().post('/api/'), view, (), {}))
+        self.assertEqual(process_view(RequestFactory().post('/accounts/'), view, (), {}).status_code, 403)
+
+    @override_settings(API_FAST_PATH_PREFIXES=[])
+    def test_without_prefixes_everything_runs_site_middleware(self):
+        self.assertEqual(PathDispatchMiddleware(self.view)(RequestFactory().get('/api/')).content, b'True 1')
+
+    def test_checks_look_in_site_middleware(self):
+        found = checks.check_admin_middleware(None) + checks.check_security_middleware(None)
+        self.assertEqual([message.id for message in found], ['common.E001', 'common.W002', 'common.W003'])
+        with override_settings(SITE_MIDDLEWARE=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+            'django.middleware.clickjacking.XFrameOptionsMiddleware',
+        ]):
+            self.assertEqual(checks.check_admin_middleware(None) + checks.check_security_middleware(None), [])
+            with override_settings(CSRF_COOKIE_SECURE=False, X_FRAME_OPTIONS='SAMEORIGIN'):
+                found = checks.check_site_middleware_settings(None)
+            self.assertEqual([message.id for message in found], ['common.W016', 'common.W019'])
+            with override_settings(CSRF_COOKIE_SECURE=True, X_FRAME_OPTIONS='DENY'):
+                self.assertEqual(checks.check_site_middleware_settings(None), [])
+        with override_settings(CSRF_COOKIE_SECURE=False, X_FRAME_OPTIONS='SAMEORIGIN', SITE_MIDDLEWARE=[]):
+            self.assertEqual(checks.check_site_middleware_settings(None), [])
+
+    def test_session_authentication_is_refused(self):
+        with override_settings(REST_FRAMEWORK={
+            'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework.authentication.SessionAuthentication'],
+        }):
+            with self.assertRaises(ImproperlyConfigured):
+                PathDispatchMiddleware(self.view)
@@ -0,0 +1,106 @@
+# backend/apps/common/timing.py
+"""
+Per-request timings for RequestTimingMiddleware: total time, SQL query count
+and time, template render time and email send time.
+
+The measurements only run for sampled requests: everything below looks up
+the current request's RequestTimings in a ContextVar and does nothing when
+there is none. With REQUEST_TIMING_SAMPLE_RATE at 0 the middleware removes
+itself at startup and none of the hooks are installed.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.template.base import Template
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Durations in seconds per metric, plus the number of SQL queries."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {'db': 0.0, 'tpl': 0.0, 'email': 0.0}
+        self.queries = 0
+        self._active = set()
+
+    def add(self, metric, seconds):
+        self.durations[metric] = self.durations.get(metric, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, metric):
+        # Nested measurements of one metric (templates including templates,
+        # a send inside a send) count once, at the outermost level.
+        if metric in self._active:
+            yield
+            return
+        self._active.add(metric)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(metric, time.perf_counter() - started)
+            self._active.discard(metric)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def measure(metric):
+    """Adds the block's duration to `metric` of the current sampled request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(metric):
+        yield
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper (see instrument_connection) counting and timing queries."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+        timings.queries += 1
+
+
+def instrument_connection(connection):
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def _wrap(function, metric):
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return function(*args, **kwargs)
+        with measure(metric):
+            return function(*args, **kwargs)
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+def install():
+    """
+    Times template rendering (django.template.base.Template.render, which
+    the Django backend and apps.common.email_templates both go through) and
+    email sending (EmailMessage.send). Safe to call more than once.
+    """
+    if not hasattr(Template.render, '__wrapped__'):
+        Template.render = _wrap(Template.render, 'tpl')
+    if not hasattr(EmailMessage.send, '__wrapped__'):
+        EmailMessage.send = _wrap(EmailMessage.send, 'email')
+
+
+def is_enabled():
+    return settings.REQUEST_TIMING_SAMPLE_RATE > 0
@@ -1,16 +1,177 @@
 # backend/apps/common/utils.py
-import secrets
+import os
 import string
+import threading
+import time
 
 BASE62_ALPHABET = string.digits + string.ascii_letters # 0-9a-zA-Z
+# Same symbols in ASCII order, so fixed-width strings sort like the numbers they encode.
+BASE62_SORTED_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+
+# Rejection sampling: 248 == 4 * 62, so mapping bytes 0..247 with `b % 62` is
+# uniform. Bytes 248..255 are dropped (about 3% of the input).
+_BASE62_REJECT = bytes(range(248, 256))
+_BASE62_TABLE = bytes(ord(BASE62_ALPHABET[b % 62]) for b in range(248)) + bytes(8)
+
+
+def _base62_bytes(count):
+    """
+    Returns `count` uniformly distributed Base62 characters as ASCII bytes.
+    Reads os.urandom in blocks and maps them in C via bytes.translate.
+    """
+    chunks = []
+    remaining = count
+    while remaining > 0:
+        # Over-draw slightly so a single read is almost always enough.
+        raw = os.urandom(remaining + remaining // 16 + 16)
+        accepted = raw.translate(_BASE62_TABLE, _BASE62_REJECT)[:remaining]
+        chunks.append(accepted)
+        remaining -= len(accepted)
+    return b''.join(chunks)
+
+
+def generate_base62_ids(count, length):
+    """
+    Generates `count` cryptographically secure Base62 strings of `length`
+    characters from a single os.urandom block.
+    """
+    if length <= 0:
+        raise ValueError("Length must be a positive integer.")
+    if count <= 0:
+        return []
+    data = _base62_bytes(count * length).decode('ascii')
+    return [data[i:i + length] for i in range(0, count * length, length)]
+
+
+class Base62IDBuffer:
+    """
+    Per-process buffer of pre-generated Base62 IDs of a fixed length.
+    Refills `batch_size` IDs at a time. Thread-safe, and emptied in forked
+    children so two worker processes never hand out the same buffered IDs.
+    """
+
+    def __init__(self, length=30, batch_size=256):
+        self.length = length
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._ids = []
+
+    def take(self):
+        with self._lock:
+            if not self._ids:
+                self._ids = generate_base62_ids(self.batch_size, self.length)
+            return self._ids.pop()
+
+    def reset(self):
+        # Called in the child after fork(); the parent's lock may have been held
+        # by another thread at fork time, so it is replaced rather than acquired.
+        self._lock = threading.Lock()
+        self._ids = []
+
+
+_id_buffer = Base62IDBuffer()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_id_buffer.reset)
+
 
 def generate_base62_id(length):
     """
     Generates a cryptographically secure Base62 string of a given length.
+    The common 30-character case is served from the per-process buffer.
     """
     if length <= 0:
         raise ValueError("Length must be a positive integer.")
-    return ''.join(secrets.choice(BASE62_ALPHABET) for _ in range(length))
+    if length == _id_buffer.length:
+        return _id_buffer.take()
+    return generate_base62_ids(1, length)[0]
+
+
+def encode_base62(number, width, alphabet=BASE62_SORTED_ALPHABET):
+    """
+    Encodes a non-negative integer as a fixed-width Base62 string.
+    """
+    if number < 0 or number >= 62 ** width:
+        raise ValueError(f"{number} does not fit in {width} Base62 characters.")
+    chars = []
+    for _ in range(width):
+        number, remainder = divmod(number, 62)
+        chars.append(alphabet[remainder])
+    return ''.join(reversed(chars))
+
+
+def decode_base62(value, alphabet=BASE62_SORTED_ALPHABET):
+    """
+    Decodes a Base62 string back to an integer.
+    """
+    number = 0
+    for char in value:
+        index = alphabet.find(char)
+        if index < 0:
+            raise ValueError(f"Invalid Base62 character {char!r}.")
+        number = number * 62 + index
+    return number
+
+
+class OrderedIDGenerator:
+    """
+    Generates k-sortable Base62 IDs, similar to ULID: an 8-character
+    millisecond timestamp followed by random characters.
+    Within a process IDs are strictly increasing. If several IDs are drawn in
+    the same millisecond (or the clock goes backwards) the random part of the
+    previous ID is incremented instead of drawing a new one.
+    """
+    TIMESTAMP_LENGTH = 8 # 62**8 ms is roughly 6,900 years
+
+    def __init__(self, length=30):
+        if length <= self.TIMESTAMP_LENGTH:
+            raise ValueError(f"Length must be greater than {self.TIMESTAMP_LENGTH}.")
+        self.random_length = length - self.TIMESTAMP_LENGTH
+        self._random_limit = 62 ** self.random_length
+        self.reset()
+
+    def next(self):
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = decode_base62(_base62_bytes(self.random_length).decode('ascii'), BASE62_ALPHABET)
+            else:
+                self._last_random += 1
+                if self._last_random >= self._random_limit:
+                    self._last_ms += 1
+                    self._last_random = 0
+            return (
+                encode_base62(self._last_ms, self.TIMESTAMP_LENGTH)
+                + encode_base62(self._last_random, self.random_length)
+            )
+
+    def reset(self):
+        # Also runs in forked children: they must not continue the parent's sequence.
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+
+_ordered_generators = {}
+
+
+def generate_ordered_base62_id(length):
+    """
+    Generates a time-ordered Base62 string of a given length (see OrderedIDGenerator).
+    """
+    generator = _ordered_generators.get(length)
+    if generator is None:
+        generator = _ordered_generators.setdefault(length, OrderedIDGenerator(length))
+    return generator.next()
+
+
+def _reset_ordered_generators():
+    for generator in _ordered_generators.values():
+        generator.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_ordered_generators)
 
 # Example Usage:
-# new_id = generate_base62_id(30) # Generates a 30-character Base62 string
\ No newline at end of file
+# new_id = generate_base62_id(30) # Generates a 30-character Base62 string
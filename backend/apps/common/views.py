@@ -1,3 +1,25 @@
-from django.shortcuts import render
+# backend/apps/common/views.py
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+
+from . import metrics as metrics_registry
+
+
+def metrics(request):
+    """
+    The metrics registry (apps/common/metrics.py) in the Prometheus text
+    format. Scrapes must send METRICS_TOKEN as a bearer token; without one
+    configured the endpoint is closed.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if not settings.METRICS_TOKEN:
+        return HttpResponse('Forbidden: METRICS_TOKEN is not set\n', content_type='text/plain', status=403)
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+        return HttpResponse('Unauthorized\n', content_type='text/plain', status=401)
+    response = HttpResponse(metrics_registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
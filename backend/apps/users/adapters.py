@@ -1,8 +1,102 @@
 # backend/apps/users/adapters.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from allauth.account import app_settings as allauth_account_settings
 from allauth.account.adapter import DefaultAccountAdapter
+from allauth.account.models import EmailAddress
+from allauth.core import context
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.mail import get_connection
+from django.db import transaction
 from django.urls import reverse
 
+from apps.common.email_templates import render_email
+from apps.common.mail import OutboxEmailBackend
+from apps.common.timing import measure
+
+from . import metrics
+
+_collected_mail = ContextVar('collected_mail', default=None)
+
+
+@contextmanager
+def collect_mail():
+    """
+    Inside this block CustomAccountAdapter renders emails into the yielded
+    list instead of sending them, so async views can send them afterwards
+    with asend_messages().
+    """
+    messages = []
+    token = _collected_mail.set(messages)
+    try:
+        yield messages
+    finally:
+        _collected_mail.reset(token)
+
+
+async def asend_messages(messages):
+    """
+    Sends emails without blocking the event loop. The SMTP round trip runs
+    on an executor thread of its own (thread_sensitive=False), not on the
+    thread that serialises sync views and ORM calls under ASGI. The outbox
+    backend only inserts rows, so it stays on that thread like other ORM calls.
+    """
+    if messages:
+        connection = get_connection()
+        thread_sensitive = isinstance(connection, OutboxEmailBackend)
+        with measure('email'), _counting_failures(messages):
+            await sync_to_async(connection.send_messages, thread_sensitive=thread_sensitive)(messages)
+
+
+@contextmanager
+def mail_on_commit():
+    """
+    Emails CustomAccountAdapter renders inside this block are sent once the
+    surrounding transaction commits, so no SMTP round trip runs while it
+    holds its locks. The outbox backend only inserts rows, so it writes them
+    inside the transaction. Within collect_mail() (the async views) the
+    emails are left to that block.
+    """
+    if _collected_mail.get() is not None:
+        yield
+        return
+    with collect_mail() as messages:
+        yield
+    if messages and not queue_in_outbox(messages):
+        transaction.on_commit(partial(_send_messages, get_connection(), messages))
+
+
+def queue_in_outbox(messages):
+    """
+    With the outbox backend, writes `messages` to it in the current
+    transaction and returns True. Otherwise returns False and leaves them to
+    the caller, to send once the transaction has committed.
+    """
+    connection = get_connection()
+    if not isinstance(connection, OutboxEmailBackend):
+        return False
+    _send_messages(connection, messages)
+    return True
+
+
+def _send_messages(connection, messages):
+    with measure('email'), _counting_failures(messages):
+        connection.send_messages(messages)
+
+
+@contextmanager
+def _counting_failures(messages):
+    try:
+        yield
+    except Exception:
+        metrics.email_failures.inc(len(messages))
+        raise
+
 
 class CustomAccountAdapter(DefaultAccountAdapter):
     """Custom adapter to redirect email confirmation links to frontend"""
@@ -15,22 +109,64 @@ class CustomAccountAdapter(DefaultAccountAdapter):
         key = emailconfirmation.key
         return f"{frontend_url}/confirm-email/{key}"
     
+    def confirm_email(self, request, email_address):
+        """
+        Marks the address verified (allauth) and stamps the user's
+        email_verified_at the first time any of their addresses is confirmed,
+        with one conditional UPDATE (UserManager.stamp_email_verified): no
+        user SELECT, no save() signals.
+        """
+        confirmed = super().confirm_email(request, email_address)
+        if confirmed:
+            now = get_user_model().objects.stamp_email_verified([email_address.user_id])
+            if now is not None and EmailAddress.user.is_cached(email_address):
+                email_address.user.email_verified_at = email_address.user.updated_at = now
+        return confirmed
+
+    @transaction.atomic(savepoint=False)
     def send_confirmation_mail(self, request, emailconfirmation, signup):
         """
         Send email confirmation with frontend URL and invalidate old tokens
         """
-        # SECURITY: Invalidate any old confirmation tokens before sending new email
-        from allauth.account.models import EmailConfirmation
-        
-        # Get all existing confirmations for this email address (excluding the current one)
-        old_confirmations = EmailConfirmation.objects.filter(
-            email_address=emailconfirmation.email_address
-        ).exclude(key=emailconfirmation.key)
-        
-        deleted_count = old_confirmations.count()
-        if deleted_count > 0:
-            old_confirmations.delete()
+        # SECURITY: Invalidate any old confirmation tokens before sending new email.
+        # An address created at signup has none yet.
+        if not signup:
+            from allauth.account.models import EmailConfirmation
+
+            EmailConfirmation.objects.filter(
+                email_address=emailconfirmation.email_address
+            ).exclude(key=emailconfirmation.key).delete()
         
         # This ensures the confirmation URL uses our frontend URL
+        metrics.emails.inc(kind='verification')
         return super().send_confirmation_mail(request, emailconfirmation, signup)
+
+    def render_mail(self, template_prefix, email, context, headers=None):
+        """
+        Same message as DefaultAccountAdapter.render_mail, from templates
+        compiled once per process (see apps/common/email_templates.py).
+        """
+        message = render_email(
+            template_prefix, email, context,
+            from_email=self.get_from_email(),
+            headers=headers,
+            html_ext=allauth_account_settings.TEMPLATE_EXTENSION,
+        )
+        message.subject = self.format_email_subject(message.subject)
+        return message
+
+    def send_mail(self, template_prefix, email, context_data):
+        messages = _collected_mail.get()
+        if messages is None:
+            with _counting_failures([email]):
+                return super().send_mail(template_prefix, email, context_data)
+        # Same rendering as DefaultAccountAdapter.send_mail, minus msg.send().
+        request = context.request
+        ctx = {
+            'request': request,
+            'email': email,
+            'current_site': get_current_site(request),
+        }
+        ctx.update(context_data)
+        messages.append(self.render_mail(template_prefix, email, ctx))
     
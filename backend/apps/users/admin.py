@@ -1,4 +1,6 @@
 # backend/apps/users/admin.py
+from allauth.account.admin import EmailAddressAdmin as BaseEmailAddressAdmin # registers it, so it can be replaced
+from allauth.account.models import EmailAddress
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User
@@ -31,4 +33,23 @@ class UserAdmin(BaseUserAdmin):
     )
     readonly_fields = ('id', 'last_login', 'date_joined')
 
-    # If you had 'username' in filter_horizontal or other places, remove it.
\ No newline at end of file
+    # If you had 'username' in filter_horizontal or other places, remove it.
+
+
+admin.site.unregister(EmailAddress)
+
+
+@admin.register(EmailAddress)
+class EmailAddressAdmin(BaseEmailAddressAdmin):
+    """allauth's admin, stamping email_verified_at (User.objects.stamp_email_verified) on verification."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.verified:
+            User.objects.stamp_email_verified([obj.user_id])
+
+    def make_verified(self, request, queryset):
+        super().make_verified(request, queryset)
+        User.objects.stamp_email_verified(queryset.filter(verified=True).values_list('user_id', flat=True))
+
+    make_verified.short_description = BaseEmailAddressAdmin.make_verified.short_description
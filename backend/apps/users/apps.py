@@ -1,10 +1,16 @@
 # backend/apps/users/apps.py
 from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_in
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField' # Or your SemanticIDField if it were not PK
     name = 'apps.users'
     
     def ready(self):
-        """Import signals when the app is ready"""
-        import apps.users.signals
\ No newline at end of file
+        """Import signals and checks when the app is ready"""
+        import apps.users.checks
+        import apps.users.signals
+        # Coalesced last_login writes (apps/users/logins.py) replace auth's
+        # per-login UPDATE. Needs django.contrib.auth to be ready first
+        # (listed earlier in INSTALLED_APPS); users.E001 catches the opposite.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
@@ -0,0 +1,120 @@
+# backend/apps/users/async_views.py
+"""
+Async versions of the user and email endpoints, routed instead of the views
+in views.py when USE_ASYNC_VIEWS is on (the default under asgi.py). They run
+on the event loop instead of taking a sync_to_async hop per request, and
+send email without holding the thread that sync views and ORM calls share.
+Plain Django views, since DRF views are sync only; error bodies follow DRF's
+{"detail": ...} shape.
+"""
+import json
+
+from allauth.account.adapter import get_adapter
+from allauth.account.models import EmailAddress, EmailConfirmation
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .adapters import asend_messages, collect_mail, queue_in_outbox
+from .cache import auser_detail_response, auser_details
+from .views import CustomRegisterView, _protected_user_payload, _session_authentication, session_response
+
+
+def _unauthorized(detail):
+    response = JsonResponse(detail if isinstance(detail, dict) else {'detail': detail}, status=401)
+    response['WWW-Authenticate'] = 'Bearer realm="api"'
+    return response
+
+
+async def protected_user_detail(request):
+    """Async protected_user_detail: no queries when the payload is cached."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        result = await _session_authentication.aauthenticate(request)
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return _unauthorized(exc.detail)
+    if result is None:
+        return _unauthorized('Authentication credentials were not provided.')
+    return await auser_detail_response(request, result[0], 'protected', _protected_user_payload)
+
+
+async def session_introspection(request):
+    """Async session_introspection (see views.session_introspection)."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        result = await _session_authentication.aauthenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        result = None
+    details = None if result is None else await auser_details(result[0])
+    return session_response(result, details)
+
+
+@csrf_exempt
+async def resend_email_verification(request):
+    """
+    Async CustomResendEmailVerificationView: the key rotation and email
+    rendering (plus the outbox insert with EMAIL_OUTBOX) run in one
+    transaction in one sync hop; SMTP sends happen after the commit without
+    blocking.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        email = json.loads(request.body or b'{}').get('email')
+    except (ValueError, AttributeError):
+        email = None
+    if not email:
+        return JsonResponse({'detail': 'Email is required.'}, status=400)
+
+    email_address = await EmailAddress.objects.select_related('user').filter(email=email).afirst()
+    if not email_address:
+        # For security, don't reveal if email exists - just return success
+        return JsonResponse({'detail': 'If this email is registered, a verification email will be sent.'})
+    if email_address.verified:
+        return JsonResponse({'detail': 'Email address is already verified.'}, status=400)
+
+    def rotate_key():
+        # One transaction, so with EMAIL_OUTBOX the queued email commits
+        # together with the new key, and a failure keeps the old one.
+        with transaction.atomic(), collect_mail() as messages:
+            # SECURITY: Delete any existing confirmation tokens for this email
+            EmailConfirmation.objects.filter(email_address=email_address).delete()
+            confirmation = EmailConfirmation.objects.create(
+                email_address=email_address,
+                key=get_adapter(request).generate_emailconfirmation_key(email_address.email),
+            )
+            confirmation.send(request, signup=False)
+            if queue_in_outbox(messages):
+                return []
+        return messages
+
+    try:
+        await asend_messages(await sync_to_async(rotate_key)())
+    except Exception:
+        return JsonResponse({'detail': 'Failed to send verification email.'}, status=500)
+    return JsonResponse({'detail': 'Verification email sent.'})
+
+
+_register_view = CustomRegisterView.as_view()
+
+
+@csrf_exempt
+async def register(request):
+    """
+    Async entry point for CustomRegisterView. allauth's signup flow (form
+    validation, password hashing, complete_signup) is sync, so it runs in a
+    single hop, rendered response included; the confirmation email it
+    produces is sent afterwards without blocking.
+    """
+    def run():
+        response = _register_view(request)
+        return response.render() if hasattr(response, 'render') else response
+
+    with collect_mail() as messages:
+        response = await sync_to_async(run)()
+    await asend_messages(messages)
+    return response
@@ -0,0 +1,138 @@
+# backend/apps/users/authentication.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+def add_user_claims(token, user):
+    """
+    Stamps the claims claims_user() is built from onto a token. Access tokens
+    copy them from their refresh token.
+    """
+    token['email'] = user.email
+    token['is_staff'] = user.is_staff
+    token['email_verified_at'] = user.email_verified_at.isoformat() if user.email_verified_at else None
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def token_version_cache_key(user_id):
+    return f'users:token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Returns the user's current token_version, or -1 (which no token carries)
+    if the user is gone or inactive. Cached for JWT_TOKEN_VERSION_CACHE_SECONDS;
+    the post_save handler in apps/users/signals.py deletes the entry when the
+    version is bumped.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = User._default_manager.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        version = row[0] if row and row[1] else -1
+        cache.set(key, version, settings.JWT_TOKEN_VERSION_CACHE_SECONDS)
+    return version
+
+
+async def aget_token_version(user_id):
+    """Async twin of get_token_version() for async views."""
+    key = token_version_cache_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        row = await User._default_manager.filter(pk=user_id).values_list('token_version', 'is_active').afirst()
+        version = row[0] if row and row[1] else -1
+        await cache.aset(key, version, settings.JWT_TOKEN_VERSION_CACHE_SECONDS)
+    return version
+
+
+def claims_user(token):
+    """
+    request.user built from a validated access token instead of the database:
+    a User (see User.from_claims) with id, email, is_staff and
+    email_verified_at from the token's claims. is_active and
+    token_version are known from the version check. Reading any other field
+    loads the rest of the row once, so the ORM takes it like a loaded user.
+    """
+    verified_at = token.get('email_verified_at')
+    return User.from_claims(token[jwt_settings.USER_ID_CLAIM], {
+        'email': token.get('email'),
+        'is_staff': token.get('is_staff', False),
+        'email_verified_at': parse_datetime(verified_at) if verified_at else None,
+        'is_active': True, # inactive users fail the token version check
+        'token_version': token[TOKEN_VERSION_CLAIM],
+    })
+
+
+async def aload_user(user):
+    """
+    Loads a claims_user()'s deferred fields from async code, where reading
+    one would raise SynchronousOnlyOperation. Other users are returned as is.
+    """
+    deferred = user.get_deferred_fields()
+    if deferred:
+        await user.arefresh_from_db(fields=list(deferred))
+    return user
+
+
+class StatelessJWTCookieAuthentication(JWTCookieAuthentication):
+    """
+    JWTCookieAuthentication that returns a claims_user() instead of querying the
+    User table on every request. The token's version claim is checked against
+    the cached token_version, so deactivation, password and permission changes
+    still revoke access tokens. Tokens issued without the claims fall back to
+    the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if validated_token[TOKEN_VERSION_CLAIM] != get_token_version(user_id):
+            raise AuthenticationFailed(_('Token is no longer valid'), code='token_version_mismatch')
+        return claims_user(validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views on a plain HttpRequest. Token checks
+        are CPU-only; the version lookup uses the async cache and ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            raw_token = request.COOKIES.get(rest_auth_settings.JWT_AUTH_COOKIE)
+            if rest_auth_settings.JWT_AUTH_COOKIE_ENFORCE_CSRF_ON_UNAUTHENTICATED or (
+                raw_token is not None and rest_auth_settings.JWT_AUTH_COOKIE_USE_CSRF
+            ):
+                self.enforce_csrf(request)
+        else:
+            raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            user = await User._default_manager.filter(pk=user_id).afirst()
+            if user is None or not user.is_active:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            return user, validated_token
+        if validated_token[TOKEN_VERSION_CLAIM] != await aget_token_version(user_id):
+            raise AuthenticationFailed(_('Token is no longer valid'), code='token_version_mismatch')
+        return claims_user(validated_token), validated_token
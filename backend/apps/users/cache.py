@@ -0,0 +1,126 @@
+# backend/apps/users/cache.py
+from dj_rest_auth.app_settings import api_settings
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import aload_user
+
+# Views whose payloads are cached per user; all are dropped on User post_save.
+USER_DETAIL_VIEWS = ('protected', 'details')
+
+
+def user_detail_cache_key(view_name, user_id):
+    return f'users:detail:{view_name}:{user_id}'
+
+
+def invalidate_user_details(user_id):
+    cache.delete_many([user_detail_cache_key(name, user_id) for name in USER_DETAIL_VIEWS])
+
+
+def _caching():
+    # Off (USER_DETAIL_CACHE_SECONDS=0) by default without CACHE_URL: a save
+    # drops the entry only in the saving process's LocMemCache.
+    return settings.USER_DETAIL_CACHE_SECONDS > 0
+
+
+def user_detail_response(request, view_name, build):
+    """
+    Conditional GET for a per-user payload. The ETag and Last-Modified come
+    from User.updated_at and are checked before `build(request.user)` runs;
+    both stamp and payload are cached per user until the next save (see
+    apps/users/signals.py) or USER_DETAIL_CACHE_SECONDS. A cache hit answers
+    without touching the database. With caching off (see _caching) every
+    request reads the user row, so workers never disagree on the ETag.
+    """
+    key = user_detail_cache_key(view_name, request.user.pk)
+    caching = _caching()
+    entry = cache.get(key) if caching else None
+    store = entry is None
+    if store:
+        entry = _new_entry(request.user)
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        if entry['data'] is None:
+            entry['data'] = build(request.user)
+            store = True
+        response = Response(entry['data'])
+    if store and caching:
+        cache.set(key, entry, settings.USER_DETAIL_CACHE_SECONDS)
+    return _add_validators(response, entry)
+
+
+async def auser_detail_response(request, user, view_name, build):
+    """
+    user_detail_response() for async views: the cache and the user row are
+    read without blocking, and the payload is rendered with DRF's encoder.
+    `build` must not query (it gets the loaded User).
+    """
+    key = user_detail_cache_key(view_name, user.pk)
+    caching = _caching()
+    entry = await cache.aget(key) if caching else None
+    store = entry is None
+    if store:
+        user = await aload_user(user)
+        entry = _new_entry(user)
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        if entry['data'] is None:
+            user = await aload_user(user)
+            entry['data'] = build(user)
+            store = True
+        response = JsonResponse(entry['data'], encoder=JSONEncoder)
+    if store and caching:
+        await cache.aset(key, entry, settings.USER_DETAIL_CACHE_SECONDS)
+    return _add_validators(response, entry)
+
+
+def user_details(user):
+    """
+    The /api/auth/user/ payload for `user`, read from the view's cache entry
+    (built and stored on a miss, which loads the user row).
+    """
+    if not _caching():
+        return api_settings.USER_DETAILS_SERIALIZER(user).data
+    key = user_detail_cache_key('details', user.pk)
+    entry = cache.get(key)
+    if entry is None or entry['data'] is None:
+        entry = entry or _new_entry(user)
+        entry['data'] = api_settings.USER_DETAILS_SERIALIZER(user).data
+        cache.set(key, entry, settings.USER_DETAIL_CACHE_SECONDS)
+    return entry['data']
+
+
+async def auser_details(user):
+    """user_details() for async views."""
+    if not _caching():
+        return api_settings.USER_DETAILS_SERIALIZER(await aload_user(user)).data
+    key = user_detail_cache_key('details', user.pk)
+    entry = await cache.aget(key)
+    if entry is None or entry['data'] is None:
+        user = await aload_user(user)
+        entry = entry or _new_entry(user)
+        entry['data'] = api_settings.USER_DETAILS_SERIALIZER(user).data
+        await cache.aset(key, entry, settings.USER_DETAIL_CACHE_SECONDS)
+    return entry['data']
+
+
+def _new_entry(user):
+    updated_at = user.updated_at
+    return {
+        'etag': f'"{user.pk}-{int(updated_at.timestamp() * 1_000_000)}"',
+        'last_modified': int(updated_at.timestamp()),
+        'data': None,
+    }
+
+
+def _add_validators(response, entry):
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Browsers keep the body and revalidate every time, getting a 304 back.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
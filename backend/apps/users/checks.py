@@ -0,0 +1,18 @@
+# backend/apps/users/checks.py
+from django.contrib.auth.signals import user_logged_in
+from django.core.checks import Error, register
+
+
+@register()
+def check_last_login_receiver(app_configs, **kwargs):
+    """
+    django.contrib.auth's update_last_login must be disconnected (see
+    UsersConfig.ready), or every login writes last_login a second time.
+    """
+    if any(lookup_key[0] == 'update_last_login' for lookup_key, *_ in user_logged_in.receivers):
+        return [Error(
+            "django.contrib.auth's update_last_login receiver is still connected.",
+            hint="List 'django.contrib.auth' before 'apps.users' in INSTALLED_APPS.",
+            id='users.E001',
+        )]
+    return []
@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 from django.urls import reverse
 
+from . import metrics
+
 
 if 'allauth' in settings.INSTALLED_APPS:
     from allauth.account import app_settings as allauth_account_settings
@@ -26,6 +29,7 @@ class ScaffoldPasswordResetForm(DefaultPasswordResetForm):
         self.users = filter_users_by_email(email, is_active=True)
         return self.cleaned_data["email"]
 
+    @transaction.atomic
     def save(self, request, **kwargs):
         current_site = get_current_site(request)
         email = self.cleaned_data['email']
@@ -68,6 +72,7 @@ class ScaffoldPasswordResetForm(DefaultPasswordResetForm):
             if url_generator:
                 context['reset_url'] = url_generator(request, user, temp_key)
             
+            metrics.emails.inc(kind='password_reset')
             get_adapter(request).send_mail(
                 template_prefix, email, context
             )
@@ -0,0 +1,136 @@
+# backend/apps/users/logins.py
+"""
+Coalesced last_login writes. A login only writes last_login when the stored
+value is older than LAST_LOGIN_GRANULARITY_SECONDS: a per-user cache key
+skips the database for repeat logins, and the UPDATE itself is conditional
+on the stored value, so processes that don't share a cache still write at
+most once per window. With LAST_LOGIN_FLUSH_SECONDS set, the writes are
+also buffered per process and flushed as one UPDATE by a timer thread.
+"""
+import atexit
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, DateTimeField, Q, Value, When
+from django.utils import timezone
+
+from .cache import invalidate_user_details
+
+
+def last_login_cache_key(user_id):
+    return f'users:last-login:{user_id}'
+
+
+def record_login(user):
+    """Sets user.last_login and writes it unless it was written within the granularity."""
+    now = timezone.now()
+    user.last_login = now
+    if not cache.add(last_login_cache_key(user.pk), True, settings.LAST_LOGIN_GRANULARITY_SECONDS):
+        return
+    if settings.LAST_LOGIN_FLUSH_SECONDS:
+        login_buffer.add(user.pk, now)
+    else:
+        write_last_logins({user.pk: now})
+
+
+def record_login_on_insert(user):
+    """
+    For a new user that is logged in as soon as it is inserted (signup):
+    sets last_login on the unsaved instance so the INSERT writes it, and
+    marks it recorded so the login that follows issues no UPDATE.
+    """
+    user.last_login = timezone.now()
+    cache.set(last_login_cache_key(user.pk), True, settings.LAST_LOGIN_GRANULARITY_SECONDS)
+
+
+def write_last_logins(logins):
+    """
+    Writes `{user_id: login_time}` in one UPDATE, skipping users whose stored
+    last_login is within the granularity of their login time. Returns the
+    number of rows written.
+    """
+    if not logins:
+        return 0
+    granularity = timedelta(seconds=settings.LAST_LOGIN_GRANULARITY_SECONDS)
+    if len(logins) == 1:
+        [(user_id, login)] = logins.items()
+        last_login, cutoff = login, login - granularity
+    else:
+        last_login = Case(
+            *[When(pk=user_id, then=Value(login)) for user_id, login in logins.items()],
+            output_field=DateTimeField(),
+        )
+        cutoff = Case(
+            *[When(pk=user_id, then=Value(login - granularity)) for user_id, login in logins.items()],
+            output_field=DateTimeField(),
+        )
+    written = get_user_model().objects.filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=cutoff), pk__in=list(logins),
+    ).update(last_login=last_login, updated_at=last_login)
+    if written:
+        for user_id in logins:
+            invalidate_user_details(user_id)
+    return written
+
+
+class LoginBuffer:
+    """
+    Per-process buffer of pending last_login writes. Flushed by a daemon
+    timer LAST_LOGIN_FLUSH_SECONDS after the first pending login, by the
+    login that fills it to `max_size` users, and at interpreter exit; a
+    process killed outright loses at most one interval of last_login stamps.
+    """
+
+    def __init__(self, max_size=500):
+        self.max_size = max_size
+        self.reset()
+
+    def reset(self):
+        # Also runs in forked children, where the parent's lock may be held.
+        if getattr(self, '_timer', None) is not None:
+            self._timer.cancel()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def add(self, user_id, login):
+        with self._lock:
+            self._pending[user_id] = login
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(settings.LAST_LOGIN_FLUSH_SECONDS, self._flush_on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            write_last_logins(batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        return write_last_logins(batch)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all() # this thread's connections only
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel() # no-op when called from the timer itself
+        batch, self._pending, self._timer = self._pending, {}, None
+        return batch
+
+
+login_buffer = LoginBuffer()
+atexit.register(login_buffer.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=login_buffer.reset)
@@ -0,0 +1,298 @@
+import itertools
+import json
+import queue
+import random
+import tempfile
+import threading
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+from allauth.account.models import EmailAddress
+from dj_rest_auth.app_settings import api_settings
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+from benchmarks.harness import format_row, run_load
+
+PASSWORD = 'Bench-password-123'
+HOST = 'localhost'
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    Serves requests on `threads` long-lived threads, so database connections
+    are reused between requests (per CONN_MAX_AGE) as under gunicorn's
+    gthread workers; a thread per request would connect every time.
+    """
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietRequestHandler, ipv6=False, allow_reuse_address=True)
+        self.queue = queue.SimpleQueue()
+        self.threads = [threading.Thread(target=self._work, name='bench-server', daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def process_request(self, request, client_address):
+        self.queue.put((request, client_address))
+
+    def _work(self):
+        try:
+            while (item := self.queue.get()) is not None:
+                request, client_address = item
+                try:
+                    self.finish_request(request, client_address)
+                except Exception:
+                    self.handle_error(request, client_address)
+                finally:
+                    self.shutdown_request(request)
+        finally:
+            # The test database cannot be dropped while these are open.
+            connections.close_all()
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+class QueryCounter:
+    """
+    Counts the statements of every connection opened while installed, except
+    the SQLITE_TUNED PRAGMAs each new SQLite connection runs (with
+    CONN_MAX_AGE=0 that is every request, which would hide the view's own).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith('PRAGMA'):
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def instrument(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the auth API end to end. Seeds users into a scratch test "
+        "database (SQLite, or PostgreSQL when DATABASE_URL points at one), "
+        "serves the project over HTTP on a local port and drives each endpoint "
+        "with concurrent clients. Reports throughput, p50/p95/p99 and SQL "
+        "statements per request, optionally against a saved baseline."
+    )
+
+    endpoints = ('registration', 'login', 'token_refresh', 'user_details', 'protected', 'resend_email', 'password_reset')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4, help='client threads (and server threads)')
+        parser.add_argument('--users', type=int, default=500, help='users to seed')
+        parser.add_argument('--endpoint', action='append', choices=self.endpoints, dest='only', help='run only these (repeatable)')
+        parser.add_argument(
+            '--configured-hasher', action='store_true',
+            help="keep PASSWORD_HASHERS; by default MD5 is used so hashing does not hide everything else",
+        )
+        parser.add_argument('--baseline', metavar='PATH', help='compare with this saved run')
+        parser.add_argument('--save', metavar='PATH', help='save this run as a baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 and throughput change (fraction)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='exit with an error on regressions')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        if not options['configured_hasher']:
+            settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        mail.outbox = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # A file rather than the test runner's in-memory database, like a deployment.
+                connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(tmp) / 'bench_auth.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                results = self.run(options)
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        run = {
+            'meta': {
+                'vendor': connection.vendor,
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'hasher': settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1],
+            },
+            'endpoints': results,
+        }
+        if options['save']:
+            Path(options['save']).write_text(json.dumps(run, indent=2) + '\n')
+            self.stdout.write(f"Saved to {options['save']}")
+        if baseline is not None:
+            regressions = self.compare(run, baseline, options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"Regressions: {', '.join(regressions)}")
+
+    def seed(self, count):
+        User = get_user_model()
+        password = make_password(PASSWORD) # hashed once for everyone
+        users = [
+            User(id=User._meta.pk.new_id(), email=f'bench{n}@example.com', password=password)
+            for n in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=500)
+        EmailAddress.objects.bulk_create(
+            [EmailAddress(user=user, email=user.email, verified=n % 2 == 0, primary=True) for n, user in enumerate(users)],
+            batch_size=500,
+        )
+        return users
+
+    def run(self, options):
+        users = self.seed(options['users'])
+        verified = [user.email for user in users[0::2]]
+        unverified = [user.email for user in users[1::2]]
+        tokens = [ClaimsTokenObtainPairSerializer.get_token(user) for user in users[:50]]
+        access_tokens = [str(token.access_token) for token in tokens]
+        concurrency = options['concurrency']
+        # One rotation chain per client thread (of the warm-up and the measured
+        # run), issued here rather than through the server.
+        refresh_chains = iter([
+            str(ClaimsTokenObtainPairSerializer.get_token(users[n % len(users)])) for n in range(concurrency * 2)
+        ])
+        registrations = itertools.count()
+
+        access_cookie = api_settings.JWT_AUTH_COOKIE
+        refresh_cookie = api_settings.JWT_AUTH_REFRESH_COOKIE
+
+        def body(data):
+            return json.dumps(data)
+
+        scenarios = {
+            'registration': lambda state: ('POST', '/api/auth/custom-registration/', body({
+                'email': f'bench-new{next(registrations)}@example.com', 'password1': PASSWORD, 'password2': PASSWORD,
+            }), {}, 201),
+            'login': lambda state: ('POST', '/api/auth/login/', body({
+                'email': random.choice(verified), 'password': PASSWORD,
+            }), {}, 200),
+            'token_refresh': lambda state: ('POST', '/api/auth/token/refresh/', None, {
+                refresh_cookie: state['refresh'] if 'refresh' in state else state.setdefault('refresh', next(refresh_chains)),
+            }, 200),
+            'user_details': lambda state: ('GET', '/api/auth/user/', None, {access_cookie: random.choice(access_tokens)}, 200),
+            'protected': lambda state: ('GET', '/api/users/protected/', None, {access_cookie: random.choice(access_tokens)}, 200),
+            'resend_email': lambda state: ('POST', '/api/auth/custom-registration/resend-email/', body({
+                'email': random.choice(unverified),
+            }), {}, 200),
+            'password_reset': lambda state: ('POST', '/api/auth/password/reset/', body({
+                'email': random.choice(verified),
+            }), {}, 200),
+        }
+
+        server = PooledWSGIServer(('127.0.0.1', 0), concurrency)
+        server.set_app(get_wsgi_application())
+        port = server.server_address[1]
+        serving = threading.Thread(target=server.serve_forever, name='bench-server', daemon=True)
+        serving.start()
+        counter = QueryCounter()
+        connection_created.connect(counter.instrument)
+        errors = []
+
+        def request_once(build):
+            def send(state):
+                method, path, data, cookies, expected = build(state)
+                headers = {'Host': HOST}
+                if data is not None:
+                    headers['Content-Type'] = 'application/json'
+                if cookies:
+                    headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in cookies.items())
+                client = HTTPConnection('127.0.0.1', port, timeout=30)
+                try:
+                    client.request(method, path, body=data, headers=headers)
+                    response = client.getresponse()
+                    response.read()
+                finally:
+                    client.close()
+                if response.status != expected:
+                    errors.append(response.status)
+                    return
+                if refresh_cookie in cookies:
+                    # Follow the rotation: the old refresh token is now blacklisted.
+                    jar = SimpleCookie()
+                    for header in response.headers.get_all('Set-Cookie') or ():
+                        jar.load(header)
+                    if refresh_cookie in jar:
+                        state['refresh'] = jar[refresh_cookie].value
+            return send
+
+        results = {}
+        self.stdout.write(
+            f"{connection.vendor}, {options['requests']} requests per endpoint, "
+            f"{concurrency} clients, {len(users)} seeded users"
+        )
+        try:
+            for name in options['only'] or self.endpoints:
+                send = request_once(scenarios[name])
+                run_load(send, min(50, options['requests']), concurrency) # warm-up
+                mail.outbox = []
+                counter.count = 0
+                errors.clear()
+                result = run_load(send, options['requests'], concurrency)
+                result['queries'] = counter.count / options['requests']
+                result['errors'] = len(errors)
+                results[name] = result
+                self.stdout.write(f"{format_row(name, result)}  {result['queries']:5.1f} queries/req  {result['errors']} errors")
+                if errors:
+                    self.stderr.write(f"    unexpected statuses: {sorted(set(errors))}")
+        finally:
+            connection_created.disconnect(counter.instrument)
+            server.shutdown()
+            server.server_close()
+        return results
+
+    def compare(self, run, baseline, tolerance):
+        """Prints the change against `baseline` per endpoint and returns the regressed endpoints."""
+        if baseline.get('meta') != run['meta']:
+            self.stdout.write(f"Note: baseline ran with {baseline.get('meta')}, this run with {run['meta']}.")
+        regressions = []
+        self.stdout.write("Against the baseline:")
+        for name, result in run['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(name)
+            if before is None:
+                self.stdout.write(f"  {name:<28} not in the baseline")
+                continue
+            rps = result['rps'] / before['rps'] - 1 if before['rps'] else 0.0
+            p95 = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0.0
+            queries = result['queries'] - before['queries']
+            regressed = rps < -tolerance or p95 > tolerance or queries > 0.05
+            if regressed:
+                regressions.append(name)
+            self.stdout.write(
+                f"  {name:<28} {rps:+8.1%} req/s  {p95:+8.1%} p95  {queries:+6.1f} queries"
+                + ("  REGRESSION" if regressed else "")
+            )
+        return regressions
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding and blacklisted tokens in small batches, "
+        "one short transaction per batch (unlike flushexpiredtokens, which "
+        "deletes everything in one statement)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help='seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        outstanding = blacklisted = 0
+        while True:
+            # Walks the primary key: expired tokens are the oldest rows, so each
+            # scan stops after the first --batch-size matches.
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f"Deleted {outstanding} expired outstanding tokens, {blacklisted} of them blacklisted.")
@@ -0,0 +1,40 @@
+# backend/apps/users/metrics.py
+"""Auth metrics, served at /metrics (see apps/common/metrics.py)."""
+import time
+from functools import wraps
+
+from apps.common.metrics import Counter, Histogram
+
+registrations = Counter('auth_registrations_total', 'Registration requests by outcome.', ['outcome'])
+registration_seconds = Histogram('auth_registration_seconds', 'Registration request latency.', ['outcome'])
+logins = Counter('auth_logins_total', 'Password login requests by outcome.', ['outcome'])
+login_seconds = Histogram('auth_login_seconds', 'Password login request latency.', ['outcome'])
+token_refreshes = Counter('auth_token_refreshes_total', 'Token refresh requests by outcome.', ['outcome'])
+token_refresh_seconds = Histogram('auth_token_refresh_seconds', 'Token refresh request latency.', ['outcome'])
+blacklist_hits = Counter('auth_blacklist_hits_total', 'Refresh tokens rejected as blacklisted.')
+emails = Counter('auth_emails_total', 'Auth emails rendered for sending, by kind.', ['kind'])
+email_failures = Counter('auth_email_failures_total', 'Auth emails the email backend failed to send.')
+
+
+def observe_posts(counter, histogram):
+    """
+    Decorates a view's dispatch() to count and time POST requests by
+    outcome: 'success' below status 400, 'failure' from 400 on (bad input,
+    bad credentials, throttling), 'error' for exceptions.
+    """
+    def decorator(dispatch):
+        @wraps(dispatch)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'POST':
+                return dispatch(self, request, *args, **kwargs)
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                response = dispatch(self, request, *args, **kwargs)
+                outcome = 'success' if response.status_code < 400 else 'failure'
+                return response
+            finally:
+                histogram.observe(time.perf_counter() - started, outcome=outcome)
+                counter.inc(outcome=outcome)
+        return wrapper
+    return decorator
@@ -0,0 +1,35 @@
+# backend/apps/users/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import reverse
+
+from . import async_views
+from .views import session_introspection
+
+
+class SessionIntrospectionMiddleware:
+    """
+    Serves /api/auth/session/ directly, skipping every middleware listed after
+    this one and URL resolution. Only SecurityMiddleware should come before it.
+    Under ASGI the async view answers without leaving the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path = reverse('session_introspection')
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path_info == self.path:
+            return session_introspection(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path_info == self.path:
+            return await async_views.session_introspection(request)
+        return await self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:20
+
+import apps.common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_add_email_verified_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=apps.common.fields.SemanticIDField(binary=True, blank=True, editable=False, prefix='US', primary_key=True, serialize=False, unique=True),
+        ),
+    ]
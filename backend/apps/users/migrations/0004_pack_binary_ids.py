@@ -0,0 +1,106 @@
+# Converts user IDs copied into the new binary columns by 0003 from their
+# 32-char text form to the packed 23-byte form, in the users_user primary key
+# and in every column that references it (allauth, simplejwt, auth M2M tables).
+
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+
+BATCH_SIZE = 1000 # IDs per UPDATE
+
+
+def _user_id_columns(User):
+    """Yields (table, column) for the primary key and every FK pointing at it."""
+    yield User._meta.db_table, User._meta.pk.column
+    opts = User._meta
+    for relation in opts.related_objects:
+        if relation.many_to_many:
+            through = relation.through
+        elif relation.field_name == opts.pk.name:
+            yield relation.related_model._meta.db_table, relation.field.column
+            continue
+        else:
+            continue
+        if through._meta.auto_created:
+            for field in through._meta.fields:
+                if field.remote_field and field.remote_field.model == User:
+                    yield through._meta.db_table, field.column
+    for many_to_many in opts.many_to_many:
+        through = many_to_many.remote_field.through
+        if through._meta.auto_created:
+            yield through._meta.db_table, many_to_many.m2m_column_name()
+
+
+def _rewrite(schema_editor, User, convert):
+    """
+    Maps every user ID through `convert` (None leaves it as is) and rewrites
+    each ID column with one UPDATE ... SET col = CASE col WHEN old THEN new
+    ... END per batch, the statement bulk_update() builds (which cannot
+    change primary keys). Base62 decoding has no portable SQL form, so the
+    mapping is computed here.
+    """
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    # Three parameters per ID: WHEN old THEN new, and old again in the IN list.
+    batch_size = min(BATCH_SIZE, (connection.features.max_query_params or 3 * BATCH_SIZE) // 3)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {quote(User._meta.pk.column)} FROM {quote(User._meta.db_table)}')
+        mapping = []
+        for (old_value,) in cursor.fetchall():
+            if isinstance(old_value, memoryview):
+                old_value = bytes(old_value)
+            new_value = convert(old_value)
+            if new_value is not None:
+                mapping.append((old_value, new_value))
+        for table, column in set(_user_id_columns(User)):
+            column = quote(column)
+            for start in range(0, len(mapping), batch_size):
+                batch = mapping[start:start + batch_size]
+                cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'UPDATE {quote(table)} SET {column} = CASE {column} {cases} END WHERE {column} IN ({placeholders})',
+                    [*(value for pair in batch for value in pair), *(old_value for old_value, _ in batch)],
+                )
+
+
+def pack_ids(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    field = User._meta.pk
+
+    def convert(value):
+        if isinstance(value, memoryview):
+            value = bytes(value)
+        if isinstance(value, bytes):
+            if len(value) == field.BINARY_LENGTH:
+                return None # already packed
+            value = value.decode('ascii')
+        return field.pack(value)
+
+    _rewrite(schema_editor, User, convert)
+
+
+def unpack_ids(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # Reverting 0003 casts bytea to varchar as '\x...' hex text, which no
+        # value written here can survive.
+        raise IrreversibleError("Binary user IDs cannot be converted back automatically on PostgreSQL.")
+    User = apps.get_model('users', 'User')
+    field = User._meta.pk
+
+    def convert(value):
+        if isinstance(value, (bytes, memoryview)) and len(value) == field.BINARY_LENGTH:
+            return field.unpack(bytes(value))
+        return None
+
+    _rewrite(schema_editor, User, convert)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_store_id_as_binary'),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_ids, unpack_ids),
+    ]
@@ -1,13 +1,16 @@
 # backend/apps/users/models.py
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from apps.common.fields import SemanticIDField # Import our custom field
+from apps.common.managers import SemanticIDQuerySet
 
-class UserManager(BaseUserManager):
+class UserManager(BaseUserManager.from_queryset(SemanticIDQuerySet)):
     """
     Custom user model manager where email is the unique identifiers
     for authentication instead of usernames.
+    `bulk_create` allocates semantic IDs in batches (see SemanticIDQuerySet).
     """
     def create_user(self, email, password, **extra_fields):
         """
@@ -35,11 +38,34 @@ class UserManager(BaseUserManager):
             raise ValueError(_('Superuser must have is_superuser=True.'))
         return self.create_user(email, password, **extra_fields)
 
+    def stamp_email_verified(self, user_ids):
+        """
+        Sets email_verified_at on those of `user_ids` that have none yet, in
+        one conditional UPDATE (no SELECT, no save() signals, and concurrent
+        confirmations cannot overwrite the first timestamp). There is no
+        EmailAddress receiver: the confirmation flow (CustomAccountAdapter)
+        and the EmailAddress admin call it, and any other code that marks
+        addresses verified (set_verified(), QuerySet.update()) must too.
+        Returns the timestamp if any row was stamped, else None.
+        """
+        from .cache import invalidate_user_details
+
+        user_ids = list(user_ids)
+        now = timezone.now()
+        stamped = self.filter(pk__in=user_ids, email_verified_at__isnull=True).update(
+            email_verified_at=now, updated_at=now,
+        )
+        if not stamped:
+            return None
+        for user_id in user_ids:
+            invalidate_user_details(user_id)
+        return now
+
 
 class User(AbstractUser):
     # Override the id field to use our SemanticIDField
     # Note: For primary keys, Django typically wants them defined first.
-    id = SemanticIDField(prefix='US', primary_key=True, editable=False)
+    id = SemanticIDField(prefix='US', primary_key=True, editable=False, binary=True)
 
     # Remove username, use email as the unique identifier
     username = None # We don't want a username field
@@ -57,15 +83,83 @@ class User(AbstractUser):
         help_text=_('The date and time when the user\'s email was verified.')
     )
 
+    # Carried in JWTs as the `ver` claim. Bumped whenever a field that decides
+    # who the user is or what they may do changes, which invalidates every
+    # token issued before (see apps/users/authentication.py).
+    token_version = models.PositiveIntegerField(_('token version'), default=0, editable=False)
+
+    # Version stamp for conditional GETs on the user detail endpoints; save()
+    # keeps it current even when called with update_fields.
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [] # No username, so email is handled by USERNAME_FIELD.
                           # Add other fields here if they should be prompted for createsuperuser
 
     objects = UserManager() # Use our custom manager
 
+    # Changing any of these bumps token_version (see apps/users/signals.py).
+    TOKEN_VERSION_FIELDS = ('email', 'password', 'is_active', 'is_staff', 'is_superuser')
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        claims = getattr(self, '_claims', None)
+        if claims is not None and not kwargs.get('update_fields') and not kwargs.get('force_insert'):
+            # A from_claims() user writes what was loaded or assigned, and its
+            # claim fields only if they were changed: the token may be stale.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = {
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and not (field.attname in claims and self.__dict__[field.attname] == claims[field.attname])
+            }
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_fields_snapshot = instance.token_fields_snapshot()
+        return instance
+
+    @classmethod
+    def from_claims(cls, user_id, claims):
+        """
+        A user built from validated access token claims ({field: value})
+        without a query (see apps/users/authentication.py). Every other
+        field is deferred; reading one loads all of them in one query.
+        """
+        values = {'id': user_id, **claims}
+        names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        instance = cls.from_db(None, names, [values[name] for name in names])
+        instance._claims = dict(claims)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        claims = getattr(self, '_claims', None)
+        if claims is not None and fields is not None:
+            deferred = self.get_deferred_fields()
+            if set(fields) <= deferred:
+                # The rest of the row, with the claim fields not assigned since.
+                fields = [*deferred, *(name for name, value in claims.items() if self.__dict__.get(name) == value)]
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Refreshed values are what later saves compare against.
+        loaded = set(fields) if fields is not None else {field.attname for field in self._meta.concrete_fields}
+        if claims is not None:
+            claims.update((name, self.__dict__[name]) for name in loaded & claims.keys())
+        if hasattr(self, '_token_fields_snapshot'):
+            self._token_fields_snapshot = tuple(
+                self.__dict__.get(name) if name in loaded else old
+                for name, old in zip(self.TOKEN_VERSION_FIELDS, self._token_fields_snapshot)
+            )
+
+    def token_fields_snapshot(self):
+        # Reads __dict__ so deferred fields are not loaded just to compare them.
+        return tuple(self.__dict__.get(name) for name in self.TOKEN_VERSION_FIELDS)
+
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import CustomRegisterView, CustomResendEmailVerificationView
 
-urlpatterns = [
-    path('', CustomRegisterView.as_view(), name='rest_register'),
-    path('resend-email/', CustomResendEmailVerificationView.as_view(), name='custom_resend_email'),
-]
\ No newline at end of file
+if settings.USE_ASYNC_VIEWS:
+    urlpatterns = [
+        path('', async_views.register, name='rest_register'),
+        path('resend-email/', async_views.resend_email_verification, name='custom_resend_email'),
+    ]
+else:
+    urlpatterns = [
+        path('', CustomRegisterView.as_view(), name='rest_register'),
+        path('resend-email/', CustomResendEmailVerificationView.as_view(), name='custom_resend_email'),
+    ]
@@ -1,9 +1,25 @@
 # backend/apps/users/serializers.py
+from allauth.account import app_settings as allauth_account_settings
+from allauth.account.adapter import get_adapter
+from allauth.account.models import EmailAddress
 from dj_rest_auth.registration.serializers import RegisterSerializer
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
 from dj_rest_auth.serializers import PasswordResetSerializer
 from django.conf import settings # To check allauth settings if needed
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .authentication import TOKEN_VERSION_CLAIM, add_user_claims
+from .logins import record_login, record_login_on_insert
+from .tokens import CachedBlacklistRefreshToken
 from .forms import ScaffoldPasswordResetForm
 
+User = get_user_model()
+
 class CustomRegisterSerializer(RegisterSerializer):
     # The default RegisterSerializer might add 'username' based on some conditions.
     # We explicitly remove it from the serializer's fields if present.
@@ -28,9 +44,33 @@ class CustomRegisterSerializer(RegisterSerializer):
             if field_name in self.fields:
                 del self.fields[field_name]
 
-    # The parent RegisterSerializer's save method should respect that USERNAME_FIELD
-    # on your custom User model is 'email', so it will use the email to populate
-    # what would have been the username.
+    def save(self, request):
+        """
+        RegisterSerializer.save for a brand-new user, without the queries the
+        generic allauth setup spends on users that may already exist: the
+        user is inserted under a new ID with no collision query, and its one
+        EmailAddress is inserted directly (no existence check, no conflict
+        lookup, no session stash of a verified email, which only social
+        signups set) and cached on the user for the verification email.
+        """
+        adapter = get_adapter()
+        user = adapter.new_user(request)
+        self.cleaned_data = self.get_cleaned_data()
+        user = adapter.save_user(request, user, self, commit=False)
+        if 'password1' in self.cleaned_data:
+            try:
+                adapter.clean_password(self.cleaned_data['password1'], user=user)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(detail=serializers.as_serializer_error(exc))
+        user.pk = User._meta.pk.new_id()
+        # Without mandatory verification the view logs the new user in at once.
+        if allauth_account_settings.EMAIL_VERIFICATION != allauth_account_settings.EmailVerificationMethod.MANDATORY:
+            record_login_on_insert(user)
+        user.save(force_insert=True)
+        self.custom_signup(request, user)
+        address = EmailAddress.objects.create(user=user, email=user.email.lower(), primary=True, verified=False)
+        EmailAddress.objects.fill_cache_for_user(user, [address])
+        return user
 
 class CustomPasswordResetSerializer(PasswordResetSerializer):
     
@@ -49,3 +89,61 @@ class CustomPasswordResetSerializer(PasswordResetSerializer):
             'html_email_template_name': 'users/example_message.txt',
             'url_generator': node_url_generator
         }
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Used by dj-rest-auth (JWT_TOKEN_CLAIMS_SERIALIZER) for login and registration.
+    Adds the claims StatelessJWTCookieAuthentication builds request.user from.
+    """
+    token_class = CachedBlacklistRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        # TokenObtainPairSerializer.validate would write last_login on every
+        # login; dj-rest-auth only calls get_token, so record it here instead.
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            record_login(user)
+        return add_user_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(CookieTokenRefreshSerializer):
+    """
+    Cookie refresh serializer that re-stamps the user claims on refresh
+    (the stock serializer copies them from the old refresh token, so e.g. a
+    verified email would not show until the next login). Refresh tokens
+    issued before a token version bump are rejected like their access
+    tokens. Otherwise follows TokenRefreshSerializer.validate, with the blacklist
+    handled by CachedBlacklistRefreshToken.
+    """
+    token_class = CachedBlacklistRefreshToken
+
+    def validate(self, attrs):
+        attrs['refresh'] = self.extract_refresh_token()
+        refresh = self.token_class(attrs['refresh'])
+
+        user = User._default_manager.filter(pk=refresh.payload.get(jwt_settings.USER_ID_CLAIM)).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        if refresh.get(TOKEN_VERSION_CLAIM) != user.token_version:
+            raise InvalidToken(_('Token is no longer valid'))
+        add_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Blacklist app not installed
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data['refresh'] = str(refresh)
+
+        return data
@@ -1,39 +1,41 @@
 # backend/apps/users/signals.py
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.utils import timezone
-from allauth.account.models import EmailAddress
-from allauth.account.signals import email_confirmed
 from django.contrib.auth import get_user_model
+from .authentication import token_version_cache_key
+from .cache import invalidate_user_details
+from .logins import record_login
 
 User = get_user_model()
 
 
-@receiver(email_confirmed)
-def email_confirmed_handler(sender, request, email_address, **kwargs):
+@receiver(post_save, sender=User)
+def bump_token_version(sender, instance, created, **kwargs):
     """
-    Signal handler that sets email_verified_at timestamp when email is confirmed.
-    This is triggered by allauth when an email verification is successful.
+    Invalidates the user's outstanding JWTs when one of User.TOKEN_VERSION_FIELDS
+    changed since the instance was loaded (deactivation, password, permissions).
+    Instances not loaded from the database are assumed to have changed.
     """
-    user = email_address.user
-    
-    # Only set the timestamp if it hasn't been set before
-    # This handles the case where a user might verify multiple email addresses
-    if not user.email_verified_at:
-        user.email_verified_at = timezone.now()
-        user.save(update_fields=['email_verified_at'])
+    snapshot = instance.token_fields_snapshot()
+    if not created and snapshot != getattr(instance, '_token_fields_snapshot', None):
+        User.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+        instance.refresh_from_db(fields=['token_version'])
+        cache.delete(token_version_cache_key(instance.pk))
+    instance._token_fields_snapshot = snapshot
 
 
-@receiver(post_save, sender=EmailAddress)
-def email_address_verified_handler(sender, instance, created, **kwargs):
-    """
-    Backup signal handler that catches EmailAddress.verified changes.
-    This handles edge cases where email_confirmed signal might not fire.
-    """
-    if not created and instance.verified:
-        user = instance.user
-        
-        # Only set if not already set and this is the primary email
-        if not user.email_verified_at and instance.primary:
-            user.email_verified_at = timezone.now()
-            user.save(update_fields=['email_verified_at'])
\ No newline at end of file
+
+@receiver(post_save, sender=User)
+def invalidate_user_detail_cache(sender, instance, **kwargs):
+    """Drops the cached user detail payloads and their ETags (apps/users/cache.py)."""
+    invalidate_user_details(instance.pk)
+
+
+# Replaces django.contrib.auth's update_last_login (one UPDATE per login),
+# which UsersConfig.ready() disconnects.
+@receiver(user_logged_in)
+def record_last_login(sender, user, **kwargs):
+    record_login(user)
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from dj_rest_auth.app_settings import api_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.utils.crypto import get_random_string
+
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class APIFastPathCSRFTests(TestCase):
+    """
+    The API skips SessionMiddleware and CsrfViewMiddleware. Wherever a cookie
+    authenticates an unsafe request, CSRF must still be checked.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client = Client(enforce_csrf_checks=True, HTTP_HOST='localhost')
+
+    def test_admin_login_requires_a_csrf_token(self):
+        credentials = {'username': 'admin@example.com', 'password': 'testpass123'}
+        self.assertEqual(self.client.post('/admin/login/', credentials).status_code, 403)
+
+        self.client.get('/admin/login/')
+        token = self.client.cookies['csrftoken'].value
+        response = self.client.post('/admin/login/', {**credentials, 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+
+    def test_allauth_forms_require_a_csrf_token(self):
+        response = self.client.post('/accounts/login/', {'login': 'admin@example.com', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_session_cookie_does_not_authenticate_the_api(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+        response = self.client.patch('/api/auth/user/', {'first_name': 'Mallory'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, '')
+
+    def test_jwt_cookie_writes_require_a_csrf_token_when_enabled(self):
+        self.client.cookies[api_settings.JWT_AUTH_COOKIE] = str(
+            ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        )
+        secret = get_random_string(32)
+        self.client.cookies['csrftoken'] = secret
+        with patch.object(api_settings, 'JWT_AUTH_COOKIE_USE_CSRF', True):
+            response = self.client.patch('/api/auth/user/', {'first_name': 'Mallory'}, content_type='application/json')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.patch(
+                '/api/auth/user/', {'first_name': 'Ada'}, content_type='application/json', HTTP_X_CSRFTOKEN=secret,
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, 'Ada')
+
+    def test_default_configuration(self):
+        """
+        JWT_AUTH_COOKIE_USE_CSRF is off by default: a cookie-authenticated
+        write needs no CSRF token, on the fast path or the full chain alike
+        (DRF views are csrf_exempt, so CsrfViewMiddleware never checked them).
+        Cross-site requests are kept out by the cookies' SameSite=Lax.
+        """
+        self.assertFalse(api_settings.JWT_AUTH_COOKIE_USE_CSRF)
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'admin@example.com', 'password': 'testpass123'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        for name in (api_settings.JWT_AUTH_COOKIE, api_settings.JWT_AUTH_REFRESH_COOKIE):
+            self.assertEqual(response.cookies[name]['samesite'], 'Lax')
+            self.assertTrue(response.cookies[name]['httponly'])
+
+        for prefixes in (['/api/'], []):
+            with self.subTest(prefixes=prefixes), override_settings(API_FAST_PATH_PREFIXES=prefixes):
+                client = Client(enforce_csrf_checks=True, HTTP_HOST='localhost')
+                client.cookies[api_settings.JWT_AUTH_COOKIE] = response.cookies[api_settings.JWT_AUTH_COOKIE].value
+                patched = client.patch('/api/auth/user/', {'first_name': 'Ada'}, content_type='application/json')
+                self.assertEqual(patched.status_code, 200)
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path
+
+from apps.common.models import OutboxEmail
+from apps.users import async_views
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+# The routes asgi.py gets with USE_ASYNC_VIEWS on (urls.py picks at import).
+urlpatterns = [
+    path('api/auth/session/', async_views.session_introspection, name='session_introspection'),
+    path('api/auth/custom-registration/', async_views.register, name='rest_register'),
+    path('api/auth/custom-registration/resend-email/', async_views.resend_email_verification),
+    path('api/users/protected/', async_views.protected_user_detail),
+    path('accounts/', include('allauth.urls')),
+]
+
+
+@override_settings(
+    ROOT_URLCONF='apps.users.tests.test_async_views',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='async@example.com', password='testpass123', first_name='Ada')
+        self.access = str(ClaimsTokenObtainPairSerializer.get_token(self.user).access_token)
+        self.client = AsyncClient(headers={'host': 'localhost'})
+
+    async def test_protected_user_detail(self):
+        response = await self.client.get('/api/users/protected/')
+        self.assertEqual(response.status_code, 401)
+
+        self.client.cookies['my-app-auth'] = self.access
+        response = await self.client.get('/api/users/protected/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['first_name'], 'Ada')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = await self.client.get('/api/users/protected/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_resend_email_verification(self):
+        email_address = await EmailAddress.objects.acreate(user=self.user, email='async@example.com', primary=True, verified=False)
+        await EmailConfirmation.objects.acreate(email_address=email_address, key='old-key')
+
+        response = await self.client.post(
+            '/api/auth/custom-registration/resend-email/', {'email': 'async@example.com'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        keys = [key async for key in EmailConfirmation.objects.values_list('key', flat=True)]
+        self.assertEqual(len(keys), 1)
+        self.assertNotEqual(keys[0], 'old-key')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(keys[0], mail.outbox[0].body)
+
+        response = await self.client.post('/api/auth/custom-registration/resend-email/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(EMAIL_BACKEND='apps.common.mail.OutboxEmailBackend')
+    async def test_resend_keeps_the_old_key_when_queueing_fails(self):
+        email_address = await EmailAddress.objects.acreate(user=self.user, email='async@example.com', primary=True, verified=False)
+        await EmailConfirmation.objects.acreate(email_address=email_address, key='old-key')
+
+        with patch('apps.common.mail.OutboxEmailBackend.send_messages', side_effect=DatabaseError):
+            response = await self.client.post(
+                '/api/auth/custom-registration/resend-email/', {'email': 'async@example.com'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 500)
+        keys = [key async for key in EmailConfirmation.objects.values_list('key', flat=True)]
+        self.assertEqual(keys, ['old-key'])
+
+        response = await self.client.post(
+            '/api/auth/custom-registration/resend-email/', {'email': 'async@example.com'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        key = await EmailConfirmation.objects.values_list('key', flat=True).aget()
+        self.assertIn(key, (await OutboxEmail.objects.aget()).body)
+
+    async def test_register(self):
+        response = await self.client.post(
+            '/api/auth/custom-registration/',
+            {'email': 'new-async@example.com', 'password1': 'Async-pass-123', 'password2': 'Async-pass-123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('my-app-auth', response.cookies)
+        self.assertTrue(await User.objects.filter(email='new-async@example.com').aexists())
+
+    async def test_session_endpoint(self):
+        self.client.cookies['my-app-auth'] = self.access
+        response = await self.client.get('/api/auth/session/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'async@example.com')
+        self.assertIn('first_name', response.json()['user'])
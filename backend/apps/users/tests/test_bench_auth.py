@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.test import SimpleTestCase
+
+from apps.users.management.commands.bench_auth import Command
+
+
+def run(**endpoints):
+    return {
+        'meta': {'vendor': 'sqlite', 'requests': 100, 'concurrency': 4, 'hasher': 'MD5PasswordHasher'},
+        'endpoints': {
+            name: {'rps': rps, 'p95_ms': p95, 'queries': queries}
+            for name, (rps, p95, queries) in endpoints.items()
+        },
+    }
+
+
+class BenchAuthBaselineTests(SimpleTestCase):
+    def compare(self, current, baseline):
+        command = Command(stdout=StringIO())
+        return command.compare(current, baseline, tolerance=0.2), command.stdout.getvalue()
+
+    def test_regressions_are_flagged(self):
+        baseline = run(login=(100, 10, 3), refresh=(100, 10, 5), user=(100, 10, 0))
+        current = run(login=(90, 11, 3), refresh=(100, 10, 6), user=(70, 10, 0), protected=(100, 10, 0))
+        regressions, output = self.compare(current, baseline)
+        self.assertEqual(regressions, ['refresh', 'user']) # one more query; 30% slower
+        self.assertIn('protected                    not in the baseline', output)
+
+    def test_different_setups_are_pointed_out(self):
+        baseline = run(login=(100, 10, 3))
+        baseline['meta']['vendor'] = 'postgresql'
+        _, output = self.compare(run(login=(100, 10, 3)), baseline)
+        self.assertTrue(output.startswith('Note: baseline ran with'))
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from apps.users.cache import user_detail_cache_key
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+@override_settings(USER_DETAIL_CACHE_SECONDS=30)
+class ConditionalUserDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='etag@example.com', password='testpass123', first_name='Ada')
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.cookies['my-app-auth'] = str(ClaimsTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def test_not_modified_without_queries(self):
+        for path in ('/api/users/protected/', '/api/auth/user/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+                etag = response['ETag']
+
+                with self.assertNumQueries(0):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+                response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_cached_payload_is_served_without_queries(self):
+        first = self.client.get('/api/users/protected/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/users/protected/')
+        self.assertEqual(second.json(), first.json())
+
+    def test_saving_the_user_changes_the_etag(self):
+        etag = self.client.get('/api/auth/user/')['ETag']
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Grace'
+        user.save(update_fields=['first_name'])
+
+        response = self.client.get('/api/auth/user/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['first_name'], 'Grace')
+
+    @override_settings(USER_DETAIL_CACHE_SECONDS=0)
+    def test_without_caching_changes_from_other_processes_are_seen(self):
+        etag = self.client.get('/api/auth/user/')['ETag']
+        self.assertEqual(self.client.get('/api/auth/user/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Saved by another worker: this process's cache never heard of it.
+        User.objects.filter(pk=self.user.pk).update(first_name='Grace', updated_at=timezone.now())
+
+        response = self.client.get('/api/auth/user/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Grace')
+        self.assertIsNone(cache.get(user_detail_cache_key('details', self.user.pk)))
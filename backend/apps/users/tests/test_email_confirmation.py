@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.contrib.auth import get_user_model
+from django.contrib.admin import site
+from django.test import Client, TestCase
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class EmailConfirmationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='confirm@example.com', password='testpass123')
+        self.email_address = EmailAddress.objects.create(user=self.user, email=self.user.email, primary=True, verified=False)
+        self.client = Client(HTTP_HOST='localhost')
+
+    def create_key(self):
+        confirmation = EmailConfirmation.create(self.email_address)
+        confirmation.sent = timezone.now()
+        confirmation.save()
+        return confirmation.key
+
+    def confirm(self, key=None):
+        key = key or self.create_key()
+        return self.client.post('/api/auth/registration/verify-email/', {'key': key}, content_type='application/json')
+
+    def test_confirmation_stamps_email_verified_at_in_one_update(self):
+        # allauth: key lookup (joined to address and user), other addresses,
+        # verified-elsewhere check, primary lookup, address UPDATE; then ours.
+        key = self.create_key()
+        with self.assertNumQueries(6):
+            response = self.confirm(key)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.email_verified_at)
+        self.assertEqual(self.user.updated_at, self.user.email_verified_at)
+
+    def test_email_verified_at_is_kept_on_later_confirmations(self):
+        verified_at = timezone.now() - timedelta(days=1)
+        User.objects.filter(pk=self.user.pk).update(email_verified_at=verified_at)
+        self.assertEqual(self.confirm().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_verified_at, verified_at)
+
+    def test_admin_verification_stamps_email_verified_at(self):
+        admin_user = User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.client.force_login(admin_user)
+        response = self.client.post('/admin/account/emailaddress/', {
+            'action': 'make_verified', '_selected_action': [self.email_address.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.email_verified_at)
+
+    def test_admin_change_form_stamps_email_verified_at(self):
+        self.email_address.verified = True
+        site.get_model_admin(EmailAddress).save_model(None, self.email_address, None, True)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.email_verified_at)
+
+    def test_saving_an_address_does_not_touch_the_user(self):
+        # No EmailAddress receivers: only the verification paths stamp.
+        with self.assertNumQueries(1):
+            self.email_address.save()
+
+    def test_bulk_verification_stamps_through_the_manager(self):
+        EmailAddress.objects.filter(pk=self.email_address.pk).update(verified=True)
+        self.assertIsNotNone(User.objects.stamp_email_verified([self.user.pk]))
+        self.assertIsNone(User.objects.stamp_email_verified([self.user.pk]))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.email_verified_at)
@@ -0,0 +1,30 @@
+from allauth.account.adapter import DefaultAccountAdapter
+from allauth.core import context
+from django.contrib.sites.models import Site
+from django.test import RequestFactory, TestCase
+
+from apps.users.adapters import CustomAccountAdapter
+
+
+class EmailRenderingTests(TestCase):
+    def test_adapter_renders_like_allauth(self):
+        request = RequestFactory().get('/', HTTP_HOST='localhost')
+        ctx = {
+            'request': request,
+            'email': 'render@example.com',
+            'current_site': Site.objects.get_current(),
+            'user': None,
+            'activate_url': 'http://localhost:3000/confirm-email/key',
+            'password_reset_url': 'http://localhost:3000/reset',
+            'uid': 'uid',
+            'token': 'token',
+        }
+        with context.request_context(request):
+            for prefix in ('account/email/email_confirmation', 'account/email/password_reset_key', 'users/example_message'):
+                with self.subTest(prefix=prefix):
+                    expected = DefaultAccountAdapter(request).render_mail(prefix, 'render@example.com', ctx)
+                    message = CustomAccountAdapter(request).render_mail(prefix, 'render@example.com', ctx)
+                    self.assertEqual(message.subject, expected.subject)
+                    self.assertEqual(message.body, expected.body)
+                    self.assertEqual(message.alternatives, expected.alternatives)
+                    self.assertEqual((message.from_email, message.to), (expected.from_email, expected.to))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.users import checks
+from apps.users.logins import login_buffer, record_login, write_last_logins
+
+User = get_user_model()
+
+
+@override_settings(LAST_LOGIN_GRANULARITY_SECONDS=300, LAST_LOGIN_FLUSH_SECONDS=0)
+class LastLoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        login_buffer.reset()
+        self.user = User.objects.create_user(email='login@example.com', password='testpass123')
+
+    def login(self):
+        return Client(HTTP_HOST='localhost').post(
+            '/api/auth/login/', {'email': 'login@example.com', 'password': 'testpass123'}, content_type='application/json',
+        )
+
+    def test_login_writes_last_login_once_per_window(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        first = self.user.last_login
+        self.assertIsNotNone(first)
+        self.assertEqual(self.user.updated_at, first)
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, first)
+
+    def test_repeat_login_skips_the_database(self):
+        record_login(self.user)
+        with self.assertNumQueries(0):
+            record_login(self.user)
+
+    def test_stale_last_login_is_rewritten(self):
+        stale = timezone.now() - timedelta(hours=1)
+        User.objects.filter(pk=self.user.pk).update(last_login=stale)
+        record_login(self.user)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, stale)
+
+    def test_recent_last_login_written_elsewhere_is_kept(self):
+        # Another process (with its own cache) wrote it a minute ago.
+        recent = timezone.now() - timedelta(minutes=1)
+        User.objects.filter(pk=self.user.pk).update(last_login=recent)
+        with self.assertNumQueries(1):
+            self.assertEqual(write_last_logins({self.user.pk: timezone.now()}), 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, recent)
+
+    @override_settings(LAST_LOGIN_FLUSH_SECONDS=3600)
+    def test_buffered_logins_are_flushed_in_one_update(self):
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        with self.assertNumQueries(0):
+            record_login(self.user)
+            record_login(other)
+        with self.assertNumQueries(1):
+            self.assertEqual(login_buffer.flush(), 2)
+        logins = dict(User.objects.filter(pk__in=[self.user.pk, other.pk]).values_list('pk', 'last_login'))
+        self.assertEqual(logins, {self.user.pk: self.user.last_login, other.pk: other.last_login})
+
+    def test_auth_update_last_login_is_disconnected(self):
+        self.assertEqual(checks.check_last_login_receiver(None), [])
+        user_logged_in.connect(update_last_login, dispatch_uid='update_last_login')
+        try:
+            self.assertEqual([error.id for error in checks.check_last_login_receiver(None)], ['users.E001'])
+        finally:
+            user_logged_in.disconnect(dispatch_uid='update_last_login')
+
+
+@override_settings(LAST_LOGIN_GRANULARITY_SECONDS=300, LAST_LOGIN_FLUSH_SECONDS=0.05)
+class LoginBufferTimerTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        login_buffer.reset()
+        self.addCleanup(login_buffer.reset)
+
+    def test_idle_buffer_is_flushed_by_the_timer(self):
+        user = User.objects.create_user(email='idle@example.com', password='testpass123')
+        record_login(user)
+        timer = login_buffer._timer
+        self.assertTrue(timer.daemon)
+        timer.join(5) # no later login comes along to flush it
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+        self.assertIsNone(login_buffer._timer)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+
+from apps.common.metrics import exposition
+from apps.users.tokens import blacklist_cache
+
+User = get_user_model()
+
+
+def samples():
+    return {
+        sample: float(value)
+        for sample, _, value in (line.rpartition(' ') for line in exposition().splitlines() if not line.startswith('#'))
+    }
+
+
+@override_settings(METRICS_DIR='', EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class AuthMetricsTests(TestCase):
+    def setUp(self):
+        blacklist_cache.reset()
+        self.user = User.objects.create_user(email='metrics@example.com', password='testpass123')
+        self.client = Client(HTTP_HOST='localhost')
+        self.before = samples()
+
+    def delta(self, sample):
+        return samples().get(sample, 0) - self.before.get(sample, 0)
+
+    def login(self, password):
+        return self.client.post(
+            '/api/auth/login/', {'email': 'metrics@example.com', 'password': password}, content_type='application/json',
+        )
+
+    def test_logins_are_counted_and_timed_by_outcome(self):
+        self.assertEqual(self.login('testpass123').status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 400)
+        self.assertEqual(self.delta('auth_logins_total{outcome="success"}'), 1)
+        self.assertEqual(self.delta('auth_logins_total{outcome="failure"}'), 1)
+        self.assertEqual(self.delta('auth_login_seconds_count{outcome="success"}'), 1)
+        self.assertEqual(self.delta('auth_login_seconds_bucket{outcome="failure",le="+Inf"}'), 1)
+
+    def test_refresh_and_blacklist_hits(self):
+        self.login('testpass123')
+        old_refresh = self.client.cookies['my-app-refresh-token'].value
+        self.assertEqual(self.client.post('/api/auth/token/refresh/').status_code, 200)
+        self.client.cookies['my-app-refresh-token'] = old_refresh
+        self.assertEqual(self.client.post('/api/auth/token/refresh/').status_code, 401)
+        self.assertEqual(self.delta('auth_token_refreshes_total{outcome="success"}'), 1)
+        self.assertEqual(self.delta('auth_token_refreshes_total{outcome="failure"}'), 1)
+        self.assertEqual(self.delta('auth_blacklist_hits_total'), 1)
+
+    def test_registration_and_emails(self):
+        response = self.client.post(
+            '/api/auth/custom-registration/',
+            {'email': 'new@example.com', 'password1': 'Str0ng-pass-123', 'password2': 'Str0ng-pass-123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.post('/api/auth/password/reset/', {'email': 'metrics@example.com'}, content_type='application/json')
+        self.assertEqual(self.delta('auth_registrations_total{outcome="success"}'), 1)
+        self.assertEqual(self.delta('auth_emails_total{kind="password_reset"}'), 1)
+        self.assertEqual(self.delta('auth_email_failures_total'), 0)
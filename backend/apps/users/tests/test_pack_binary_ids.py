@@ -0,0 +1,47 @@
+from importlib import import_module
+from unittest import mock
+
+from allauth.account.models import EmailAddress
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+migration = import_module('apps.users.migrations.0004_pack_binary_ids')
+
+User = get_user_model()
+
+
+class PackBinaryIdsMigrationTests(TransactionTestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(email=f'pack{n}@example.com', password='testpass123') for n in range(3)]
+        for user in self.users:
+            EmailAddress.objects.create(user=user, email=user.email, primary=True, verified=True)
+
+    def run_migration(self, function):
+        with mock.patch.object(migration, 'BATCH_SIZE', 2), connection.schema_editor() as schema_editor:
+            with CaptureQueriesContext(connection) as queries:
+                function(apps, schema_editor)
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def raw_ids(self, table, column):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM {table}')
+            return sorted(value.encode() if isinstance(value, str) else bytes(value) for (value,) in cursor.fetchall())
+
+    def test_rewrites_ids_in_batches_and_back(self):
+        unpacked = self.run_migration(migration.unpack_ids)
+        text_ids = sorted(user.pk.encode() for user in self.users)
+        self.assertEqual(self.raw_ids('users_user', 'id'), text_ids)
+        self.assertEqual(self.raw_ids('account_emailaddress', 'user_id'), text_ids)
+
+        packed = self.run_migration(migration.pack_ids)
+        self.assertEqual(len(packed), len(unpacked))
+        # Two batches (of 2 and 1 IDs) for each column, not one UPDATE per ID.
+        user_table = connection.ops.quote_name('users_user')
+        self.assertEqual(sum(sql.startswith(f'UPDATE {user_table} SET') for sql in packed), 2)
+        self.assertEqual(self.raw_ids('users_user', 'id'), sorted(User._meta.pk.pack(user.pk) for user in self.users))
+        for user in self.users:
+            self.assertEqual(EmailAddress.objects.get(user=user).user, user)
+        self.assertEqual(self.run_migration(migration.pack_ids), []) # already packed
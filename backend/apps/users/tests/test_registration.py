@@ -0,0 +1,63 @@
+from unittest import mock
+
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+User = get_user_model()
+
+PASSWORD = 'Str0ng-passw0rd!'
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Site.objects.get_current() # cached per process after the first request
+        self.client = Client(HTTP_HOST='localhost')
+
+    def register(self, email='new@example.com'):
+        return self.client.post(
+            '/api/auth/custom-registration/',
+            {'email': email, 'password1': PASSWORD, 'password2': PASSWORD},
+            content_type='application/json',
+        )
+
+    @override_settings(ACCOUNT_EMAIL_VERIFICATION='none')
+    def test_registration_queries(self):
+        # Verified-email uniqueness check, then one transaction (the savepoint
+        # pair here): user, email address and outstanding token INSERTs.
+        with self.assertNumQueries(6):
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.REST_AUTH['JWT_AUTH_COOKIE'], response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        user = User.objects.get(email='new@example.com')
+        self.assertIsNotNone(user.last_login)
+        self.assertTrue(user.check_password(PASSWORD))
+        address = EmailAddress.objects.get(user=user)
+        self.assertEqual((address.email, address.primary, address.verified), ('new@example.com', True, False))
+
+    @override_settings(ACCOUNT_EMAIL_VERIFICATION='mandatory')
+    def test_mandatory_verification_queries(self):
+        # As above without the token, plus the confirmation INSERT and its
+        # `sent` UPDATE; the email goes out after the commit.
+        with self.assertNumQueries(7), self.captureOnCommitCallbacks(execute=True):
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 1)
+        confirmation = EmailConfirmation.objects.get(email_address__email='new@example.com')
+        self.assertIsNotNone(confirmation.sent)
+        self.assertIn(confirmation.key, mail.outbox[0].body)
+        self.assertIsNone(User.objects.get(email='new@example.com').last_login)
+
+    @override_settings(ACCOUNT_EMAIL_VERIFICATION='none')
+    def test_failure_rolls_back_the_whole_registration(self):
+        with mock.patch('apps.users.views.jwt_encode', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            self.register()
+        self.assertFalse(User.objects.filter(email='new@example.com').exists())
+        self.assertFalse(EmailAddress.objects.filter(email='new@example.com').exists())
@@ -0,0 +1,56 @@
+import hashlib
+import hmac
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+@override_settings(USER_DETAIL_CACHE_SECONDS=30)
+class SessionIntrospectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='session@example.com', password='testpass123')
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.cookies['my-app-auth'] = str(ClaimsTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def test_returns_user_without_queries_or_later_middleware(self):
+        self.client.get('/api/auth/session/') # caches the token version and user details
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/session/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['user'], {
+            'pk': self.user.pk, 'email': 'session@example.com', 'first_name': '', 'last_name': '',
+            'is_staff': False, 'email_verified_at': None,
+        })
+        self.assertTrue(body['authenticated'])
+        self.assertRegex(response['Cache-Control'], r'^private, max-age=(1[0-5]|[0-9])$')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertNotIn('X-Frame-Options', response) # XFrameOptionsMiddleware never ran
+        self.assertNotIn('X-Session-Signature', response)
+
+    def test_rejects_missing_and_invalid_tokens(self):
+        self.assertEqual(Client(HTTP_HOST='localhost').get('/api/auth/session/').status_code, 401)
+        self.client.cookies['my-app-auth'] = 'not-a-token'
+        response = self.client.get('/api/auth/session/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertEqual(self.client.post('/api/auth/session/').status_code, 405)
+
+    @override_settings(SESSION_INTROSPECTION_SIGNING_KEY='shared-key')
+    def test_signs_body_when_key_is_configured(self):
+        response = self.client.get('/api/auth/session/')
+        expected = hmac.new(b'shared-key', response.content, hashlib.sha256).hexdigest()
+        self.assertEqual(response['X-Session-Signature'], expected)
+
+    def test_user_matches_the_user_details_endpoint(self):
+        User.objects.filter(pk=self.user.pk).update(first_name='Ada', last_name='Lovelace')
+        details = self.client.get('/api/auth/user/').json()
+        user = self.client.get('/api/auth/session/').json()['user']
+        self.assertEqual({key: user[key] for key in details}, details)
+        self.assertEqual(user['first_name'], 'Ada')
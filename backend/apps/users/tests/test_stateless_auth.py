@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from allauth.account.models import EmailAddress
+
+from apps.users.authentication import StatelessJWTCookieAuthentication
+from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='claims@example.com', password='testpass123', first_name='Ada')
+
+    def authenticate(self, access=None):
+        access = access or ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return StatelessJWTCookieAuthentication().authenticate(request)[0]
+
+    def test_claims_user_needs_no_queries(self):
+        access = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.authenticate(access) # warms the token version cache
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+            self.assertIsInstance(user, User)
+            self.assertTrue(user.get_deferred_fields())
+            self.assertEqual((user.pk, user.email, user.is_staff), (self.user.pk, 'claims@example.com', False))
+            self.assertIsNone(user.email_verified_at)
+            self.assertTrue(user.is_authenticated)
+
+    def test_other_attributes_load_the_user_once(self):
+        user = self.authenticate()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(user.first_name, 'Ada')
+            self.assertTrue(user.check_password('testpass123'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(user, self.user)
+
+    def test_writes_go_to_the_loaded_user(self):
+        user = self.authenticate()
+        user.first_name = 'Grace'
+        user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, 'Grace')
+
+    def test_claims_user_works_with_the_orm(self):
+        EmailAddress.objects.create(user=self.user, email='claims@example.com', verified=True, primary=True)
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(EmailAddress.objects.filter(user=user).count(), 1)
+        address = EmailAddress.objects.create(user=user, email='second@example.com')
+        self.assertEqual(address.user_id, self.user.pk)
+        self.assertEqual(set(EmailAddress.objects.filter(user=user).values_list('email', flat=True)), {
+            'claims@example.com', 'second@example.com',
+        })
+
+    def test_saving_does_not_write_stale_claims(self):
+        user = self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(first_name='Grace', email_verified_at=timezone.now())
+        user.last_name = 'Hopper'
+        user.save()
+        stored = User.objects.get(pk=self.user.pk)
+        self.assertEqual((stored.first_name, stored.last_name), ('Grace', 'Hopper'))
+        self.assertIsNotNone(stored.email_verified_at)
+        self.assertEqual(stored.token_version, 0)
+
+    def test_deactivation_and_permission_changes_revoke_tokens(self):
+        for field, value in (('is_staff', True), ('is_active', False)):
+            with self.subTest(field=field):
+                user = User.objects.get(pk=self.user.pk)
+                access = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+                setattr(user, field, value)
+                user.save()
+                request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+                with self.assertRaises(AuthenticationFailed):
+                    StatelessJWTCookieAuthentication().authenticate(request)
+
+    def test_unrelated_saves_keep_tokens_valid(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Grace'
+        user.save()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 0)
+        self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def login(self):
+        client = Client(HTTP_HOST='localhost')
+        response = client.post('/api/auth/login/', {'email': 'claims@example.com', 'password': 'testpass123'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return client
+
+    def test_refresh_restamps_claims(self):
+        client = self.login()
+        User.objects.filter(pk=self.user.pk).update(email_verified_at=timezone.now())
+
+        self.assertEqual(client.post('/api/auth/token/refresh/').status_code, 200)
+        response = client.get('/api/users/protected/')
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(client.cookies['my-app-auth'].value)
+        self.assertIsNotNone(access['email_verified_at'])
+
+    def test_refresh_tokens_from_before_a_version_bump_are_rejected(self):
+        client = self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(client.get('/api/users/protected/').status_code, 401)
+        self.assertEqual(client.post('/api/auth/token/refresh/').status_code, 401)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.users.tokens import CachedBlacklistRefreshToken, blacklist_cache
+
+User = get_user_model()
+
+
+class CachedBlacklistTests(TestCase):
+    def setUp(self):
+        blacklist_cache.reset()
+        self.user = User.objects.create_user(email='rotate@example.com', password='testpass123')
+
+    def login(self):
+        client = Client(HTTP_HOST='localhost')
+        response = client.post('/api/auth/login/', {'email': 'rotate@example.com', 'password': 'testpass123'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return client
+
+    def test_refresh_rotates_and_rejects_reuse(self):
+        client = self.login()
+        old_refresh = client.cookies['my-app-refresh-token'].value
+
+        self.assertEqual(client.post('/api/auth/token/refresh/').status_code, 200)
+        self.assertNotEqual(client.cookies['my-app-refresh-token'].value, old_refresh)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+
+        client.cookies['my-app-refresh-token'] = old_refresh
+        self.assertEqual(client.post('/api/auth/token/refresh/').status_code, 401)
+
+    def test_reuse_is_caught_when_cache_missed_it(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        blacklist_cache.is_blacklisted('warm-up') # snapshot taken before the blacklisting
+        # Blacklisted by another process after the snapshot.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+
+        token = CachedBlacklistRefreshToken(str(token))
+        with self.assertRaises(TokenError):
+            token.blacklist()
+
+    def test_unlisted_token_checks_without_table_lookup(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        blacklist_cache.is_blacklisted('warm-up') # builds the snapshot
+        with self.assertNumQueries(0):
+            CachedBlacklistRefreshToken(str(token))
+
+    def test_snapshot_queries_run_outside_the_lock(self):
+        lock_states = []
+
+        def record_lock_state(execute, sql, params, many, context):
+            lock_states.append(blacklist_cache._lock.locked())
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record_lock_state):
+            blacklist_cache.is_blacklisted('warm-up') # builds the snapshot
+            blacklist_cache._synced_at = 0.0
+            blacklist_cache.is_blacklisted('warm-up') # tops it up
+        self.assertEqual(lock_states, [False, False])
+
+    def test_rotation_writes_only_what_it_needs(self):
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        blacklist_cache.is_blacklisted('warm-up')
+        with CaptureQueriesContext(connection) as queries:
+            token = CachedBlacklistRefreshToken(str(token))
+            token.blacklist()
+            token.set_jti()
+            token.outstand()
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertEqual(statements.count('INSERT'), 2)
+
+
+class PurgeExpiredTokensTests(TestCase):
+    def test_deletes_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            expires_at = now - timedelta(days=1) if index < 3 else now + timedelta(days=1)
+            token = OutstandingToken.objects.create(jti=f'jti-{index}', token='x', expires_at=expires_at)
+            if index % 2 == 0:
+                BlacklistedToken.objects.create(token=token)
+
+        out = StringIO()
+        call_command('purge_expired_tokens', batch_size=2, stdout=out)
+
+        self.assertEqual(sorted(OutstandingToken.objects.values_list('jti', flat=True)), ['jti-3', 'jti-4'])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        self.assertIn('Deleted 3 expired outstanding tokens, 2 of them blacklisted.', out.getvalue())
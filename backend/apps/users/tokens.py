@@ -0,0 +1,166 @@
+# backend/apps/users/tokens.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from apps.common.bloom import BloomFilter
+
+from . import metrics
+
+
+class BlacklistCache:
+    """
+    In-process view of the refresh-token blacklist.
+
+    JTIs this process blacklisted recently are kept exactly. Everything else
+    that is blacklisted and not yet expired is summarised in a Bloom filter,
+    topped up with new BlacklistedToken rows (by primary key) every
+    `refresh_seconds` and rebuilt without expired tokens every
+    `rebuild_seconds` or once it is full. Only filter hits are confirmed
+    against the table.
+
+    A JTI blacklisted by another process since the last top-up reads as not
+    blacklisted; CachedBlacklistRefreshToken.blacklist() still rejects its
+    reuse through the unique constraint on BlacklistedToken.token.
+    """
+
+    def __init__(self, max_recent=10_000, refresh_seconds=5, rebuild_seconds=3600, error_rate=0.001):
+        self.max_recent = max_recent
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.error_rate = error_rate
+        self.reset()
+
+    def reset(self):
+        # Also runs in forked children, where the parent's lock may be held.
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._filter = None
+        self._last_id = 0
+        self._built_at = self._synced_at = 0.0
+        self._syncing = False
+
+    def add(self, jti):
+        with self._lock:
+            self._recent[jti] = None
+            self._recent.move_to_end(jti)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    def is_blacklisted(self, jti):
+        with self._lock:
+            if jti in self._recent:
+                return True
+        self._sync()
+        with self._lock:
+            if self._filter is not None and jti not in self._filter:
+                return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def _sync(self):
+        # One thread at a time queries, outside the lock; the others keep
+        # using the current filter (or the table, before the first build).
+        now = time.monotonic()
+        with self._lock:
+            if self._syncing:
+                return
+            rebuild = (
+                self._filter is None
+                or now - self._built_at >= self.rebuild_seconds
+                or len(self._filter) >= self._filter.capacity
+            )
+            if not rebuild and now - self._synced_at < self.refresh_seconds:
+                return
+            self._syncing = True
+            last_id = self._last_id
+        bloom = rows = None
+        try:
+            if rebuild:
+                rows = list(
+                    BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+                    .values_list('id', 'token__jti')
+                )
+                # Leave room for the top-ups until the next rebuild.
+                bloom = BloomFilter(max(2 * len(rows), 1024), self.error_rate)
+                for _, jti in rows:
+                    bloom.add(jti)
+                last_id = 0
+            else:
+                rows = list(BlacklistedToken.objects.filter(id__gt=last_id).values_list('id', 'token__jti'))
+        finally:
+            with self._lock:
+                self._syncing = False
+                if rows is not None:
+                    if bloom is not None:
+                        self._filter = bloom
+                        self._built_at = now
+                    else:
+                        for _, jti in rows:
+                            self._filter.add(jti)
+                    self._last_id = max((row_id for row_id, _ in rows), default=last_id)
+                    self._synced_at = now
+
+
+blacklist_cache = BlacklistCache(
+    refresh_seconds=settings.JWT_BLACKLIST_SNAPSHOT_REFRESH_SECONDS,
+    rebuild_seconds=settings.JWT_BLACKLIST_SNAPSHOT_REBUILD_SECONDS,
+)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=blacklist_cache.reset)
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    RefreshToken that checks the blacklist through blacklist_cache and writes
+    only the rows rotation needs. The stock token loads the user again for
+    blacklist() and outstand() and uses get_or_create for both tables; here a
+    refresh costs one lookup for the outstanding row and two INSERTs.
+    """
+
+    def check_blacklist(self):
+        if blacklist_cache.is_blacklisted(self.payload[jwt_settings.JTI_CLAIM]):
+            metrics.blacklist_hits.inc()
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        """
+        Blacklists this token. Raises TokenError if it already was, which also
+        catches a token replayed in parallel with its first use.
+        """
+        jti = self.payload[jwt_settings.JTI_CLAIM]
+        token_id = OutstandingToken.objects.filter(jti=jti).values_list('id', flat=True).first()
+        if token_id is None:
+            token_id = self.outstand().id
+        try:
+            with transaction.atomic():
+                blacklisted = BlacklistedToken.objects.create(token_id=token_id)
+        except IntegrityError:
+            blacklist_cache.add(jti)
+            metrics.blacklist_hits.inc()
+            raise TokenError(_('Token is blacklisted'))
+        blacklist_cache.add(jti)
+        return blacklisted
+
+    def outstand(self):
+        """
+        Records this token as outstanding. Only called for tokens whose JTI is
+        new (after set_jti(), or from blacklist()), so no lookup is needed.
+        """
+        return OutstandingToken.objects.create(
+            user_id=self.payload.get(jwt_settings.USER_ID_CLAIM),
+            jti=self.payload[jwt_settings.JTI_CLAIM],
+            token=str(self),
+            created_at=self.current_time,
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
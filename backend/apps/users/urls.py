@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import protected_user_detail
 
 urlpatterns = [
-    path('protected/', protected_user_detail, name='protected_user_detail'),
-]
\ No newline at end of file
+    path('protected/', async_views.protected_user_detail if settings.USE_ASYNC_VIEWS else protected_user_detail, name='protected_user_detail'),
+]
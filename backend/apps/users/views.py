@@ -1,18 +1,58 @@
+import hashlib
+import hmac
+import json
+import time
+from contextlib import contextmanager
+
+from allauth.account import app_settings as allauth_account_settings
+from allauth.account.signals import user_signed_up
+from allauth.account.utils import perform_login
+from django.conf import settings
+from django.contrib.sessions.backends.signed_cookies import SessionStore as SignedCookieSessionStore
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
 from dj_rest_auth.registration.views import RegisterView
-from dj_rest_auth.jwt_auth import set_jwt_cookies
+from dj_rest_auth.views import LoginView, UserDetailsView
+from dj_rest_auth.jwt_auth import get_refresh_view, set_jwt_cookies
 from dj_rest_auth.app_settings import api_settings
+from dj_rest_auth.utils import jwt_encode
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from .adapters import mail_on_commit
+from . import metrics
+from .authentication import StatelessJWTCookieAuthentication
+from .cache import user_detail_response, user_details
+from .serializers import ClaimsTokenRefreshSerializer
 
 User = get_user_model()
 
 # Create your views here.
 
+@contextmanager
+def _signup_session(request):
+    if api_settings.SESSION_LOGIN:
+        yield
+        return
+    # None on the API fast path (see PathDispatchMiddleware), which has no sessions.
+    session = getattr(request, 'session', None)
+    request.session = SignedCookieSessionStore()
+    try:
+        yield
+    finally:
+        if session is None:
+            del request.session
+        else:
+            request.session = session
+
+
 class CustomRegisterView(RegisterView):
     """
     Custom registration view that sets JWT cookies like LoginView does.
@@ -21,7 +61,34 @@ class CustomRegisterView(RegisterView):
     but doesn't set HttpOnly cookies. This custom view fixes that by calling
     set_jwt_cookies() just like LoginView does.
     """
-    
+
+    @metrics.observe_posts(metrics.registrations, metrics.registration_seconds)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        """
+        RegisterView.perform_create in one transaction. complete_signup is
+        spelled out (user_signed_up, then allauth's login flow) to pass the
+        signup email along, so email verification reads the address the
+        serializer cached instead of querying for it. Unless
+        REST_AUTH['SESSION_LOGIN'] is on, allauth logs in on a session that
+        is thrown away afterwards, as LoginView skips the session login.
+        """
+        request = self.request._request
+        verification = allauth_account_settings.EMAIL_VERIFICATION
+        with transaction.atomic(), mail_on_commit():
+            user = serializer.save(self.request)
+            if verification != allauth_account_settings.EmailVerificationMethod.MANDATORY:
+                if api_settings.USE_JWT:
+                    self.access_token, self.refresh_token = jwt_encode(user)
+                elif self.token_model:
+                    api_settings.TOKEN_CREATOR(self.token_model, user, serializer)
+            with _signup_session(request):
+                user_signed_up.send(sender=user.__class__, request=request, user=user)
+                perform_login(request, user, email_verification=verification, signup=True, email=user.email)
+        return user
+
     def create(self, request, *args, **kwargs):
         # Call the parent create method to handle registration
         response = super().create(request, *args, **kwargs)
@@ -37,15 +104,99 @@ class CustomRegisterView(RegisterView):
         return response
 
 
+class ClaimsTokenRefreshView(get_refresh_view()):
+    """
+    dj-rest-auth's cookie refresh view, re-stamping the user claims on the new
+    tokens (see ClaimsTokenRefreshSerializer). Routed in place of
+    /api/auth/token/refresh/.
+    """
+    serializer_class = ClaimsTokenRefreshSerializer
+
+    @metrics.observe_posts(metrics.token_refreshes, metrics.token_refresh_seconds)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+
+class MeteredLoginView(LoginView):
+    """dj-rest-auth's login view, counted and timed (apps/users/metrics.py)."""
+
+    @metrics.observe_posts(metrics.logins, metrics.login_seconds)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+
+_session_authentication = StatelessJWTCookieAuthentication()
+
+
+def session_introspection(request):
+    """
+    Minimal session check for the Next.js middleware: validates the access
+    token and returns the user: the /api/auth/user/ payload (from its cache,
+    see user_details) plus the is_staff and email_verified_at claims. A plain
+    Django view rather than DRF, and normally answered by
+    SessionIntrospectionMiddleware before the session, CSRF, auth and
+    messages middleware run. Makes no queries once the token version and the
+    user details are cached.
+
+    The response may be cached per token for `max-age` seconds (never past
+    the token's expiry). With SESSION_INTROSPECTION_SIGNING_KEY set, the body
+    is signed in X-Session-Signature (hex HMAC-SHA256) so the middleware can
+    check it came from here before caching it.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        result = _session_authentication.authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        result = None
+    details = None if result is None else user_details(result[0])
+    return session_response(result, details)
+
+
+def session_response(result, details):
+    """
+    Builds the session_introspection response from an authenticate() result
+    and the user's user_details().
+    """
+    if result is None:
+        response = HttpResponse(json.dumps({'authenticated': False}), content_type='application/json', status=401)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    user, token = result
+    now = int(time.time())
+    expires_at = min(token['exp'], now + settings.SESSION_INTROSPECTION_MAX_AGE)
+    body = json.dumps({
+        'authenticated': True,
+        'user': {
+            **details,
+            'is_staff': user.is_staff,
+            'email_verified_at': user.email_verified_at,
+        },
+        'expires_at': expires_at,
+    }, cls=DjangoJSONEncoder)
+    response = HttpResponse(body, content_type='application/json')
+    response['Cache-Control'] = f'private, max-age={max(expires_at - now, 0)}'
+    patch_vary_headers(response, ['Cookie', 'Authorization'])
+    if settings.SESSION_INTROSPECTION_SIGNING_KEY:
+        response['X-Session-Signature'] = hmac.new(
+            settings.SESSION_INTROSPECTION_SIGNING_KEY.encode(), body.encode(), hashlib.sha256,
+        ).hexdigest()
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def protected_user_detail(request):
     """
     Protected endpoint that returns detailed user information.
     Requires authentication via JWT token.
+    Supports If-None-Match/If-Modified-Since; see user_detail_response.
     """
-    user = request.user
-    
+    return user_detail_response(request, 'protected', _protected_user_payload)
+
+
+def _protected_user_payload(user):
     # Return all user fields except password
     user_data = {
         'id': user.id,
@@ -61,12 +212,22 @@ def protected_user_detail(request):
         # Add any other fields from your custom User model
     }
     
-    return Response({
+    return {
         'message': 'Access granted! Here is your protected user data.',
         'user': user_data,
         'authenticated': True,
         'timestamp': user.date_joined,
-    })
+    }
+
+
+class CachedUserDetailsView(UserDetailsView):
+    """
+    dj-rest-auth's /api/auth/user/ with conditional GET and a cached payload
+    (see user_detail_response). Updates go through the stock view.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return user_detail_response(request, 'details', lambda user: self.get_serializer(user).data)
 
 
 
@@ -105,17 +266,20 @@ class CustomResendEmailVerificationView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # SECURITY: Delete any existing confirmation tokens for this email
-            old_confirmations = EmailConfirmation.objects.filter(email_address=email_address)
-            deleted_count = old_confirmations.count()
-            old_confirmations.delete()
-            
-            # Create new confirmation token
-            new_confirmation = EmailConfirmation.create(email_address)
-            new_confirmation.save()
-            
-            # Send the verification email
-            new_confirmation.send(request, signup=False)
+            # One transaction, so with EMAIL_OUTBOX the queued email commits
+            # together with its confirmation key.
+            with transaction.atomic():
+                # SECURITY: Delete any existing confirmation tokens for this email
+                old_confirmations = EmailConfirmation.objects.filter(email_address=email_address)
+                deleted_count = old_confirmations.count()
+                old_confirmations.delete()
+
+                # Create new confirmation token
+                new_confirmation = EmailConfirmation.create(email_address)
+                new_confirmation.save()
+
+                # Send the verification email
+                new_confirmation.send(request, signup=False)
             
             return Response(
                 {'detail': 'Verification email sent.'},
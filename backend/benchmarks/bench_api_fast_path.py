@@ -0,0 +1,113 @@
+# backend/benchmarks/bench_api_fast_path.py
+"""
+Per-request cost of the middleware PathDispatchMiddleware skips for the API.
+
+    fast        API_FAST_PATH_PREFIXES=/api/ (API requests skip SITE_MIDDLEWARE)
+    full        API_FAST_PATH_PREFIXES empty (every request runs SITE_MIDDLEWARE,
+                as MIDDLEWARE did before the split)
+
+First the middleware alone: PathDispatchMiddleware around a view that
+returns an empty response, called with RequestFactory requests (process_view
+included), which is the overhead itself. Then whole requests through the
+WSGI handler via the test Client: GET and PATCH /api/auth/user/ with a JWT
+cookie, as one of --users users, against a scratch SQLite file.
+
+Run from backend/:
+    python -m benchmarks.bench_api_fast_path [--requests 3000] [--concurrency 1]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from benchmarks.harness import format_row, run_load, setup_django
+
+PROFILES = (('fast', ['/api/']), ('full', []))
+
+
+def middleware_only(path):
+    def request_once(state):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from apps.common.middleware import PathDispatchMiddleware
+
+        middleware = state.get('middleware')
+        if middleware is None:
+            def view(request):
+                return HttpResponse()
+            state['view'] = view
+            middleware = state['middleware'] = PathDispatchMiddleware(view)
+            state['factory'] = RequestFactory(HTTP_HOST='localhost')
+        request = state['factory'].get(path)
+        process_view = getattr(middleware, 'process_view', None)
+        if process_view is None or process_view(request, state['view'], (), {}) is None:
+            middleware(request)
+
+    return request_once
+
+
+def user_details(tokens, method):
+    def request_once(state):
+        from django.test import Client
+
+        client = state.get('client')
+        if client is None:
+            client = state['client'] = Client(HTTP_HOST='localhost')
+        client.cookies['my-app-auth'] = random.choice(tokens)
+        if method == 'GET':
+            response = client.get('/api/auth/user/')
+        else:
+            response = client.patch(
+                '/api/auth/user/', json.dumps({'first_name': 'Ada'}), content_type='application/json',
+            )
+        assert response.status_code == 200, response.status_code
+
+    return request_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        tokens = [
+            str(ClaimsTokenObtainPairSerializer.get_token(
+                User.objects.create_user(email=f'fastpath{n}@example.com', password='x')
+            ).access_token)
+            for n in range(args.users)
+        ]
+
+        print(f"{args.requests} requests, {args.users} users, concurrency {args.concurrency}")
+        scenarios = (
+            ('middleware only', lambda: middleware_only('/api/auth/user/')),
+            ('GET /api/auth/user/', lambda: user_details(tokens, 'GET')),
+            ('PATCH /api/auth/user/', lambda: user_details(tokens, 'PATCH')),
+        )
+        for label, scenario in scenarios:
+            for name, prefixes in PROFILES:
+                # Each run_load starts new threads, hence new middleware chains.
+                settings.API_FAST_PATH_PREFIXES = prefixes
+                run_load(scenario(), min(200, args.requests), args.concurrency) # warm-up
+                print(format_row(f'{label} {name}', run_load(scenario(), args.requests, args.concurrency)))
+        settings.API_FAST_PATH_PREFIXES = ['/api/']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# backend/benchmarks/bench_async_views.py
+"""
+Sync (DRF) vs async views under one ASGI worker.
+
+    resend-email   POST /api/auth/custom-registration/resend-email/ with an
+                   SMTP backend that takes --smtp-ms per send
+    protected      GET /api/users/protected/ (payload cached after the first hit)
+
+Both variants run in the same process, on the same event loop, with
+--concurrency requests in flight: the sync views behind Django's ASGI handler
+as asgi.py serves them with USE_ASYNC_VIEWS off, the async views with it on.
+Sync views share one thread, so a slow SMTP round trip holds up every request
+behind it. Runs against a scratch SQLite file.
+
+Run from backend/:
+    python -m benchmarks.bench_async_views [--requests 300] [--users 50] [--concurrency 20] [--smtp-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from django.core.mail.backends.base import BaseEmailBackend
+
+from benchmarks.harness import format_row, setup_django, summarize
+
+
+class SlowEmailBackend(BaseEmailBackend):
+    """Discards messages after sleeping BENCH_SMTP_MS per send, like a remote SMTP server."""
+
+    def send_messages(self, email_messages):
+        time.sleep(int(os.environ.get('BENCH_SMTP_MS', '50')) / 1000)
+        return len(email_messages)
+
+
+def async_urlconf():
+    """URLconf module with the routes urls.py serves when USE_ASYNC_VIEWS is on."""
+    from types import ModuleType
+
+    from django.urls import include, path
+
+    from apps.users import async_views
+
+    urlconf = ModuleType('bench_async_urls')
+    urlconf.urlpatterns = [
+        path('api/auth/session/', async_views.session_introspection, name='session_introspection'),
+        path('api/auth/custom-registration/', async_views.register, name='rest_register'),
+        path('api/auth/custom-registration/resend-email/', async_views.resend_email_verification),
+        path('api/users/protected/', async_views.protected_user_detail),
+        path('accounts/', include('allauth.urls')),
+    ]
+    return urlconf
+
+
+async def run_async_load(request_once, total, concurrency):
+    """run_load() for coroutines: `concurrency` tasks share `total` requests."""
+    from django.test import AsyncClient
+
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        client = AsyncClient()
+        for _ in remaining:
+            started = time.perf_counter()
+            await request_once(client)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def resend_email(emails):
+    async def request_once(client):
+        response = await client.post(
+            '/api/auth/custom-registration/resend-email/', {'email': random.choice(emails)}, content_type='application/json'
+        )
+        assert response.status_code == 200, (response.status_code, response.content[:200])
+
+    return request_once
+
+
+def protected(tokens):
+    async def request_once(client):
+        client.cookies['my-app-auth'] = random.choice(tokens)
+        response = await client.get('/api/users/protected/')
+        assert response.status_code == 200, (response.status_code, response.content[:200])
+
+    return request_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--smtp-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ['BENCH_SMTP_MS'] = str(args.smtp_ms)
+        os.environ['USE_ASYNC_VIEWS'] = 'False'
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from allauth.account.models import EmailAddress
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+        settings.ALLOWED_HOSTS.append('testserver') # AsyncClient's Host
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        settings.EMAIL_BACKEND = 'benchmarks.bench_async_views.SlowEmailBackend'
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        emails, tokens = [], []
+        for n in range(args.users):
+            user = User.objects.create_user(email=f'async{n}@example.com', password='x')
+            EmailAddress.objects.create(user=user, email=user.email, primary=True, verified=False)
+            emails.append(user.email)
+            tokens.append(str(ClaimsTokenObtainPairSerializer.get_token(user).access_token))
+
+        sync_urlconf = settings.ROOT_URLCONF
+        print(
+            f"{args.requests} requests, concurrency {args.concurrency}, one event loop, "
+            f"SMTP {args.smtp_ms} ms"
+        )
+        for name, scenario in (('resend-email', resend_email(emails)), ('protected', protected(tokens))):
+            for variant, urlconf in (('sync', sync_urlconf), ('async', async_urlconf())):
+                settings.ROOT_URLCONF = urlconf
+                asyncio.run(run_async_load(scenario, min(50, args.requests), args.concurrency)) # warm-up
+                result = asyncio.run(run_async_load(scenario, args.requests, args.concurrency))
+                print(format_row(f'{name} ({variant})', result))
+        settings.ROOT_URLCONF = sync_urlconf
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# backend/benchmarks/bench_base62.py
+"""
+Micro-benchmark for Base62 ID generation.
+
+Compares the original per-character `secrets.choice` implementation with the
+os.urandom block generator and the per-process ID buffer.
+
+Run from backend/:
+    python -m benchmarks.bench_base62 [--count 100000]
+"""
+import argparse
+import secrets
+import timeit
+
+from apps.common.utils import BASE62_ALPHABET, Base62IDBuffer, generate_base62_ids
+
+
+def secrets_choice_id(length):
+    # The implementation generate_base62_id used before the block generator.
+    return ''.join(secrets.choice(BASE62_ALPHABET) for _ in range(length))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--length', type=int, default=30)
+    args = parser.parse_args()
+
+    count, length = args.count, args.length
+    buffer = Base62IDBuffer(length=length)
+    cases = [
+        ("secrets.choice per char", lambda: [secrets_choice_id(length) for _ in range(count)]),
+        ("generate_base62_ids batch", lambda: generate_base62_ids(count, length)),
+        ("Base62IDBuffer.take", lambda: [buffer.take() for _ in range(count)]),
+    ]
+
+    print(f"{count} IDs of {length} chars (best of 3)")
+    baseline = None
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        baseline = baseline or seconds
+        print(f"  {name:<28} {seconds * 1000:9.1f} ms  {count / seconds:12,.0f} ids/s  x{baseline / seconds:.1f}")
+
+
+if __name__ == '__main__':
+    main()
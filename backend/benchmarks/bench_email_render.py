@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_email_render.py
+"""
+Micro-benchmark for auth email rendering.
+
+Compares allauth's DefaultAccountAdapter.render_mail (template lookup and
+RequestContext per email) with CustomAccountAdapter.render_mail (templates
+compiled once, plain Context) and a bulk render_emails() pass, for the
+email confirmation and password reset emails.
+
+Run from backend/:
+    python -m benchmarks.bench_email_render [--count 2000]
+"""
+import argparse
+import timeit
+
+from benchmarks.harness import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from allauth.account.adapter import DefaultAccountAdapter
+    from allauth.core import context
+    from django.conf import settings
+    from django.test import RequestFactory
+
+    from apps.common.email_templates import render_emails
+    from apps.users.adapters import CustomAccountAdapter
+
+    settings.DEBUG = False
+    count = args.count
+    request = RequestFactory().get('/', HTTP_HOST='localhost')
+    shared = {
+        'request': request,
+        'current_site': {'name': 'Scaffold', 'domain': 'localhost'},
+        'user': None,
+    }
+
+    def personal(n):
+        return {
+            'email': f'user{n}@example.com',
+            'activate_url': f'http://localhost:3000/confirm-email/key{n}',
+            'password_reset_url': f'http://localhost:3000/reset/{n}',
+        }
+
+    stock, custom = DefaultAccountAdapter(request), CustomAccountAdapter(request)
+    with context.request_context(request):
+        for prefix in ('account/email/email_confirmation', 'account/email/password_reset_key'):
+            cases = [
+                ("allauth render_mail", lambda: [
+                    stock.render_mail(prefix, f'user{n}@example.com', {**shared, **personal(n)}) for n in range(count)
+                ]),
+                ("cached render_mail", lambda: [
+                    custom.render_mail(prefix, f'user{n}@example.com', {**shared, **personal(n)}) for n in range(count)
+                ]),
+                ("render_emails bulk", lambda: render_emails(
+                    prefix, [(f'user{n}@example.com', personal(n)) for n in range(count)], shared
+                )),
+            ]
+            print(f"{prefix}: {count} emails (best of 3)")
+            baseline = None
+            for name, func in cases:
+                seconds = min(timeit.repeat(func, number=1, repeat=3))
+                baseline = baseline or seconds
+                print(f"  {name:<28} {seconds * 1000:9.1f} ms  {count / seconds:12,.0f} emails/s  x{baseline / seconds:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_id_storage.py
+"""
+Compares table and index sizes for semantic IDs stored as varchar(32) versus
+packed 23-byte binary (SemanticIDField(binary=True)).
+
+Builds a users table, an FK table with an index on user_id (like
+account_emailaddress) and an M2M table (like users_user_groups) in a scratch
+SQLite file for each storage mode and reports the sizes from the dbstat
+virtual table.
+
+Run from backend/:
+    python -m benchmarks.bench_id_storage [--rows 100000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from apps.common.utils import decode_base62, generate_base62_ids
+
+BINARY_LENGTH = 23
+
+
+def build(path, ids, column_type):
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE users (id {column_type} NOT NULL PRIMARY KEY, email varchar(254) NOT NULL);
+        CREATE TABLE emailaddress (id integer PRIMARY KEY, user_id {column_type} NOT NULL REFERENCES users (id));
+        CREATE INDEX emailaddress_user_id ON emailaddress (user_id);
+        CREATE TABLE user_groups (id integer PRIMARY KEY, user_id {column_type} NOT NULL REFERENCES users (id), group_id integer NOT NULL);
+        CREATE UNIQUE INDEX user_groups_user_group ON user_groups (user_id, group_id);
+        CREATE INDEX user_groups_user_id ON user_groups (user_id);
+    """)
+    with conn:
+        conn.executemany("INSERT INTO users VALUES (?, ?)", ((pk, f"user{i}@example.com") for i, pk in enumerate(ids)))
+        conn.executemany("INSERT INTO emailaddress (user_id) VALUES (?)", ((pk,) for pk in ids))
+        conn.executemany("INSERT INTO user_groups (user_id, group_id) VALUES (?, 1)", ((pk,) for pk in ids))
+    conn.execute("VACUUM")
+    sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    conn.close()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    text_ids = [f"US{body}" for body in generate_base62_ids(args.rows, 30)]
+    binary_ids = [decode_base62(pk[2:]).to_bytes(BINARY_LENGTH, 'big') for pk in text_ids]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text = build(os.path.join(tmp, 'text.sqlite3'), text_ids, 'varchar(32)')
+        binary = build(os.path.join(tmp, 'binary.sqlite3'), binary_ids, 'BLOB')
+
+    print(f"{args.rows} users, SQLite page bytes per object")
+    print(f"  {'object':<34}{'varchar(32)':>14}{'binary(23)':>14}{'change':>9}")
+    for name in sorted(text):
+        if name.startswith('sqlite_schema'):
+            continue
+        change = (binary[name] - text[name]) / text[name] * 100
+        print(f"  {name:<34}{text[name]:>14,}{binary[name]:>14,}{change:>8.1f}%")
+    total_text, total_binary = sum(text.values()), sum(binary.values())
+    print(f"  {'total':<34}{total_text:>14,}{total_binary:>14,}{(total_binary - total_text) / total_text * 100:>8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
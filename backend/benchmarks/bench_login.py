@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_login.py
+"""
+Login throughput with last_login written on every login vs coalesced.
+
+    every-login     LAST_LOGIN_GRANULARITY_SECONDS=0: one UPDATE per login
+    coalesced       LAST_LOGIN_GRANULARITY_SECONDS=300 (the default)
+    buffered        coalesced, plus LAST_LOGIN_FLUSH_SECONDS=1
+
+Starts --workers separate processes, like WSGI worker processes, that share
+one SQLite file with --users accounts. Each process logs every account in
+--rounds times through POST /api/auth/login/ and counts its UPDATEs of
+users_user. Failed requests (typically "database is locked" 500s) are
+counted separately.
+
+Run from backend/:
+    python -m benchmarks.bench_login [--workers 4] [--users 50] [--rounds 4]
+MD5 is used as the password hasher so the database, not hashing, dominates.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    'every-login': {'LAST_LOGIN_GRANULARITY_SECONDS': '0', 'LAST_LOGIN_FLUSH_SECONDS': '0'},
+    'coalesced': {'LAST_LOGIN_GRANULARITY_SECONDS': '300', 'LAST_LOGIN_FLUSH_SECONDS': '0'},
+    'buffered': {'LAST_LOGIN_GRANULARITY_SECONDS': '300', 'LAST_LOGIN_FLUSH_SECONDS': '1'},
+}
+PASSWORD = 'Bench-password-123'
+
+
+def email(n):
+    return f'login{n}@example.com'
+
+
+def setup(users):
+    from benchmarks.harness import setup_django
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    User = get_user_model()
+    for n in range(users):
+        User.objects.create_user(email=email(n), password=PASSWORD)
+
+
+def worker(users, rounds):
+    from benchmarks.harness import setup_django
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+
+    from apps.users.logins import login_buffer
+
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    updates = 0
+
+    def count_updates(execute, sql, params, many, context):
+        nonlocal updates
+        updates += sql.startswith('UPDATE "users_user"')
+        return execute(sql, params, many, context)
+
+    ok = failed = 0
+    client = Client(HTTP_HOST='localhost')
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_updates):
+        for _ in range(rounds):
+            for n in range(users):
+                response = client.post(
+                    '/api/auth/login/', {'email': email(n), 'password': PASSWORD}, content_type='application/json',
+                )
+                ok, failed = (ok + 1, failed) if response.status_code == 200 else (ok, failed + 1)
+        login_buffer.flush()
+    print(json.dumps({'ok': ok, 'failed': failed, 'updates': updates, 'seconds': time.perf_counter() - started}))
+
+
+def run_profile(env, workers, users, rounds):
+    module = [sys.executable, '-m', 'benchmarks.bench_login', '--users', str(users), '--rounds', str(rounds)]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, **env, 'SQLITE_DB_NAME': os.path.join(tmp, 'bench.sqlite3')}
+        env.pop('DATABASE_URL', None)
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v0'], env=env, check=True, capture_output=True)
+        subprocess.run(module + ['--setup'], env=env, check=True, capture_output=True)
+        started = time.perf_counter()
+        processes = [
+            subprocess.Popen(module + ['--worker'], env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for _ in range(workers)
+        ]
+        results = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+        wall = time.perf_counter() - started
+    return {key: sum(result[key] for result in results) for key in ('ok', 'failed', 'updates')}, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=4, help='logins per account per worker')
+    parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.setup:
+        setup(args.users)
+        return
+    if args.worker:
+        worker(args.users, args.rounds)
+        return
+
+    print(f"{args.workers} worker processes x {args.users} accounts x {args.rounds} logins")
+    for name, env in PROFILES.items():
+        totals, wall = run_profile(env, args.workers, args.users, args.rounds)
+        print(
+            f"  {name:<12} {totals['ok'] / wall:8.1f} logins/s  ok {totals['ok']:5d}  failed {totals['failed']:4d}"
+            f"  user UPDATEs {totals['updates']:5d}  wall {wall:6.2f} s"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# backend/benchmarks/bench_metrics.py
+"""
+Micro-benchmark for the metrics registry (apps/common/metrics.py).
+
+Cost of Counter.inc and Histogram.observe with values in process memory
+(no METRICS_DIR) and in a memory-mapped file per process (METRICS_DIR),
+and of rendering /metrics from --workers worker files.
+
+Run from backend/:
+    python -m benchmarks.bench_metrics [--count 200000] [--workers 8]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from benchmarks.harness import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django()
+        from django.conf import settings
+
+        from apps.common import metrics
+        from apps.users.metrics import login_seconds, logins
+
+        count = args.count
+        print(f"{count} updates (best of 3)")
+        for name, directory in (('memory', ''), ('mmap', os.path.join(tmp, 'metrics'))):
+            settings.METRICS_DIR = directory
+            metrics.store.reset()
+            cases = [
+                ('Counter.inc', lambda: [logins.inc(outcome='success') for _ in range(count)]),
+                ('Histogram.observe', lambda: [login_seconds.observe(0.03, outcome='success') for _ in range(count)]),
+            ]
+            for case, func in cases:
+                seconds = min(timeit.repeat(func, number=1, repeat=3))
+                print(f"  {name:<7} {case:<18} {seconds / count * 1e9:8.0f} ns/update")
+
+        # Simulated workers: one file each, as many keys as this process has.
+        keys = dict(metrics.store._values.items())
+        for worker in range(args.workers - 1):
+            values = metrics.MmapValues(os.path.join(settings.METRICS_DIR, f'metrics-bench{worker}.db'))
+            for key, value in keys.items():
+                values.add(key, value)
+        seconds = min(timeit.repeat(metrics.exposition, number=10, repeat=3)) / 10
+        print(f"  /metrics over {args.workers} worker files, {len(keys)} keys each: {seconds * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_profiling.py
+"""
+Overhead of ProfilingMiddleware on the requests it does not profile, and
+the cost of the ones it does.
+
+    off         PROFILING_SAMPLE_RATE=0, PROFILING_TOKENS off (not loaded)
+    armed       PROFILING_TOKENS on, no token sent (header lookup only)
+    sampled     PROFILING_SAMPLE_RATE=0.01
+    cprofile    every request under cProfile
+    sample      every request under the stack sampler (5 ms interval)
+
+Requests go through the full WSGI handler via the test Client, as one of
+--users logged-in users, against a scratch SQLite file. Profiles go to a
+scratch directory.
+
+Run from backend/:
+    python -m benchmarks.bench_profiling [--requests 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.harness import format_row, run_load, setup_django
+
+SCENARIOS = (
+    ('off', {'PROFILING_SAMPLE_RATE': 0.0, 'PROFILING_TOKENS': False}),
+    ('armed', {'PROFILING_SAMPLE_RATE': 0.0, 'PROFILING_TOKENS': True}),
+    ('sampled', {'PROFILING_SAMPLE_RATE': 0.01, 'PROFILING_TOKENS': False}),
+    ('cprofile', {'PROFILING_SAMPLE_RATE': 1.0, 'PROFILING_MODE': 'cprofile'}),
+    ('sample', {'PROFILING_SAMPLE_RATE': 1.0, 'PROFILING_MODE': 'sample'}),
+)
+
+
+def get(tokens, path):
+    def request_once(state):
+        from django.test import Client
+
+        client = state.get('client')
+        if client is None:
+            client = state['client'] = Client(HTTP_HOST='localhost')
+        client.cookies['my-app-auth'] = random.choice(tokens)
+        response = client.get(path)
+        assert response.status_code == 200, response.status_code
+
+    return request_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        settings.PROFILING_DIR = os.path.join(tmp, 'profiles')
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        tokens = [
+            str(ClaimsTokenObtainPairSerializer.get_token(
+                User.objects.create_user(email=f'profiling{n}@example.com', password='x')
+            ).access_token)
+            for n in range(args.users)
+        ]
+
+        print(f"{args.requests} requests, {args.users} users, sequential")
+        for name, overrides in SCENARIOS:
+            # Each run_load starts a new thread, hence a new client (middleware chain).
+            for setting, value in overrides.items():
+                setattr(settings, setting, value)
+            run_load(get(tokens, '/api/auth/user/'), min(200, args.requests), 1) # warm-up
+            print(format_row(name, run_load(get(tokens, '/api/auth/user/'), args.requests, 1)))
+        settings.PROFILING_SAMPLE_RATE, settings.PROFILING_TOKENS = 0.0, False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# backend/benchmarks/bench_registration.py
+"""
+Registrations per second: dj-rest-auth's signup pipeline vs CustomRegisterView.
+
+    stock      RegisterSerializer.save and RegisterView.perform_create
+               (allauth's setup_user_email and complete_signup, session login,
+               every statement in its own transaction)
+    custom     CustomRegisterSerializer.save and CustomRegisterView.perform_create
+               (one transaction, no ID probe, no address lookups, no session row)
+
+Both share the rest of the stack (adapter, SemanticIDField), so the stock
+numbers already include those changes. Drives POST /api/auth/custom-registration/
+through the test Client against a scratch SQLite file, with the locmem email
+backend, and reports SQL statements per registration (a transaction's
+BEGIN counts as one).
+
+Run from backend/:
+    python -m benchmarks.bench_registration [--requests 300] [--verification none]
+MD5 is used as the password hasher so hashing does not hide the database work.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+from types import ModuleType
+
+from benchmarks.harness import format_row, run_load, setup_django
+
+
+def stock_urlconf():
+    from importlib import import_module
+
+    from dj_rest_auth.registration.views import RegisterView
+    from dj_rest_auth.registration.serializers import RegisterSerializer
+    from django.conf import settings
+    from django.urls import path
+
+    from apps.users.serializers import CustomRegisterSerializer
+    from apps.users.views import CustomRegisterView
+
+    class StockRegisterSerializer(CustomRegisterSerializer):
+        save = RegisterSerializer.save
+
+    class StockRegisterView(CustomRegisterView):
+        serializer_class = StockRegisterSerializer
+        perform_create = RegisterView.perform_create
+
+    module = ModuleType('bench_registration_urls')
+    module.urlpatterns = [
+        path('api/auth/custom-registration/', StockRegisterView.as_view()),
+        *import_module(settings.ROOT_URLCONF).urlpatterns,
+    ]
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--verification', choices=['none', 'optional', 'mandatory'], default='none')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ['ACCOUNT_EMAIL_VERIFICATION'] = args.verification
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test import Client
+
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        call_command('migrate', verbosity=0)
+
+        counter = itertools.count()
+        statements = 0
+
+        def count_statements(execute, sql, params, many, context):
+            nonlocal statements
+            statements += 1
+            return execute(sql, params, many, context)
+
+        def request_once(state):
+            # A new client per registration: no cookies from the previous one.
+            password = 'Bench-password-123'
+            with connection.execute_wrapper(count_statements): # the worker thread's connection
+                response = Client(HTTP_HOST='localhost').post(
+                    '/api/auth/custom-registration/',
+                    {'email': f'reg{next(counter)}@example.com', 'password1': password, 'password2': password},
+                    content_type='application/json',
+                )
+            assert response.status_code == 201, (response.status_code, response.content[:200])
+
+        print(f"{args.requests} registrations, ACCOUNT_EMAIL_VERIFICATION={args.verification}, sequential")
+        default_urlconf = settings.ROOT_URLCONF
+        for name, urlconf in (('stock', stock_urlconf()), ('custom', default_urlconf)):
+            settings.ROOT_URLCONF = urlconf
+            run_load(request_once, 20, 1) # warm-up
+            statements = 0
+            result = run_load(request_once, args.requests, 1)
+            print(f"{format_row(name, result)}  {statements / args.requests:5.1f} statements/registration")
+        settings.ROOT_URLCONF = default_urlconf
+
+
+if __name__ == '__main__':
+    main()
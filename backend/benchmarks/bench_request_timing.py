@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_request_timing.py
+"""
+Overhead of RequestTimingMiddleware at different sample rates.
+
+    off         REQUEST_TIMING_SAMPLE_RATE=0 (middleware not loaded)
+    sampled     REQUEST_TIMING_SAMPLE_RATE=0.01
+    every       REQUEST_TIMING_SAMPLE_RATE=1 (Server-Timing header and log
+                line on every response)
+
+Requests go through the full WSGI handler via the test Client, as one of
+--users logged-in users, against a scratch SQLite file. The timing log
+lines are built and handed to a NullHandler instead of stderr.
+
+Run from backend/:
+    python -m benchmarks.bench_request_timing [--requests 3000] [--concurrency 1]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+
+from benchmarks.harness import format_row, run_load, setup_django
+
+
+def get(tokens, path):
+    def request_once(state):
+        from django.test import Client
+
+        client = state.get('client')
+        if client is None:
+            client = state['client'] = Client(HTTP_HOST='localhost')
+        client.cookies['my-app-auth'] = random.choice(tokens)
+        response = client.get(path)
+        assert response.status_code == 200, response.status_code
+
+    return request_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+        logging.getLogger('apps.common.timing').handlers = [logging.NullHandler()]
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        tokens = [
+            str(ClaimsTokenObtainPairSerializer.get_token(
+                User.objects.create_user(email=f'timing{n}@example.com', password='x')
+            ).access_token)
+            for n in range(args.users)
+        ]
+
+        print(f"{args.requests} requests, {args.users} users, concurrency {args.concurrency}")
+        for path in ('/api/auth/user/', '/api/auth/session/'):
+            for name, rate in (('off', 0.0), ('sampled', 0.01), ('every', 1.0)):
+                # Each run_load starts new threads, hence new clients (middleware
+                # chains) and new database connections for the changed setting.
+                settings.REQUEST_TIMING_SAMPLE_RATE = rate
+                run_load(get(tokens, path), min(200, args.requests), args.concurrency) # warm-up
+                print(format_row(f'{path} {name}', run_load(get(tokens, path), args.requests, args.concurrency)))
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0.0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_session_navigation.py
+"""
+Backend latency per page navigation as seen by the Next.js middleware.
+
+    user-endpoint   GET /api/auth/user/ on every navigation (old middleware)
+    session         GET /api/auth/session/ on every navigation
+    session+cache   /api/auth/session/ behind the middleware's per-token
+                    micro-cache, honouring the response's max-age
+
+Navigations pick one of --users logged-in users at random and go through the
+full WSGI handler via the test Client. Runs against a scratch SQLite file.
+
+Run from backend/:
+    python -m benchmarks.bench_session_navigation [--navigations 5000] [--users 50] [--concurrency 4]
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from benchmarks.harness import format_row, run_load, setup_django
+
+
+def navigate(tokens, path, micro_cache=None):
+    def request_once(state):
+        from django.test import Client
+
+        client = state.get('client')
+        if client is None:
+            client = state['client'] = Client(HTTP_HOST='localhost')
+        token = random.choice(tokens)
+        if micro_cache is not None:
+            cached = micro_cache.get(token)
+            if cached and cached > time.monotonic():
+                return
+        client.cookies['my-app-auth'] = token
+        response = client.get(path)
+        assert response.status_code == 200, response.status_code
+        if micro_cache is not None:
+            max_age = int(re.search(r'max-age=(\d+)', response['Cache-Control']).group(1))
+            micro_cache[token] = time.monotonic() + max_age
+
+    return request_once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--navigations', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ.pop('DATABASE_URL', None)
+        setup_django()
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        from apps.users.serializers import ClaimsTokenObtainPairSerializer
+
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        call_command('migrate', verbosity=0)
+        User = get_user_model()
+        tokens = [
+            str(ClaimsTokenObtainPairSerializer.get_token(
+                User.objects.create_user(email=f'nav{n}@example.com', password='x')
+            ).access_token)
+            for n in range(args.users)
+        ]
+
+        print(f"{args.navigations} navigations, {args.users} users, concurrency {args.concurrency}")
+        scenarios = [
+            ('user-endpoint', '/api/auth/user/', None),
+            ('session', '/api/auth/session/', None),
+            ('session+cache', '/api/auth/session/', {}),
+        ]
+        for name, path, micro_cache in scenarios:
+            run_load(navigate(tokens, path, micro_cache), min(200, args.navigations), args.concurrency) # warm-up
+            if micro_cache is not None:
+                micro_cache.clear()
+            print(format_row(name, run_load(navigate(tokens, path, micro_cache), args.navigations, args.concurrency)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_smtp_pool.py
+"""
+SMTP delivery throughput: Django's SMTP backend vs PooledSMTPEmailBackend.
+
+    smtp            django.core.mail.backends.smtp, one send per email (what
+                    the auth flows do: a new connection per email)
+    pooled          PooledSMTPEmailBackend, one send per email
+    pooled-batch    PooledSMTPEmailBackend, all emails in one send_messages()
+                    over one session (ignores --concurrency)
+
+The server is a local aiosmtpd instance whose every reply is delayed by
+--rtt-ms to stand in for the network. Without TLS or AUTH, connection setup
+here costs two round trips (greeting, EHLO); a real STARTTLS+AUTH session
+costs several more, so the pool saves more in production than shown.
+
+Needs aiosmtpd (pip install aiosmtpd). Run from backend/:
+    python -m benchmarks.bench_smtp_pool [--emails 200] [--rtt-ms 5] [--concurrency 1]
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from benchmarks.harness import format_row, run_load, setup_django, summarize
+
+
+class CountingHandler:
+    def __init__(self):
+        self.delivered = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered += 1
+        return '250 OK'
+
+
+def start_server(rtt):
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import SMTP
+
+    class DelayedSMTP(SMTP):
+        async def push(self, status):
+            await asyncio.sleep(rtt)
+            await super().push(status)
+
+    class DelayedController(Controller):
+        def factory(self):
+            return DelayedSMTP(self.handler, **self.SMTP_kwargs)
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    handler = CountingHandler()
+    controller = DelayedController(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    return controller, handler, port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--emails', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.mail import EmailMessage, get_connection
+
+    from apps.common.mail import smtp_pool
+
+    controller, handler, port = start_server(args.rtt_ms / 1000)
+    options = {'host': '127.0.0.1', 'port': port, 'username': '', 'password': '', 'use_tls': False}
+
+    def message(n):
+        return EmailMessage(f'Message {n}', 'Body', 'from@example.com', [f'user{n}@example.com'])
+
+    def send_one(backend):
+        def request_once(state):
+            get_connection(backend, **options).send_messages([message(0)])
+        return request_once
+
+    try:
+        print(f"{args.emails} emails, reply delay {args.rtt_ms} ms, concurrency {args.concurrency}")
+        for name, backend in (
+            ('smtp', 'django.core.mail.backends.smtp.EmailBackend'),
+            ('pooled', 'apps.common.mail.PooledSMTPEmailBackend'),
+        ):
+            print(format_row(name, run_load(send_one(backend), args.emails, args.concurrency)))
+
+        smtp_pool.clear()
+        started = time.perf_counter()
+        get_connection('apps.common.mail.PooledSMTPEmailBackend', **options).send_messages(
+            [message(n) for n in range(args.emails)]
+        )
+        wall = time.perf_counter() - started
+        # One call: report per-email latency as wall time / emails.
+        print(format_row('pooled-batch', summarize([wall / args.emails] * args.emails, wall)))
+    finally:
+        smtp_pool.clear()
+        controller.stop()
+    print(f"  delivered {handler.delivered} emails")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_sqlite_concurrency.py
+"""
+Parallel registrations and logins against a SQLite file, default vs SQLITE_TUNED.
+
+Starts --workers separate processes, like WSGI worker processes, that share one
+database file. Each process drives the full Django WSGI handler through the
+test Client: it registers --users accounts and then logs each one in. Failed
+requests (typically "database is locked" 500s) are counted separately from
+successful ones.
+
+Run from backend/:
+    python -m benchmarks.bench_sqlite_concurrency [--workers 8] [--users 50]
+Pass --real-hasher to keep the configured password hasher. By default MD5 is
+used, so the database is the bottleneck rather than password hashing.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    'default': {'SQLITE_TUNED': 'False'},
+    'tuned': {'SQLITE_TUNED': 'True'},
+}
+
+
+def worker(index, users, real_hasher):
+    from benchmarks.harness import setup_django
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+
+    if not real_hasher:
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    ok = failed = 0
+    password = 'Bench-password-123'
+    emails = [f'w{index}-u{n}@example.com' for n in range(users)]
+    started = time.perf_counter()
+    for email in emails:
+        response = Client(HTTP_HOST='localhost').post(
+            '/api/auth/custom-registration/',
+            {'email': email, 'password1': password, 'password2': password},
+            content_type='application/json',
+        )
+        ok, failed = (ok + 1, failed) if response.status_code == 201 else (ok, failed + 1)
+    for email in emails:
+        response = Client(HTTP_HOST='localhost').post(
+            '/api/auth/login/', {'email': email, 'password': password}, content_type='application/json',
+        )
+        ok, failed = (ok + 1, failed) if response.status_code == 200 else (ok, failed + 1)
+    print(json.dumps({'ok': ok, 'failed': failed, 'seconds': time.perf_counter() - started}))
+
+
+def run_profile(env, workers, users, real_hasher):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, **env, 'SQLITE_DB_NAME': os.path.join(tmp, 'bench.sqlite3')}
+        env.pop('DATABASE_URL', None)
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v0'], env=env, check=True, capture_output=True)
+        command = [sys.executable, '-m', 'benchmarks.bench_sqlite_concurrency', '--users', str(users)]
+        if real_hasher:
+            command.append('--real-hasher')
+        started = time.perf_counter()
+        processes = [
+            subprocess.Popen(command + ['--worker', str(index)], env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for index in range(workers)
+        ]
+        results = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+        wall = time.perf_counter() - started
+    ok = sum(result['ok'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    return ok, failed, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--users', type=int, default=50, help='registrations (and logins) per worker')
+    parser.add_argument('--real-hasher', action='store_true')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        worker(args.worker, args.users, args.real_hasher)
+        return
+
+    print(f"{args.workers} worker processes x {args.users} registrations + {args.users} logins")
+    for name, env in PROFILES.items():
+        ok, failed, wall = run_profile(env, args.workers, args.users, args.real_hasher)
+        print(f"  {name:<8} {ok / wall:8.1f} ok req/s  ok {ok:5d}  failed {failed:5d}  wall {wall:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
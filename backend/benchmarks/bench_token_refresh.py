@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_token_refresh.py
+"""
+Refresh-token rotation cost with the stock simplejwt blacklist versus
+CachedBlacklistRefreshToken, at growing blacklist table sizes.
+
+Each rotation verifies the refresh token (blacklist check), blacklists it,
+and outstands its replacement, as ClaimsTokenRefreshSerializer does. Runs
+against a scratch SQLite file; --rows blacklisted tokens are seeded per step.
+
+Run from backend/:
+    python -m benchmarks.bench_token_refresh [--rows 100000] [--steps 3] [--rotations 500]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+
+def seed(count, expires_at):
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    for start in range(0, count, 5000):
+        batch = [
+            OutstandingToken(jti=uuid.uuid4().hex, token='x', expires_at=expires_at)
+            for _ in range(min(5000, count - start))
+        ]
+        OutstandingToken.objects.bulk_create(batch)
+        jtis = [token.jti for token in batch]
+        BlacklistedToken.objects.bulk_create(
+            BlacklistedToken(token_id=token_id)
+            for token_id in OutstandingToken.objects.filter(jti__in=jtis).values_list('id', flat=True)
+        )
+
+
+def rotate(token_class, user, rotations):
+    from django.db import connection
+
+    token = str(token_class.for_user(user))
+    timings = []
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        for _ in range(rotations):
+            started = time.perf_counter()
+            refresh = token_class(token)
+            refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            token = str(refresh)
+            timings.append(time.perf_counter() - started)
+    return statistics.fmean(timings) * 1000, len(queries) / rotations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100_000, help='blacklisted tokens added per step')
+    parser.add_argument('--steps', type=int, default=3)
+    parser.add_argument('--rotations', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SQLITE_DB_NAME'] = os.path.join(tmp, 'bench.sqlite3')
+        os.environ.pop('DATABASE_URL', None)
+        from benchmarks.harness import setup_django
+        setup_django()
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        from apps.users.tokens import CachedBlacklistRefreshToken, blacklist_cache
+
+        call_command('migrate', verbosity=0)
+        user = get_user_model().objects.create_user(email='bench-refresh@example.com', password='x')
+
+        print(f"{args.rotations} rotations per row, mean ms and queries per rotation")
+        print(f"  {'blacklisted rows':>16}{'stock ms':>10}{'queries':>9}{'cached ms':>11}{'queries':>9}")
+        for _ in range(args.steps + 1):
+            rows = BlacklistedToken.objects.count()
+            stock_ms, stock_queries = rotate(RefreshToken, user, args.rotations)
+            blacklist_cache.reset()
+            blacklist_cache.is_blacklisted('warm-up') # builds the snapshot outside the timing
+            cached_ms, cached_queries = rotate(CachedBlacklistRefreshToken, user, args.rotations)
+            print(f"  {rows:>16,}{stock_ms:>10.3f}{stock_queries:>9.1f}{cached_ms:>11.3f}{cached_queries:>9.1f}")
+            seed(args.rows, timezone.now() + timedelta(days=1))
+
+        seed(args.rows, timezone.now() - timedelta(days=1))
+        started = time.perf_counter()
+        call_command('purge_expired_tokens', batch_size=5000)
+        print(f"  purge_expired_tokens: {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# backend/benchmarks/harness.py
+"""
+Shared helpers for the HTTP-level benchmarks: Django setup, a thread-pool
+load driver and latency percentiles.
+"""
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scaffold_project_config.settings')
+    import django
+    django.setup()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(request_once, total, concurrency):
+    """
+    Calls `request_once(worker_state)` `total` times from `concurrency` threads.
+    `worker_state` is a per-thread dict (e.g. for a test Client).
+    Returns a summary dict with throughput and latency percentiles in ms.
+    """
+    local = threading.local()
+    latencies = []
+    lock = threading.Lock()
+
+    def task(_):
+        state = getattr(local, 'state', None)
+        if state is None:
+            state = local.state = {}
+        started = time.perf_counter()
+        request_once(state)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(task, range(total)))
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall)
+
+
+def summarize(latencies, wall):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'rps': len(ordered) / wall if wall else 0.0,
+        'mean_ms': statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+    }
+
+
+def format_row(name, result):
+    return (
+        f"  {name:<28} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.2f} ms"
+        f"  p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms"
+    )
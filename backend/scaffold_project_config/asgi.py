@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scaffold_project_config.settings')
+# Serve the user and email endpoints from apps/users/async_views.py.
+os.environ.setdefault('USE_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,52 @@
+# backend/scaffold_project_config/db_router.py
+"""
+Primary/replica database routing with read-after-write stickiness.
+
+Reads go to one of settings.DATABASE_REPLICAS and writes go to 'default'.
+As soon as a request writes (registration, email confirmation, a login that
+updates last_login, ...) the rest of that request reads from the primary, and
+PrimaryPinningMiddleware sets a short-lived cookie so the same client keeps
+reading from the primary until replication has caught up.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DB = 'default'
+
+# Both are reset per request by PrimaryPinningMiddleware.
+_pinned = ContextVar('db_pinned_to_primary', default=False)
+_wrote = ContextVar('db_wrote_in_request', default=False)
+
+
+def pin_to_primary():
+    _pinned.set(True)
+
+
+def is_pinned_to_primary():
+    return _pinned.get()
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or _pinned.get():
+            return PRIMARY_DB
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        databases = {PRIMARY_DB, *getattr(settings, 'DATABASE_REPLICAS', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
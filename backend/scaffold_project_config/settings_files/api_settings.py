@@ -1,8 +1,19 @@
 # backend/scaffold_project_config/settings_files/api_settings.py
+import os
+
+# Stateless mode builds request.user from the access token's claims and only
+# loads the User row when a view needs more (see apps/users/authentication.py).
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'True').lower() in ('true', '1', 't')
+
+# Route the user and email endpoints to apps/users/async_views.py. asgi.py
+# turns this on; under WSGI the sync views avoid an event loop per request.
+USE_ASYNC_VIEWS = os.getenv('USE_ASYNC_VIEWS', 'False').lower() in ('true', '1', 't')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.SessionAuthentication', # Keep if browsable API session login is desired
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication',
+        'apps.users.authentication.StatelessJWTCookieAuthentication' if JWT_STATELESS_AUTH
+        else 'dj_rest_auth.jwt_auth.JWTCookieAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly', # Example default
@@ -10,4 +21,9 @@ REST_FRAMEWORK = {
     # Example: default pagination
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'PAGE_SIZE': 10
-}
\ No newline at end of file
+}
+
+# How long the user detail payloads and ETags stay cached (apps/users/cache.py).
+# Saving the user drops them from the cache, which only reaches every worker
+# when the cache is shared (CACHE_URL), so caching is off (0) without one.
+USER_DETAIL_CACHE_SECONDS = int(os.getenv('USER_DETAIL_CACHE_SECONDS', '30' if os.getenv('CACHE_URL') else '0'))
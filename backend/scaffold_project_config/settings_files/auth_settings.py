@@ -90,11 +90,37 @@ REST_AUTH = {
     'SESSION_LOGIN': False,
     'PASSWORD_RESET_SERIALIZER': 'apps.users.serializers.CustomPasswordResetSerializer',
     'PASSWORD_RESET_CONFIRM_TEMPLATE': 'example_message.txt',
+    # Adds the claims used by apps.users.authentication.StatelessJWTCookieAuthentication
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'apps.users.serializers.ClaimsTokenObtainPairSerializer',
 
     # If you customize serializers, point to them here
     # 'USER_DETAILS_SERIALIZER': 'apps.users.serializers.CustomUserDetailsSerializer',
 }
 
+# How long each process may cache a user's token_version. A bump clears the
+# local entry at once; with a per-process cache (the default LocMemCache) other
+# processes notice within this many seconds.
+JWT_TOKEN_VERSION_CACHE_SECONDS = int(os.getenv('JWT_TOKEN_VERSION_CACHE_SECONDS', '30'))
+
+# /api/auth/session/ (apps.users.views.session_introspection): how long the
+# Next.js middleware may reuse an answer for the same token, and an optional
+# key shared with the frontend (SESSION_SIGNING_KEY) to sign the answer.
+SESSION_INTROSPECTION_MAX_AGE = int(os.getenv('SESSION_INTROSPECTION_MAX_AGE', '15'))
+SESSION_INTROSPECTION_SIGNING_KEY = os.getenv('SESSION_INTROSPECTION_SIGNING_KEY', '')
+
+# Refresh-token blacklist cache (apps/users/tokens.py): each process tops up its
+# Bloom filter of blacklisted JTIs this often, and rebuilds it without expired
+# tokens this often. Run `manage.py purge_expired_tokens` periodically to keep
+# the token tables small.
+JWT_BLACKLIST_SNAPSHOT_REFRESH_SECONDS = float(os.getenv('JWT_BLACKLIST_SNAPSHOT_REFRESH_SECONDS', '5'))
+JWT_BLACKLIST_SNAPSHOT_REBUILD_SECONDS = float(os.getenv('JWT_BLACKLIST_SNAPSHOT_REBUILD_SECONDS', '3600'))
+
+# last_login (apps/users/logins.py) is written at most once per user per
+# LAST_LOGIN_GRANULARITY_SECONDS. With LAST_LOGIN_FLUSH_SECONDS above 0 each
+# process also buffers the writes and flushes them as one UPDATE this often.
+LAST_LOGIN_GRANULARITY_SECONDS = int(os.getenv('LAST_LOGIN_GRANULARITY_SECONDS', '300'))
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv('LAST_LOGIN_FLUSH_SECONDS', '0'))
+
 # djangorestframework-simplejwt Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME_MINUTES', '60'))),
@@ -33,6 +33,21 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() in ('true', '1', 't')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+# Used by apps.common.mail.PooledSMTPEmailBackend: idle connections kept per
+# process, and how long one may sit idle before it is closed instead of reused.
+EMAIL_POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', 4))
+EMAIL_POOL_IDLE_TIMEOUT = int(os.getenv('EMAIL_POOL_IDLE_TIMEOUT', 60))
+
+# Transactional outbox: with EMAIL_OUTBOX on, sending an email only writes a
+# row (apps.common.models.OutboxEmail) and `manage.py run_email_worker`
+# delivers it through EMAIL_DELIVERY_BACKEND, the backend configured above.
+EMAIL_OUTBOX = os.getenv('EMAIL_OUTBOX', 'False').lower() in ('true', '1', 't')
+EMAIL_DELIVERY_BACKEND = EMAIL_BACKEND
+if EMAIL_OUTBOX:
+    EMAIL_BACKEND = 'apps.common.mail.OutboxEmailBackend'
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', 30)) # doubles per failed attempt
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', 300)) # longer than a batch takes to send
 
 # CORS settings
 CORS_ALLOWED_ORIGINS_STRING = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000,https://403c-140-174-75-126.ngrok-free.app')
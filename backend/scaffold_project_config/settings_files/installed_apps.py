@@ -1,6 +1,7 @@
 # backend/scaffold_project_config/settings_files/installed_apps.py
 INSTALLED_APPS = [
     'django.contrib.admin',
+    'django.contrib.auth', # before apps.users, see UsersConfig.ready()
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
@@ -14,6 +15,7 @@ INSTALLED_APPS = [
     # Third-party apps for API and Auth
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist', # ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION
     'dj_rest_auth',
     'dj_rest_auth.registration',
 
@@ -23,5 +25,4 @@ INSTALLED_APPS = [
     'allauth.socialaccount.providers.google', # Example provider
 
     'corsheaders',
-    'django.contrib.auth',
 ]
\ No newline at end of file
@@ -1,12 +1,98 @@
 # backend/scaffold_project_config/settings_files/middleware.py
+import os
+
 MIDDLEWARE = [
+    'apps.common.middleware.RequestTimingMiddleware', # Server-Timing and timing logs for sampled requests; off unless REQUEST_TIMING_SAMPLE_RATE > 0
+    'apps.common.middleware.QueryLogMiddleware', # Slow-query and repeated-query log; off unless QUERY_LOG
+    'apps.common.middleware.ProfilingMiddleware', # Sampled or token-triggered request profiles; off unless PROFILING_SAMPLE_RATE > 0 or PROFILING_TOKENS
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.users.middleware.SessionIntrospectionMiddleware', # Answers /api/auth/session/ without the rest of the stack
+    'apps.common.middleware.PrimaryPinningMiddleware', # Read-after-write stickiness for read replicas; wraps everything that may query
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'apps.common.middleware.PathDispatchMiddleware', # Runs SITE_MIDDLEWARE, except for API_FAST_PATH_PREFIXES
+    'allauth.account.middleware.AccountMiddleware', # allauth refuses to start without it here; the API needs its request context
+]
+
+# The server-rendered site's middleware (admin/, accounts/ and anything else
+# outside API_FAST_PATH_PREFIXES), run by PathDispatchMiddleware.
+SITE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware', # Corrected: Added here
-]
\ No newline at end of file
+]
+# Django's admin and deploy checks for this middleware only look in
+# MIDDLEWARE. apps/common/checks.py runs them on MIDDLEWARE and SITE_MIDDLEWARE
+# (PathDispatchMiddleware applies the latter) instead.
+SILENCED_SYSTEM_CHECKS = [
+    'admin.E408', 'admin.E409', 'admin.E410',
+    'security.W002', 'security.W003', 'security.W016', 'security.W019',
+]
+
+# Comma-separated path prefixes of the JWT-only API, which skips
+# SITE_MIDDLEWARE: no sessions, CSRF middleware, request.user before DRF
+# authenticates, flash messages or X-Frame-Options. Cookie-borne JWTs are
+# CSRF-checked by the authentication class when JWT_AUTH_COOKIE_USE_CSRF is
+# on. Empty runs everything through SITE_MIDDLEWARE, which session-based API
+# authentication (SessionAuthentication, SESSION_LOGIN) requires.
+API_FAST_PATH_PREFIXES = [prefix for prefix in os.getenv('API_FAST_PATH_PREFIXES', '/api/').split(',') if prefix]
+
+# Share of requests RequestTimingMiddleware measures (0 to 1; 0 removes it),
+# and whether measured responses carry a Server-Timing header. Each measured
+# request is also logged as one JSON line on the 'apps.common.timing' logger.
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0'))
+REQUEST_TIMING_HEADER = os.getenv('REQUEST_TIMING_HEADER', 'True').lower() in ('true', '1', 't')
+
+# Request profiler (apps/common/profiling.py): profiles PROFILING_SAMPLE_RATE
+# of requests, and requests with an X-Profile-Token header from
+# `manage.py profile_token` when PROFILING_TOKENS is on. PROFILING_MODE is
+# 'cprofile' (.prof files) or 'sample' (collapsed stacks, one sample every
+# PROFILING_INTERVAL_MS). The newest PROFILING_KEEP profiles per URL name are
+# kept in PROFILING_DIR. Summarise with `manage.py profile_report`.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKENS = os.getenv('PROFILING_TOKENS', 'False').lower() in ('true', '1', 't')
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', '3600'))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', '5'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', 'profiles')
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', '20'))
+
+# Metrics registry (apps/common/metrics.py), served at /metrics. With several
+# worker processes, METRICS_DIR must be set (a directory cleared on start,
+# e.g. on tmpfs) so each worker writes its values to a file there and
+# /metrics sums them. Scrapes must send METRICS_TOKEN as a bearer token; while
+# it is unset /metrics answers 403.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Query log (apps/common/querylog.py): statements slower than QUERY_LOG_SLOW_MS
+# with their EXPLAIN plan, and SQL templates a request runs more than
+# QUERY_LOG_REPEAT_THRESHOLD times, as JSON lines appended to QUERY_LOG_FILE.
+# Summarise with `manage.py query_log_report`.
+QUERY_LOG = os.getenv('QUERY_LOG', 'False').lower() in ('true', '1', 't')
+QUERY_LOG_SLOW_MS = float(os.getenv('QUERY_LOG_SLOW_MS', '100'))
+QUERY_LOG_REPEAT_THRESHOLD = int(os.getenv('QUERY_LOG_REPEAT_THRESHOLD', '10'))
+QUERY_LOG_FILE = os.getenv('QUERY_LOG_FILE', 'query_log.jsonl')
+
+# Timing records (one JSON line per measured request) go to stderr;
+# query log records to QUERY_LOG_FILE when QUERY_LOG is on.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {'message': {'format': '%(message)s'}},
+    'handlers': {
+        'timing': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'apps.common.timing': {'handlers': ['timing'], 'level': 'INFO', 'propagate': False},
+    },
+}
+if QUERY_LOG:
+    LOGGING['handlers']['query_log'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': QUERY_LOG_FILE,
+        'formatter': 'message',
+    }
+    LOGGING['loggers']['apps.common.querylog'] = {'handlers': ['query_log'], 'level': 'INFO', 'propagate': False}
@@ -17,9 +17,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
+from apps.common.views import metrics
+from apps.users.views import CachedUserDetailsView, ClaimsTokenRefreshView, MeteredLoginView, session_introspection
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
+    # Must come before dj_rest_auth.urls, which routes the same paths to the stock views.
+    path('api/auth/login/', MeteredLoginView.as_view(), name='rest_login'),
+    path('api/auth/token/refresh/', ClaimsTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/auth/user/', CachedUserDetailsView.as_view(), name='rest_user_details'),
+    # Usually answered by SessionIntrospectionMiddleware before reaching the URLconf.
+    path('api/auth/session/', session_introspection, name='session_introspection'),
     path('api/auth/', include('dj_rest_auth.urls')),
     
     # Include complete dj-rest-auth registration URLs for email verification endpoints
@@ -15,6 +15,75 @@ const AUTH_ROUTES = [
   '/reset-password'
 ];
 
+type SessionInfo = {
+  authenticated: boolean;
+  // The /api/auth/user/ payload plus the is_staff and email_verified_at claims
+  user?: {
+    pk: string;
+    email: string;
+    first_name: string;
+    last_name: string;
+    is_staff: boolean;
+    email_verified_at: string | null;
+  };
+  expires_at?: number; // epoch seconds; never past the access token's expiry
+};
+
+// Per-token micro-cache of /api/auth/session/ answers, so navigations within
+// the backend's max-age (SESSION_INTROSPECTION_MAX_AGE) skip the round trip.
+// Lives as long as this middleware instance; bounded to keep memory flat.
+const SESSION_CACHE_LIMIT = 1000;
+const sessionCache = new Map<string, { session: SessionInfo; expiresAt: number }>();
+
+// Optional key shared with the backend (SESSION_INTROSPECTION_SIGNING_KEY).
+// When set, only answers with a valid X-Session-Signature are trusted.
+const SESSION_SIGNING_KEY = process.env.SESSION_SIGNING_KEY;
+
+async function hasValidSignature(body: string, signature: string | null): Promise<boolean> {
+  if (!SESSION_SIGNING_KEY) return true;
+  if (!signature || !/^[0-9a-f]{64}$/.test(signature)) return false;
+  const encoder = new TextEncoder();
+  const key = await crypto.subtle.importKey(
+    'raw', encoder.encode(SESSION_SIGNING_KEY), { name: 'HMAC', hash: 'SHA-256' }, false, ['verify']
+  );
+  const bytes = new Uint8Array(signature.match(/../g)!.map(pair => parseInt(pair, 16)));
+  return crypto.subtle.verify('HMAC', key, bytes, encoder.encode(body));
+}
+
+async function fetchSession(token: string): Promise<SessionInfo | null> {
+  const cached = sessionCache.get(token);
+  if (cached && cached.expiresAt > Date.now()) {
+    return cached.session;
+  }
+  sessionCache.delete(token);
+
+  const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/auth/session/`, {
+    method: 'GET',
+    headers: { 'Cookie': `my-app-auth=${token}` },
+    signal: AbortSignal.timeout(3000) // 3 second timeout
+  });
+  if (response.status === 401) {
+    return { authenticated: false };
+  }
+  if (!response.ok) {
+    return null; // treat like a network error
+  }
+  const body = await response.text();
+  if (!(await hasValidSignature(body, response.headers.get('X-Session-Signature')))) {
+    console.error('[Middleware] Session response signature mismatch');
+    return null;
+  }
+  const session: SessionInfo = JSON.parse(body);
+  const maxAge = Number(/max-age=(\d+)/.exec(response.headers.get('Cache-Control') ?? '')?.[1] ?? 0);
+  if (maxAge > 0) {
+    if (sessionCache.size >= SESSION_CACHE_LIMIT) {
+      sessionCache.delete(sessionCache.keys().next().value!); // oldest entry
+    }
+    sessionCache.set(token, { session, expiresAt: Date.now() + maxAge * 1000 });
+  }
+  return session;
+}
+
 export async function middleware(request: NextRequest) {
   const { pathname } = request.nextUrl;
   const authCookie = request.cookies.get('my-app-auth');
@@ -29,24 +98,16 @@ export async function middleware(request: NextRequest) {
     try {
       console.log('[Middleware] Validating JWT token with backend...');
       
-      // Call our backend to validate the JWT token
-      const validateResponse = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/auth/user/`, {
-        method: 'GET',
-        headers: {
-          'Cookie': `my-app-auth=${authCookie.value}`,
-          'Content-Type': 'application/json',
-        },
-        credentials: 'include',
-        // Add timeout and better error handling for middleware context
-        signal: AbortSignal.timeout(3000) // 3 second timeout
-      });
-      
-      if (validateResponse.ok) {
-        const userData = await validateResponse.json();
-        console.log('[Middleware] Token valid, user authenticated:', userData.email);
+      // Lightweight session endpoint: validates the token, no user lookup
+      const session = await fetchSession(authCookie.value);
+
+      if (session?.authenticated) {
+        console.log('[Middleware] Token valid, user authenticated:', session.user?.email);
         
         // Set auth state in response headers for the server components to read
-        response.headers.set('X-Auth-User', JSON.stringify(userData));
+        // The frontend's User type (AuthContext) is keyed by `id`, not `pk`
+        const { pk, ...user } = session.user!;
+        response.headers.set('X-Auth-User', JSON.stringify({ id: pk, ...user }));
         response.headers.set('X-Auth-Authenticated', 'true');
         
         // If user is authenticated and trying to access auth pages, redirect to home
@@ -54,12 +115,15 @@ export async function middleware(request: NextRequest) {
           console.log('[Middleware] Authenticated user accessing auth page, redirecting to home');
           return NextResponse.redirect(new URL('/', request.url));
         }
-      } else {
+      } else if (session) {
         console.log('[Middleware] Token invalid or expired');
         // Token is invalid - clear it and treat as unauthenticated
         response.cookies.delete('my-app-auth');
         response.cookies.delete('my-app-refresh-token');
         response.headers.set('X-Auth-Authenticated', 'false');
+      } else {
+        // Backend error or bad signature: unauthenticated, but keep the cookies
+        response.headers.set('X-Auth-Authenticated', 'false');
       }
     } catch (error) {
       console.error('[Middleware] Error validating token:', error);